@@ -0,0 +1,191 @@
+"""
+Measures the crawlers and the screenshotter against a synthetic website served on 127.0.0.1.
+
+Each scenario runs in a fresh process, so its peak RSS is its own. Latency is measured per page around
+the crawler's fetch-and-parse step, or per screenshot for the screenshotter. Browser processes are not
+part of the peak RSS reported. Scenarios that cannot run, such as Playwright ones without an installed
+browser, are reported as failed without stopping the others.
+
+Usage:
+    python -m benchmarks.bench_crawl [--pages 200] [--fanout 10] [--images 5] [--page_size 10000]
+        [--slow_ratio 0] [--slow_delay 0.2] [--fail_ratio 0] [--concurrency 8] [--screenshots 20]
+        [--scenarios url-bs4 image-stream ...] [--json results.json]
+"""
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_site import SyntheticSite
+
+# name: (crawler class name, parser, concurrent)
+CRAWL_SCENARIOS = {
+    'url-bs4': ('UrlCrawler', 'bs4', False),
+    'url-bs4-concurrent': ('UrlCrawler', 'bs4', True),
+    'url-stream-concurrent': ('UrlCrawler', 'stream', True),
+    'url-playwright': ('UrlCrawler', 'playwright', False),
+    'url-playwright-concurrent': ('UrlCrawler', 'playwright', True),
+    'image-bs4': ('ImageCrawler', 'bs4', False),
+    'image-bs4-concurrent': ('ImageCrawler', 'bs4', True),
+    'image-stream-concurrent': ('ImageCrawler', 'stream', True),
+    'image-playwright-concurrent': ('ImageCrawler', 'playwright', True),
+}
+SCENARIOS = list(CRAWL_SCENARIOS) + ['screenshot']
+
+# The crawler methods that fetch and parse one page, whichever engine calls them.
+CRAWL_PAGE_METHODS = ('_crawl_page', '_crawl_page_playwright', '_crawl_page_playwright_async')
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile of values by the nearest-rank method, or None if there are none.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def time_calls(obj, name, latencies):
+    """
+    Replaces a method on obj with one that appends the duration of every call to latencies.
+    """
+    method = getattr(obj, name)
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+    else:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+    setattr(obj, name, timed)
+
+
+def run_crawl(scenario, start_url, options):
+    from snappy import crawlers
+
+    class_name, parser, concurrent = CRAWL_SCENARIOS[scenario]
+    crawler = getattr(crawlers, class_name)(start_url, parser=parser,
+                                            concurrency=options['concurrency'] if concurrent else None)
+    latencies = []
+    for name in CRAWL_PAGE_METHODS:
+        time_calls(crawler, name, latencies)
+
+    start = time.perf_counter()
+    crawler.run()
+    elapsed = time.perf_counter() - start
+    return len(latencies), elapsed, latencies
+
+
+def run_screenshots(start_url, options):
+    from snappy.tools import AsyncScreenshotter
+
+    base = start_url.rsplit('/', 1)[0]
+    urls = [f'{base}/{i}' for i in range(options['screenshots'])]
+    latencies = []
+
+    async def capture(screenshotter, url, filename):
+        start = time.perf_counter()
+        try:
+            await screenshotter.take_screenshot(url, filename)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    async def capture_all(output_dir):
+        async with AsyncScreenshotter(output_dir=output_dir, scroll_delay=0,
+                                      max_pages=options['concurrency']) as screenshotter:
+            await asyncio.gather(*(capture(screenshotter, url, str(i)) for i, url in enumerate(urls)))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        asyncio.run(capture_all(output_dir))
+        elapsed = time.perf_counter() - start
+    return len(urls), elapsed, latencies
+
+
+def run_scenario(scenario, start_url, options):
+    """
+    Runs one scenario and returns its measurements. Runs in its own process.
+    """
+    try:
+        if scenario == 'screenshot':
+            pages, elapsed, latencies = run_screenshots(start_url, options)
+        else:
+            pages, elapsed, latencies = run_crawl(scenario, start_url, options)
+    except Exception as e:
+        return {'scenario': scenario, 'error': f'{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ""}'}
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return {
+        'scenario': scenario,
+        'pages': pages,
+        'seconds': elapsed,
+        'pages_per_second': pages / elapsed if elapsed else None,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p90_ms': percentile(latencies, 90) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'peak_rss_mb': peak_rss / 1024 / 1024,
+    }
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"{result['scenario']:<28} failed: {result['error']}"
+    ms = lambda value: f'{value:>8.1f}' if value is not None else f"{'-':>8}"
+    return (f"{result['scenario']:<28} {result['pages']:>6} {result['pages_per_second']:>9.1f} "
+            f"{ms(result['p50_ms'])} {ms(result['p90_ms'])} {ms(result['p99_ms'])} {result['peak_rss_mb']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the crawlers and the screenshotter on a local synthetic site.')
+    parser.add_argument('--pages', default=200, type=int, help='Number of pages on the site')
+    parser.add_argument('--fanout', default=10, type=int, help='Links per page')
+    parser.add_argument('--images', default=5, type=int, help='Images per page')
+    parser.add_argument('--page_size', default=10000, type=int, help='Bytes of filler text per page')
+    parser.add_argument('--slow_ratio', default=0.0, type=float, help='Share of pages that answer slowly')
+    parser.add_argument('--slow_delay', default=0.2, type=float, help='Seconds a slow page takes to answer')
+    parser.add_argument('--fail_ratio', default=0.0, type=float, help='Share of pages that answer 500')
+    parser.add_argument('--concurrency', default=8, type=int, help='Concurrency of the concurrent scenarios')
+    parser.add_argument('--screenshots', default=20, type=int, help='Number of pages to screenshot')
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS, help='Scenarios to run')
+    parser.add_argument('--json', help='File to also write the results to as JSON')
+    args = parser.parse_args()
+
+    options = {'concurrency': args.concurrency, 'screenshots': min(args.screenshots, args.pages)}
+    results = []
+    with SyntheticSite(pages=args.pages, fanout=args.fanout, images=args.images, page_size=args.page_size,
+                       slow_ratio=args.slow_ratio, slow_delay=args.slow_delay, fail_ratio=args.fail_ratio) as site:
+        print(f'{args.pages} pages, {args.fanout} links and {args.images} images each, '
+              f'{len(site.render_page(0))} bytes per page, served at {site.start_url}')
+        print(f"{'scenario':<28} {'pages':>6} {'pages/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'RSS MB':>9}")
+
+        # A fresh process per scenario keeps peak RSS and imports from leaking between them.
+        context = multiprocessing.get_context('spawn')
+        for scenario in args.scenarios:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_scenario, (scenario, site.start_url, options))
+            results.append(result)
+            print(format_result(result), flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
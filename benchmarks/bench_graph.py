@@ -0,0 +1,85 @@
+"""
+Compares the memory and speed of the two ways of keeping a crawl's results: a set of URLs with a
+dictionary of lists of URLs, as the crawlers used to, and a LinkGraph.
+
+A crawl is simulated by recording pages one after another, each with a list of links whose URL strings
+are built afresh for every page, as a parser returns them. Memory is measured with tracemalloc, so the
+URL strings each structure keeps alive are counted.
+
+Usage:
+    python -m benchmarks.bench_graph [--pages 20000] [--fanout 50]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from snappy.graph import LinkGraph
+
+HOST = 'https://www.example.com'
+
+
+def crawl(pages, fanout, seed=0):
+    """
+    Yields (url, links) for each page of a simulated crawl, linking to fanout random pages of the site.
+    """
+    rng = random.Random(seed)
+    for i in range(pages):
+        links = [f'{HOST}/section/{j % 50}/article-{j}' for j in (rng.randrange(pages) for _ in range(fanout))]
+        yield f'{HOST}/section/{i % 50}/article-{i}', links
+
+
+def record_dict(pages, fanout):
+    url_list, adjacency_list = set(), {}
+    for url, links in crawl(pages, fanout):
+        url_list.add(url)
+        adjacency_list[url] = links
+    return url_list, adjacency_list
+
+
+def record_graph(pages, fanout):
+    graph = LinkGraph(lambda url: url.startswith(HOST))
+    for url, links in crawl(pages, fanout):
+        graph.add_url(url)
+        graph.set_links(url, links)
+    return graph.urls, graph.adjacency
+
+
+def measure(record, pages, fanout):
+    """
+    Returns the bytes held per link, the seconds taken to record the crawl, and the seconds taken to read
+    every adjacency list back.
+    """
+    tracemalloc.start()
+    results = record(pages, fanout)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+
+    start = time.perf_counter()
+    url_list, adjacency_list = record(pages, fanout)
+    recorded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for url in url_list:
+        adjacency_list[url]
+    read = time.perf_counter() - start
+    return size / (pages * fanout), recorded, read
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dictionary and CSR link graphs.')
+    parser.add_argument('--pages', default=20000, type=int, help='Number of pages crawled')
+    parser.add_argument('--fanout', default=50, type=int, help='Links per page')
+    args = parser.parse_args()
+
+    print(f'{args.pages} pages with {args.fanout} links each')
+    print(f"{'graph':<12} {'bytes/link':>11} {'total MB':>9} {'record s':>9} {'read s':>8}")
+    for name, record in [('dict', record_dict), ('LinkGraph', record_graph)]:
+        per_link, recorded, read = measure(record, args.pages, args.fanout)
+        total = per_link * args.pages * args.fanout / 1024 / 1024
+        print(f'{name:<12} {per_link:>11.1f} {total:>9.1f} {recorded:>9.2f} {read:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
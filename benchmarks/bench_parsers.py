@@ -0,0 +1,79 @@
+"""
+Compares the throughput of the bs4 and stream parsers on the same synthetic pages.
+
+Both parsers are timed on pages already held in memory, so the numbers measure extraction only:
+decoding plus BeautifulSoup parsing for bs4, and scanning 64 KB chunks of raw bytes for stream.
+
+Usage:
+    python -m benchmarks.bench_parsers [--pages 200] [--links 200] [--images 50] [--filler 20000]
+"""
+import argparse
+import random
+import time
+
+from bs4 import BeautifulSoup
+from snappy.parsers import StreamingLinkExtractor
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_page(rng, links, images, filler):
+    """
+    Builds one HTML page with the given number of links and images and roughly `filler` bytes of text.
+    """
+    parts = ['<html><head><title>Page</title></head><body>']
+    text = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. '
+    for _ in range(links):
+        parts.append(f'<p>{text * rng.randint(0, 2)}<a href="/page/{rng.randrange(100000)}" class="link">link</a></p>')
+    for _ in range(images):
+        parts.append(f'<img src="/img/{rng.randrange(100000)}.png" alt="image" width="100" height="80">')
+    parts.append('<div>' + text * (filler // len(text)) + '</div>')
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def run_bs4(page):
+    soup = BeautifulSoup(page.decode('utf-8'), 'html.parser')
+    hrefs = [link.get('href') for link in soup.find_all('a')]
+    images = [(img.get('src'), img.get('alt'), img.get('width'), img.get('height')) for img in soup.find_all('img')]
+    return hrefs, images
+
+
+def run_stream(page):
+    extractor = StreamingLinkExtractor()
+    for i in range(0, len(page), CHUNK_SIZE):
+        extractor.feed(page[i:i + CHUNK_SIZE])
+    extractor.close()
+    return extractor.links, extractor.images
+
+
+def bench(name, func, pages):
+    start = time.perf_counter()
+    for page in pages:
+        func(page)
+    elapsed = time.perf_counter() - start
+    size = sum(len(page) for page in pages) / 1024 / 1024
+    print(f'{name:<8} {len(pages) / elapsed:>10.1f} pages/s {size / elapsed:>10.1f} MB/s')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bs4 and stream parsers.')
+    parser.add_argument('--pages', default=200, type=int, help='Number of pages to parse')
+    parser.add_argument('--links', default=200, type=int, help='Links per page')
+    parser.add_argument('--images', default=50, type=int, help='Images per page')
+    parser.add_argument('--filler', default=20000, type=int, help='Bytes of plain text per page')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = [make_page(rng, args.links, args.images, args.filler) for _ in range(args.pages)]
+    assert all(run_bs4(page) == run_stream(page) for page in pages[:10])
+
+    print(f'{args.pages} pages, {sum(len(page) for page in pages) // args.pages} bytes each')
+    bs4_time = bench('bs4', run_bs4, pages)
+    stream_time = bench('stream', run_stream, pages)
+    print(f'stream is {bs4_time / stream_time:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Compares the memory, speed and false-positive rate of the two seen-sets a crawl frontier can use: a set of
+URL strings and a FingerprintSet.
+
+Memory is measured with tracemalloc around building each seen-set from URLs generated on the fly, so the
+URL strings a set keeps alive are counted. The false-positive rate is measured by looking up as many URLs
+that were never added.
+
+The seen-set is only part of what a crawl holds per URL: the link graph keeps every URL string, and the
+queue and the link depths keep those of the URLs waiting to be crawled. So the memory of a whole crawl is
+also measured, running UrlCrawler with and without compact_seen over a simulated site whose pages are
+generated in memory instead of fetched.
+
+Usage:
+    python -m benchmarks.bench_seen [--urls 1000000] [--path_length 60] [--crawl_pages 20000] [--fanout 10]
+"""
+import argparse
+import random
+import string
+import time
+import tracemalloc
+
+from snappy.crawlers import UrlCrawler
+from snappy.seen import FingerprintSet
+
+HOST = 'https://www.example.com'
+
+
+def make_urls(count, path_length, seed):
+    """
+    Yields count URLs spread over 100 hosts, each with a random path of about path_length characters.
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits + '-/'
+    for i in range(count):
+        path = ''.join(rng.choices(alphabet, k=path_length))
+        yield f'https://www.site{i % 100}.example.com/{path}?id={i}'
+
+
+def measure_memory(build, count, path_length):
+    """
+    Returns the bytes per URL held by the seen-set build returns for count generated URLs.
+    """
+    tracemalloc.start()
+    seen = build(make_urls(count, path_length, seed=0))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del seen
+    return size / count
+
+
+def measure_speed(build, urls, unseen):
+    """
+    Returns the seconds per add and per lookup, and the share of unseen URLs reported as present.
+    """
+    start = time.perf_counter()
+    seen = build(urls)
+    added = time.perf_counter() - start
+
+    start = time.perf_counter()
+    false_positives = sum(url in seen for url in unseen)
+    looked_up = time.perf_counter() - start
+    return added / len(urls), looked_up / len(unseen), false_positives / len(unseen)
+
+
+def measure_crawl(pages, fanout, path_length, compact):
+    """
+    Returns the peak bytes held per recorded URL by a crawl of a simulated site of pages pages, each linking
+    to fanout random pages of the site, and the number of URLs recorded. The peak is taken because the
+    frontier is released when the run ends.
+    """
+    rng = random.Random(0)
+    paths = [url[url.index('/', len('https://')):] for url in make_urls(pages, path_length, seed=2)]
+
+    def crawl_page(url):
+        # Build the link strings afresh for every page, as a parser returns them.
+        return [HOST + paths[rng.randrange(pages)] for _ in range(fanout)]
+
+    tracemalloc.start()
+    crawler = UrlCrawler(HOST, compact_seen=compact)
+    crawler._start_budgets()
+    crawler._run_sync(crawl_page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / len(crawler.url_list), len(crawler.url_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the set and fingerprint seen-sets.')
+    parser.add_argument('--urls', default=1000000, type=int, help='Number of URLs to add')
+    parser.add_argument('--path_length', default=60, type=int, help='Characters of random path per URL')
+    parser.add_argument('--crawl_pages', default=20000, type=int, help='Pages of the simulated crawl')
+    parser.add_argument('--fanout', default=10, type=int, help='Links per page of the simulated crawl')
+    args = parser.parse_args()
+
+    urls = list(make_urls(args.urls, args.path_length, seed=0))
+    unseen = list(make_urls(args.urls, args.path_length, seed=1))
+    print(f'{args.urls} URLs of {sum(map(len, urls)) / len(urls):.0f} characters on average')
+    print(f"{'seen-set':<16} {'bytes/URL':>10} {'add us':>8} {'lookup us':>10} {'false positives':>16}")
+
+    for name, build in [('set', set), ('FingerprintSet', FingerprintSet)]:
+        per_url = measure_memory(build, args.urls, args.path_length)
+        add, lookup, false_positive_rate = measure_speed(build, urls, unseen)
+        print(f'{name:<16} {per_url:>10.1f} {add * 1e6:>8.2f} {lookup * 1e6:>10.2f} {false_positive_rate:>16.2e}')
+
+    print()
+    print(f'Crawl of {args.crawl_pages} pages with {args.fanout} links each, URL strings included')
+    print(f"{'seen-set':<16} {'URLs':>8} {'bytes/URL':>10}")
+    for name, compact in [('set', False), ('FingerprintSet', True)]:
+        per_url, urls = measure_crawl(args.crawl_pages, args.fanout, args.path_length, compact)
+        print(f'{name:<16} {urls:>8} {per_url:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
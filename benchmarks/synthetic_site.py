@@ -0,0 +1,162 @@
+"""
+A synthetic website served from a local HTTP server, for benchmarking without network access.
+
+Pages are generated on request from a seed, so a site of any size costs no disk space and every run sees
+the same pages. Page i links to page i + 1, so every page is reachable from page 0, and to `fanout - 1`
+random other pages. A share of the pages can be made slow or made to fail with a 500.
+
+Usage:
+    with SyntheticSite(pages=500, fanout=10) as site:
+        UrlCrawler(site.start_url).run()
+"""
+import random
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A 1x1 transparent PNG, served for every image.
+PIXEL_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082')
+
+FILLER_TEXT = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. '
+
+
+class _QuietServer(ThreadingHTTPServer):
+    """
+    A server that does not report clients hanging up mid-response, as crawls stopped by a deadline do.
+    """
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class SyntheticSite:
+    """
+    Generates and serves a synthetic website on 127.0.0.1.
+
+    Args:
+        pages (int): The number of pages. Default is 200.
+        fanout (int): The number of links on each page. Default is 10.
+        images (int): The number of images on each page. Default is 5.
+        page_size (int): Roughly how many bytes of text to pad each page with. Default is 10000.
+        slow_ratio (float): The share of pages that take slow_delay seconds to answer. Default is 0.
+        slow_delay (float): How long slow pages take to answer, in seconds. Default is 0.2.
+        fail_ratio (float): The share of pages that answer 500 Internal Server Error. Default is 0.
+        seed (int): The seed the site is generated from. Default is 0.
+        port (int): The port to listen on. Default is 0, which picks a free port.
+
+    Attributes:
+        start_url (str): The URL of page 0, once the server is started.
+        requests (int): The number of requests answered so far.
+    """
+
+    def __init__(self, pages=200, fanout=10, images=5, page_size=10000, slow_ratio=0.0, slow_delay=0.2,
+                 fail_ratio=0.0, seed=0, port=0):
+        if pages < 1:
+            raise ValueError('pages must be a positive integer')
+
+        self.pages = pages
+        self.fanout = fanout
+        self.images = images
+        self.page_size = page_size
+        self.slow_delay = slow_delay
+        self.port = port
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        rng = random.Random(seed)
+        self.slow_pages = set(rng.sample(range(pages), int(pages * slow_ratio)))
+        self.failing_pages = set(rng.sample(range(1, pages), min(pages - 1, int(pages * fail_ratio))))
+        self._seeds = [rng.randrange(2 ** 32) for _ in range(pages)]
+
+    @property
+    def start_url(self):
+        return f'http://127.0.0.1:{self.port}/page/0'
+
+    def page_url(self, index):
+        return f'http://127.0.0.1:{self.port}/page/{index}'
+
+    def render_page(self, index):
+        """
+        Returns the HTML of a page.
+        """
+        rng = random.Random(self._seeds[index])
+        links = [(index + 1) % self.pages] + [rng.randrange(self.pages) for _ in range(self.fanout - 1)]
+        parts = [f'<html><head><title>Page {index}</title></head><body><h1>Page {index}</h1>']
+        for link in links:
+            parts.append(f'<p><a href="/page/{link}">Page {link}</a></p>')
+        for image in range(self.images):
+            parts.append(f'<img src="/img/{index}-{image}.png" alt="Image {image}" width="1" height="1">')
+        parts.append('<div>' + FILLER_TEXT * (self.page_size // len(FILLER_TEXT)) + '</div>')
+        parts.append('</body></html>')
+        return ''.join(parts).encode('utf-8')
+
+    def _make_handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, which Nagle's algorithm would hold back by ~40 ms.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with site._lock:
+                    site.requests += 1
+
+                status, content_type, body = 404, 'text/plain', b'Not Found'
+                if self.path.startswith('/img/'):
+                    status, content_type, body = 200, 'image/png', PIXEL_PNG
+                elif self.path.startswith('/page/'):
+                    try:
+                        index = int(self.path[len('/page/'):])
+                    except ValueError:
+                        index = -1
+                    if index in site.failing_pages:
+                        status, body = 500, b'Internal Server Error'
+                    elif 0 <= index < site.pages:
+                        if index in site.slow_pages:
+                            time.sleep(site.slow_delay)
+                        status, content_type, body = 200, 'text/html; charset=utf-8', site.render_page(index)
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """
+        Starts serving the site from a background thread.
+        """
+        self._server = _QuietServer(('127.0.0.1', self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -14,6 +14,9 @@ setup(
         'urllib3',
         'asyncio',
     ],
+    extras_require={
+        'diff': ['numpy', 'Pillow'],
+    },
     classifiers=[
         'Development Status :: 1 - Planning',
         'Intended Audience :: Developers',
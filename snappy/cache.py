@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class ResponseCache:
+    """
+    An on-disk cache of response bodies, revalidated with conditional requests.
+
+    Only successful responses carrying an ETag or Last-Modified header are stored. Their bodies are kept
+    as files in the cache directory and indexed, together with their validators, in an SQLite file next
+    to them. Once the bodies take up more than max_size bytes, the least recently used ones are evicted.
+
+    The cache can be shared by the worker threads of a concurrent crawl.
+
+    Args:
+        directory (str): The directory holding the cache. It is created if it does not exist.
+        max_size (int): The maximum total size of the cached bodies in bytes. Default is 512 MB.
+
+    Raises:
+        ValueError: If max_size is not a positive integer.
+    """
+
+    def __init__(self, directory, max_size=512 * 1024 * 1024):
+        if max_size < 1:
+            raise ValueError('max_size must be a positive integer')
+
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        with self._connection:
+            self._connection.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_type TEXT,
+                    size INTEGER NOT NULL, last_used INTEGER NOT NULL)
+            ''')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+        self._size, self._clock = self._connection.execute(
+            'SELECT COALESCE(SUM(size), 0), COALESCE(MAX(last_used), 0) FROM entries').fetchone()
+        # The cache may have been created with a larger max_size.
+        self._evict()
+
+    def _tick(self):
+        """
+        Returns the next value of the use counter that orders entries for eviction. Called with the lock held.
+        """
+        self._clock += 1
+        return self._clock
+
+    def _path(self, url):
+        """
+        Returns the path of the file holding the body cached for a URL.
+        """
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def validators(self, url):
+        """
+        Returns the conditional request headers for a cached URL.
+
+        Args:
+            url (str): The URL of the request.
+
+        Returns:
+            dict: If-None-Match and If-Modified-Since headers, empty if the URL is not cached.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT etag, last_modified FROM entries WHERE url = ?', (url,)).fetchone()
+
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def revalidated(self, url, response):
+        """
+        Turns a 304 Not Modified response into a full response carrying the cached body.
+
+        Args:
+            url (str): The URL of the request.
+            response (requests.Response): The 304 response.
+
+        Returns:
+            requests.Response: The response with the cached body, or None if the body is no longer cached.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT content_type FROM entries WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._path(url), 'rb') as body_file:
+                    body = body_file.read()
+            except OSError:
+                return None
+            with self._connection:
+                self._connection.execute('UPDATE entries SET last_used = ? WHERE url = ?', (self._tick(), url))
+
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.url = response.url
+        cached.headers = CaseInsensitiveDict(response.headers)
+        if row[0] and 'Content-Type' not in cached.headers:
+            cached.headers['Content-Type'] = row[0]
+        cached.encoding = get_encoding_from_headers(cached.headers)
+        cached.request = response.request
+        cached._content = body
+        cached._content_consumed = True
+        return cached
+
+    def store(self, url, response):
+        """
+        Caches the body of a response if it is a 200 with an ETag or Last-Modified header.
+
+        Args:
+            url (str): The URL of the request.
+            response (requests.Response): The response. Its body is read if it has not been yet.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        body = response.content
+        if len(body) > self.max_size:
+            return
+
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as body_file:
+            body_file.write(body)
+
+        with self._lock:
+            os.replace(temp_path, path)
+            row = self._connection.execute('SELECT size FROM entries WHERE url = ?', (url,)).fetchone()
+            with self._connection:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO entries (url, etag, last_modified, content_type, size, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (url, etag, last_modified, response.headers.get('Content-Type'), len(body), self._tick()))
+            self._size += len(body) - (row[0] if row else 0)
+            self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used bodies until the cache fits in max_size. Called with the lock held.
+        """
+        if self._size <= self.max_size:
+            return
+
+        evicted = []
+        for url, size in self._connection.execute('SELECT url, size FROM entries ORDER BY last_used'):
+            if self._size <= self.max_size:
+                break
+            evicted.append(url)
+            self._size -= size
+
+        with self._connection:
+            self._connection.executemany('DELETE FROM entries WHERE url = ?', ((url,) for url in evicted))
+        for url in evicted:
+            try:
+                os.remove(self._path(url))
+            except OSError:
+                pass
+
+    def __len__(self):
+        """
+        Returns the number of cached bodies.
+        """
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    @property
+    def size(self):
+        """
+        The total size of the cached bodies in bytes.
+        """
+        return self._size
+
+    def close(self):
+        """
+        Closes the cache index.
+        """
+        with self._lock:
+            self._connection.close()
@@ -1,9 +1,55 @@
+import asyncio
+import re
+import time
 import requests
 
 from bs4 import BeautifulSoup
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from snappy.cache import ResponseCache
+from snappy.frontier import ORDERS, Frontier, SQLiteFrontier
+from snappy.graph import LinkGraph
+from snappy.images import ImageProber
+from snappy.parsers import StreamingLinkExtractor
+from snappy.sessions import pooled_session
+from snappy.stats import Stats
+from snappy.urls import UrlCanonicalizer
+from playwright.async_api import async_playwright
 from playwright.sync_api import sync_playwright
 from urllib.parse import urlparse, urljoin
 
+# In-page expressions used by the Playwright parsers. Each returns everything it extracts in one
+# evaluation, with URLs already resolved by the browser.
+_LINKS_EXPRESSION = "Array.from(document.querySelectorAll('a[href]'), a => a.href).filter(href => typeof href === 'string')"
+_IMAGES_EXPRESSION = ("Array.from(document.images, img => [img.currentSrc || img.src, img.getAttribute('alt'), "
+                      "img.getAttribute('width'), img.getAttribute('height')])")
+_LINKS_SCRIPT = f'() => {_LINKS_EXPRESSION}'
+_IMAGES_SCRIPT = f'() => {_IMAGES_EXPRESSION}'
+_PAGE_SCRIPT = f'() => ({{links: {_LINKS_EXPRESSION}, images: {_IMAGES_EXPRESSION}}})'
+
+# Playwright resource types that are not needed to discover links or read <img> attributes.
+HEAVY_RESOURCE_TYPES = ('image', 'media', 'font')
+
+# The media types of the pages crawled by default. Responses without a Content-Type are crawled too.
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+class SkippedResponse(Exception):
+    """
+    Raised when a response is abandoned as soon as it shows it is not worth downloading and parsing.
+
+    Attributes:
+        url (str): The URL of the response.
+        reason (str): 'content_type' for a body that is not one of the crawled media types, or 'too_large'
+            for a body larger than the maximum body size.
+    """
+
+    def __init__(self, url, reason):
+        super().__init__(f'skipped {url}: {reason}')
+        self.url = url
+        self.reason = reason
+
 
 class BaseCrawler:
     """
@@ -11,15 +57,35 @@ class BaseCrawler:
 
     Attributes:
         base_url (str): The base URL to start crawling from.
-        url_list (set): A set of URLs that have been crawled.
-        adjacency_list (dict): A dictionary representing the adjacency list of the crawled URLs.
+        url_list (UrlList): A set of URLs that have been crawled, in the order they were recorded.
+        adjacency_list (AdjacencyView): A dictionary representing the adjacency list of the crawled URLs.
         crawl_external (bool): A flag indicating whether to crawl external URLs.
         external_crawl_depth (int): The maximum depth to crawl external URLs.
         headers (dict): A dictionary of headers to use for HTTP requests.
-        parser (str): The parser to use for parsing HTML. Must be either 'bs4' or 'playwright'.
+        parser (str): The parser to use for parsing HTML. Must be 'bs4', 'playwright' or 'stream'.
+        concurrency (int): The maximum number of pages fetched at once. None crawls one page at a time.
+        per_host_concurrency (int): The maximum number of pages fetched at once from a single host.
+        pool_size (int): The number of keep-alive connections kept open per host.
+        block_resources (tuple): Playwright resource types that are not downloaded during a Playwright crawl.
+        block_url_patterns (tuple): Regular expressions for request URLs that are not downloaded during a
+            Playwright crawl.
+        canonicalizer (callable): Rewrites every discovered URL into its canonical form, or None.
+        checkpoint (str): The path of the SQLite crawl file the crawl is checkpointed to, or None.
+        cache (ResponseCache): The on-disk response cache used by the bs4 parser, or None.
+        frontier_order (str): The order URLs are crawled in: 'dfs', 'bfs', 'depth' or 'best'.
+        frontier_scorer (callable): Scores URLs for the 'best' order, or None for the default scores.
+        content_types (frozenset): The media types of the responses that are crawled, or None for any.
+        max_body_size (int): The largest response body in bytes that is downloaded, or None for no limit.
+        compact_seen (bool): Whether the frontier keeps the URLs it has started as fingerprints.
+        stats (Stats): Per-stage timings, bytes transferred, response statuses, errors, page counts and the
+            queue depth of the crawler's runs.
     """
 
-    def __init__(self, base_url, crawl_external=False, external_crawl_depth=2, headers=None, parser='bs4'):
+    def __init__(self, base_url, crawl_external=False, external_crawl_depth=2, headers=None, parser='bs4',
+                 concurrency=None, per_host_concurrency=None, pool_size=None, block_resources=None,
+                 block_url_patterns=None, canonicalize=False, checkpoint=None, checkpoint_every=100,
+                 cache_dir=None, cache_max_size=512 * 1024 * 1024, stats_hook=None, frontier_order='dfs',
+                 frontier_scorer=None, content_types=HTML_CONTENT_TYPES, max_body_size=None, compact_seen=False):
         """
         Initializes a new instance of the BaseCrawler class.
 
@@ -28,41 +94,216 @@ class BaseCrawler:
             crawl_external (bool): A flag indicating whether to crawl external URLs.
             external_crawl_depth (int): The maximum depth to crawl external URLs.
             headers (dict): A dictionary of headers to use for HTTP requests.
-            parser (str): The parser to use for parsing HTML. Must be either 'bs4' or 'playwright'.
+            parser (str): The parser to use for parsing HTML. Must be 'bs4', 'playwright' or 'stream'. 'stream'
+                scans the raw response bytes for links and images as they arrive, without building a tree.
+            concurrency (int): The maximum number of pages fetched at once by the asyncio crawl engine.
+                None keeps the sequential crawl.
+            per_host_concurrency (int): The maximum number of pages fetched at once from a single host.
+                None means only the global concurrency limit applies.
+            pool_size (int): The number of keep-alive connections kept open per host by the crawl's
+                HTTP session. Defaults to concurrency, or 10 when crawling sequentially.
+            block_resources (iterable): Playwright resource types, such as 'image', 'font' or 'media', to
+                abort instead of downloading during a Playwright crawl. HEAVY_RESOURCE_TYPES blocks everything
+                that is not needed to find links and <img> attributes.
+            block_url_patterns (iterable): Regular expressions matched against request URLs, such as
+                analytics scripts, to abort during a Playwright crawl.
+            canonicalize (bool or callable): Whether to canonicalize every discovered URL before it is queued,
+                so that spellings of the same page such as /page#section, ?b=2&a=1 and HTTP://Host:80/page are
+                fetched once. True applies the default UrlCanonicalizer rules; a UrlCanonicalizer (or any
+                callable taking and returning a URL) applies its own.
+            checkpoint (str): The path of an SQLite crawl file. The queue, the seen-set and the results are
+                checkpointed to it, and a crawler pointed at an existing file resumes that crawl. Its url_list,
+                adjacency_list and image_list are loaded from the file the first time they are read.
+            checkpoint_every (int): The number of pages crawled between checkpoints. Default is 100.
+            cache_dir (str): A directory for an on-disk cache of the pages fetched by the bs4 parser. Pages are
+                cached with their ETag and Last-Modified headers, and later crawls send conditional requests,
+                reusing the cached body when the server answers 304 Not Modified.
+            cache_max_size (int): The maximum size of the cached pages in bytes. The least recently used pages
+                are evicted beyond it. Default is 512 MB.
+            stats_hook (callable): Called as stats_hook(event, data) on every update of stats, to watch the
+                crawl as it runs. See Stats.
+            frontier_order (str): The order URLs are crawled in. 'dfs' (the default) follows the most recently
+                found link first. 'bfs' crawls URLs in the order they were found, 'depth' crawls the shallowest
+                URLs first, and 'best' crawls the highest-scoring URLs first. With a page limit, the last three
+                cover the top of a site instead of following one long chain of links.
+            frontier_scorer (callable): Scores a URL for the 'best' order, given the URL and its link depth;
+                higher scores are crawled first. Defaults to snappy.frontier.default_score, which prefers
+                shallow URLs with short paths and few query parameters.
+            content_types (iterable): The media types of the responses that are crawled, HTML_CONTENT_TYPES by
+                default. A response of any other type, such as a PDF, a video or a JSON endpoint, is abandoned
+                as soon as its headers arrive and recorded without links. None crawls every response.
+            max_body_size (int): The largest response body in bytes that is downloaded. A larger response is
+                abandoned once its Content-Length, or failing that the bytes received, shows it is over the
+                limit. Default is None, for no limit.
+            compact_seen (bool): Whether the frontier keeps the URLs it has started as 64-bit fingerprints
+                (see snappy.seen.FingerprintSet) rather than full strings. Only the seen-set shrinks: the link
+                graph behind url_list and adjacency_list still keeps every URL string, and the queue and the
+                link depths keep those of the URLs waiting to be crawled, so the crawl's memory still grows
+                with its URLs. In the simulated crawl of benchmarks/bench_seen.py it lowered the peak from
+                1340 to 1136 bytes per URL. A URL is wrongly taken for one already crawled with a probability
+                of n / 2**64 after n URLs. Default is False.
 
         Raises:
-            ValueError: If the parser is not 'bs4' or 'playwright'.
+            ValueError: If the parser is not 'bs4', 'playwright' or 'stream'.
+            ValueError: If frontier_order is not 'dfs', 'bfs', 'depth' or 'best'.
+            ValueError: If concurrency, per_host_concurrency or pool_size is not a positive integer.
+            ValueError: If block_resources includes 'document'.
+            ValueError: If checkpoint_every is not a positive integer.
+            ValueError: If max_body_size is not a positive integer.
+            ValueError: If the checkpoint file belongs to a crawl of a different base_url.
         """
         self.base_url = base_url
-        self.url_list = set()
-        self.adjacency_list = {}
+        self._graph = LinkGraph(self._is_internal_url)
         self.crawl_external = crawl_external
         self.external_crawl_depth = external_crawl_depth
         self.headers = headers
         self.parser = parser
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.pool_size = pool_size or concurrency or 10
+        self.block_resources = frozenset(block_resources or ())
+        self.block_url_patterns = tuple(block_url_patterns or ())
+        self._block_url_regexes = [re.compile(pattern) for pattern in self.block_url_patterns]
+        self.canonicalizer = UrlCanonicalizer() if canonicalize is True else canonicalize or None
+        # The start URL is recorded like any link to it, and decides which hosts are internal.
+        self._start_url = self._canonicalize(base_url).strip('/')
+        self._base_netloc = urlparse(self._start_url).netloc
+        self.checkpoint = checkpoint
+        self.cache = ResponseCache(cache_dir, cache_max_size) if cache_dir else None
+        self.stats = Stats(hook=stats_hook)
+        self.frontier_order = frontier_order
+        self.frontier_scorer = frontier_scorer
+        self.content_types = frozenset(content_types) if content_types is not None else None
+        self.max_body_size = max_body_size
+        self.compact_seen = compact_seen
+        self._session = None
+        self._frontier = None
+        self._results_in_file = False
+        self._deadline = None
+
+        if parser not in ['bs4', 'playwright', 'stream']:
+            raise ValueError('parser must be bs4, playwright or stream')
+        if frontier_order not in ORDERS:
+            raise ValueError('frontier_order must be dfs, bfs, depth or best')
+        if concurrency is not None and concurrency < 1:
+            raise ValueError('concurrency must be a positive integer')
+        if per_host_concurrency is not None and per_host_concurrency < 1:
+            raise ValueError('per_host_concurrency must be a positive integer')
+        if pool_size is not None and pool_size < 1:
+            raise ValueError('pool_size must be a positive integer')
+        if 'document' in self.block_resources:
+            raise ValueError('block_resources cannot include document')
+        if checkpoint_every < 1:
+            raise ValueError('checkpoint_every must be a positive integer')
+        if max_body_size is not None and max_body_size < 1:
+            raise ValueError('max_body_size must be a positive integer')
+
+        if checkpoint:
+            self._frontier = SQLiteFrontier(checkpoint, self._start_url, checkpoint_every,
+                                            frontier_order, frontier_scorer, compact_seen)
+            self._results_in_file = self._frontier.resumed
+
+    @property
+    def url_list(self):
+        """
+        A set of URLs that have been crawled, loaded from the checkpoint file when resuming a crawl. It is a
+        view of the crawl's LinkGraph that can also be indexed by position, in the order URLs were recorded.
+        """
+        self._load_results()
+        return self._graph.urls
+
+    @url_list.setter
+    def url_list(self, value):
+        self._graph.set_urls(value)
+
+    @property
+    def adjacency_list(self):
+        """
+        A dictionary representing the adjacency list of the crawled URLs, loaded from the checkpoint file
+        when resuming a crawl. It is a view of the crawl's LinkGraph, which keeps the links as integer
+        URL IDs and builds each list when it is read.
+        """
+        self._load_results()
+        return self._graph.adjacency
+
+    @adjacency_list.setter
+    def adjacency_list(self, value):
+        self._graph.set_adjacency(value)
+
+    def _load_results(self):
+        """
+        Replaces the results held in memory with those in the checkpoint file, the first time they are needed
+        after resuming a crawl. The file is checkpointed first, so it also holds everything recorded since.
+        """
+        if not self._results_in_file:
+            return
 
-        if parser not in ['bs4', 'playwright']:
-            raise ValueError('parser must be bs4 or playwright')
+        self._results_in_file = False
+        self._frontier.checkpoint()
+        self._graph.set_urls(self._frontier.load_url_list())
+        self._graph.set_adjacency(self._frontier.load_adjacency_list())
+
+    def _add_url(self, url):
+        """
+        Adds a URL to url_list.
+        """
+        self._graph.add_url(url)
+        if self._frontier is not None:
+            self._frontier.add_url(url)
+
+    def _set_links(self, url, links):
+        """
+        Sets the adjacency list entry of a URL.
+        """
+        self._graph.set_links(url, links)
+        if self._frontier is not None:
+            self._frontier.set_links(url, links)
+
+    def close(self):
+        """
+        Checkpoints the crawl and closes the checkpoint file and the response cache, if there are any.
+        """
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        if self._frontier is not None:
+            self._load_results()
+            self._frontier.close()
+            self._frontier = None
+
+    def _open_frontier(self):
+        """
+        Returns the frontier for a run: the checkpointed crawl when there is one, otherwise a new
+        frontier starting from base_url.
+        """
+        if self._frontier is not None:
+            return self._frontier
+
+        frontier = Frontier(self.frontier_order, self.frontier_scorer, self.compact_seen)
+        frontier.push(self._start_url)
+        return frontier
 
     @property
     def internal_urls(self):
         """
         Returns a list of internal URLs that have been crawled.
         """
-        return [url for url in self.url_list if self._is_internal_url(url)]
+        self._load_results()
+        return self._graph.internal_urls
 
     @property
     def external_urls(self):
         """
         Returns a list of external URLs that have been crawled.
         """
-        return [url for url in self.url_list if not self._is_internal_url(url)]
+        self._load_results()
+        return self._graph.external_urls
 
     def _is_internal_url(self, url):
         """
         Returns True if the given URL is internal to the base URL, False otherwise.
         """
-        return urlparse(url).netloc == urlparse(self.base_url).netloc
+        return urlparse(url).netloc == self._base_netloc
 
     def _is_image(self, url):
         """
@@ -70,6 +311,201 @@ class BaseCrawler:
         """
         return url.endswith(('.jpg', '.jpeg', '.png', '.gif'))
 
+    def _should_block(self, request):
+        """
+        Returns True if a Playwright request matches block_resources or block_url_patterns, False otherwise.
+        """
+        if request.resource_type in self.block_resources:
+            return True
+        return any(regex.search(request.url) for regex in self._block_url_regexes)
+
+    def _route_request(self, route):
+        """
+        Playwright route handler that aborts blocked requests and lets the others through.
+        """
+        if self._should_block(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _route_request_async(self, route):
+        """
+        Async version of _route_request.
+        """
+        if self._should_block(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _canonicalize(self, url):
+        """
+        Returns the canonical form of the given URL, or the URL itself when canonicalization is off.
+        """
+        return self.canonicalizer(url) if self.canonicalizer else url
+
+    def _fetch(self, url, stream=False):
+        """
+        Sends a GET request for the given URL with the crawler's headers. Uses the session of the
+        current run when there is one, so connections are reused across pages. Unless the body is
+        streamed, the request goes through the response cache when there is one.
+
+        Args:
+            url (str): The URL to fetch.
+            stream (bool): Whether to leave the body to be read from the response as it arrives.
+
+        Returns:
+            requests.Response: The response.
+        """
+        if self.cache is None or stream:
+            return self._get(url, self.headers, stream)
+
+        headers = dict(self.headers or {})
+        headers.update(self.cache.validators(url))
+        response = self._get(url, headers)
+        if response.status_code == 304:
+            cached = self.cache.revalidated(url, response)
+            if cached is not None:
+                return cached
+            # The body was evicted since the validators were read, so fetch it again.
+            response = self._get(url, self.headers)
+
+        self.cache.store(url, response)
+        return response
+
+    def _get(self, url, headers, stream=False):
+        """
+        Sends a GET request, timing the wait for the response headers as the 'fetch' stage and the download
+        of the body, unless it is streamed, as the 'transfer' stage. The headers are checked before any of
+        the body is read.
+
+        Raises:
+            SkippedResponse: If the response is not one of content_types or is larger than max_body_size.
+        """
+        session = self._session or requests
+        with self.stats.time('fetch'):
+            response = session.get(url, headers=headers, stream=True, timeout=self._time_left())
+        self.stats.record_response(response.status_code)
+        try:
+            self._check_headers(url, response.status_code, response.headers)
+        except SkippedResponse:
+            response.close()
+            raise
+        if stream:
+            return response
+
+        with self.stats.time('transfer'):
+            body = b''.join(self._iter_body(url, response))
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def _check_headers(self, url, status, headers):
+        """
+        Raises SkippedResponse if the headers of a response show its body is not worth downloading.
+        """
+        if status == 304:
+            return
+
+        content_type = headers.get('Content-Type')
+        if self.content_types is not None and content_type:
+            if content_type.split(';', 1)[0].strip().lower() not in self.content_types:
+                raise SkippedResponse(url, 'content_type')
+
+        content_length = headers.get('Content-Length')
+        if self.max_body_size is not None and content_length and content_length.isdigit():
+            if int(content_length) > self.max_body_size:
+                raise SkippedResponse(url, 'too_large')
+
+    def _iter_body(self, url, response, chunk_size=64 * 1024):
+        """
+        Yields the body of a streamed response in chunks as they arrive, counting the bytes received.
+
+        Raises:
+            SkippedResponse: If the body turns out to be larger than max_body_size. The response is closed.
+        """
+        received = 0
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            received += len(chunk)
+            self.stats.add_bytes(len(chunk))
+            if self.max_body_size is not None and received > self.max_body_size:
+                response.close()
+                raise SkippedResponse(url, 'too_large')
+            yield chunk
+
+    def _scan_page(self, url):
+        """
+        Fetches a page and scans the body for links and images as it is downloaded.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            StreamingLinkExtractor: The extractor holding the page's raw hrefs and image attributes.
+        """
+        with self._fetch(url, stream=True) as response:
+            # Only trust a declared charset; HTML without one is far more often UTF-8 than Latin-1.
+            content_type = response.headers.get('Content-Type', '').lower()
+            encoding = response.encoding if 'charset=' in content_type else 'utf-8'
+            extractor = StreamingLinkExtractor(encoding)
+            # Downloading and scanning are interleaved, so they are timed together.
+            with self.stats.time('scan'):
+                for chunk in self._iter_body(url, response):
+                    extractor.feed(chunk)
+                extractor.close()
+        return extractor
+
+    def _time_left(self):
+        """
+        Returns the number of seconds left before the run's deadline, or None if it has none. Once the
+        deadline has passed, a tiny positive value is returned so requests given it as a timeout fail fast.
+        """
+        if self._deadline is None:
+            return None
+        return max(self._deadline - time.monotonic(), 0.001)
+
+    def _goto_options(self):
+        """
+        Returns the options for a Playwright navigation, so it does not outlast the run's deadline.
+        """
+        time_left = self._time_left()
+        return {} if time_left is None else {'timeout': time_left * 1000}
+
+    def _goto(self, page, url):
+        """
+        Navigates a Playwright page to a URL, timing it as the 'navigate' stage.
+        """
+        with self.stats.time('navigate'):
+            response = page.goto(url, **self._goto_options())
+        self.stats.record_response(response.status if response else None)
+        if response:
+            self._check_headers(url, response.status, {'Content-Type': response.headers.get('content-type')})
+        return response
+
+    async def _goto_async(self, page, url):
+        """
+        Navigates a page of Playwright's async API to a URL, timing it as the 'navigate' stage.
+        """
+        with self.stats.time('navigate'):
+            response = await page.goto(url, **self._goto_options())
+        self.stats.record_response(response.status if response else None)
+        if response:
+            self._check_headers(url, response.status, {'Content-Type': response.headers.get('content-type')})
+        return response
+
+    def _evaluate(self, page, script):
+        """
+        Evaluates an extraction script on a Playwright page, timing it as the 'extract' stage.
+        """
+        with self.stats.time('extract'):
+            return page.evaluate(script)
+
+    async def _evaluate_async(self, page, script):
+        """
+        Evaluates an extraction script on a page of Playwright's async API, timing it as the 'extract' stage.
+        """
+        with self.stats.time('extract'):
+            return await page.evaluate(script)
+
     def run(self):
         """
         Runs the crawler.
@@ -102,9 +538,9 @@ class BaseCrawler:
 
     def __getitem__(self, index):
         """
-        Returns the URL at the given index in the list of crawled URLs.
+        Returns the URL at the given index in the list of crawled URLs, in the order they were recorded.
         """
-        return list(self.url_list)[index]
+        return self.url_list[index]
 
     def __contains__(self, url):
         """
@@ -122,17 +558,69 @@ class UrlCrawler(BaseCrawler):
         crawl_external (bool): Whether to crawl external links.
         external_crawl_depth (int): The maximum depth to crawl external links.
         headers (dict): Optional headers to include in requests.
-        parser (str): The parser to use for parsing HTML. Either 'bs4' or 'playwright'.
+        parser (str): The parser to use for parsing HTML. Either 'bs4', 'playwright' or 'stream'.
         limit (int): The maximum number of URLs to crawl.
+        deadline (float): The number of seconds a run may take. Once it has passed, no more pages are started
+            and pages still being fetched are abandoned. Default is None.
+        max_bytes (int): The number of response bytes a run may download with the bs4 and stream parsers.
+            Once it is reached, no more pages are started. Default is None.
+        max_depth (int): The number of links that may be followed from base_url. URLs found deeper are
+            recorded but not crawled. Default is None.
+        max_pages_per_host (int): The maximum number of pages crawled from each host in a run. Default is None.
+        **kwargs: Additional options passed on to BaseCrawler, such as concurrency.
 
     Attributes:
-        url_list (set): A set of all crawled URLs.
+        url_list (UrlList): A set of all crawled URLs.
         adjacency_list (dict): An adjacency list of internal and external links.
+        stop_reason (str): Why the last run stopped before running out of URLs: 'limit', 'deadline' or
+            'max_bytes', or None if it crawled everything it found.
+
+    Raises:
+        ValueError: If deadline, max_bytes, max_depth or max_pages_per_host is negative.
     """
 
-    def __init__(self, base_url, crawl_external=False, external_crawl_depth=2, headers=None, parser='bs4', limit=None):
-        super().__init__(base_url, crawl_external, external_crawl_depth, headers, parser)
+    def __init__(self, base_url, crawl_external=False, external_crawl_depth=2, headers=None, parser='bs4', limit=None,
+                 deadline=None, max_bytes=None, max_depth=None, max_pages_per_host=None, **kwargs):
+        super().__init__(base_url, crawl_external, external_crawl_depth, headers, parser, **kwargs)
         self.limit = limit
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.max_pages_per_host = max_pages_per_host
+        self.stop_reason = None
+        self._start_bytes = 0
+        self._host_pages = Counter()
+
+        for name in ('deadline', 'max_bytes', 'max_depth', 'max_pages_per_host'):
+            if getattr(self, name) is not None and getattr(self, name) < 0:
+                raise ValueError(f'{name} cannot be negative')
+
+    def _parse_urls_playwright(self, page, url):
+        """
+        Get all URLs on a page that Playwright has already navigated to.
+
+        Args:
+            page (playwright.sync_api._generated.Page): The Playwright page object.
+            url (str): The URL of the page.
+
+        Returns:
+            list: A list of URLs on the page.
+        """
+        # Resolve the href of every <a> tag in a single evaluation
+        return self._clean_urls(url, self._evaluate(page, _LINKS_SCRIPT))
+
+    async def _parse_urls_playwright_async(self, page, url):
+        """
+        Get all URLs on a page that Playwright's async API has already navigated to.
+
+        Args:
+            page (playwright.async_api._generated.Page): The Playwright page object.
+            url (str): The URL of the page.
+
+        Returns:
+            list: A list of URLs on the page.
+        """
+        return self._clean_urls(url, await self._evaluate_async(page, _LINKS_SCRIPT))
 
     def _get_urls_playwright(self, page, url):
         """
@@ -145,120 +633,519 @@ class UrlCrawler(BaseCrawler):
         Returns:
             list: A list of URLs on the page.
         """
-        page.goto(url)
-        # Select all <a> tags with href attribute
-        hrefs = page.query_selector_all("//a[@href]")
-        urls = [href.get_attribute('href') for href in hrefs]
-        urls = [urljoin(url, href) for href in urls]
-        urls = [href for href in urls if not self._is_image(href)]
-        urls = [href.strip('/') for href in urls]
-        return urls
+        self._goto(page, url)
+        return self._parse_urls_playwright(page, url)
 
-    def _get_urls(self, url):
+    def _parse_urls(self, url, soup):
         """
-        Get all URLs on a page using BeautifulSoup.
+        Get all URLs from a page parsed with BeautifulSoup.
 
         Args:
-            url (str): The URL of the page to crawl.
+            url (str): The URL of the page.
+            soup (bs4.BeautifulSoup): The parsed page.
 
         Returns:
             list: A list of URLs on the page.
         """
-        response = requests.get(url, headers=self.headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
         hrefs = []
         for link in soup.find_all('a'):
             hrefs.append(link.get('href'))
+        return self._clean_urls(url, hrefs)
+
+    def _clean_urls(self, url, hrefs):
+        """
+        Resolves the hrefs found on a page against its URL and canonicalizes them, dropping empty hrefs
+        and images.
+
+        Args:
+            url (str): The URL of the page.
+            hrefs (list): The raw href values found on the page.
+
+        Returns:
+            list: A list of URLs on the page.
+        """
         hrefs = [href for href in hrefs if href]
         hrefs = [urljoin(url, href) for href in hrefs]
+        if self.canonicalizer:
+            hrefs = [self.canonicalizer(href) for href in hrefs]
         hrefs = [href for href in hrefs if not self._is_image(href)]
         hrefs = [href.strip('/') for href in hrefs]
         return hrefs
 
-    def _run_playwright(self):
+    def _get_soup(self, url):
         """
-        Crawl URLs using Playwright.
+        Fetches a page and parses it with BeautifulSoup.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            bs4.BeautifulSoup: The parsed page.
         """
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            crawled_urls = set()
-            current_external_crawl_depth = 0
-            queue = [self.base_url]
-            count = 0
+        response = self._fetch(url)
+        with self.stats.time('decode'):
+            text = response.text
+        with self.stats.time('parse'):
+            return BeautifulSoup(text, 'html.parser')
+
+    def _get_urls(self, url):
+        """
+        Get all URLs on a page using BeautifulSoup.
+
+        Args:
+            url (str): The URL of the page to crawl.
+
+        Returns:
+            list: A list of URLs on the page.
+        """
+        return self._parse_urls(url, self._get_soup(url))
+
+    def _crawl_page(self, url):
+        """
+        Fetches and parses a single page. Called from worker threads when crawling concurrently,
+        so it must not modify the crawler's state.
+
+        Args:
+            url (str): The URL of the page to crawl.
+
+        Returns:
+            list: A list of URLs on the page, passed on to _record_page.
+        """
+        if self.parser == 'stream':
+            return self._clean_urls(url, self._scan_page(url).links)
+        return self._get_urls(url)
+
+    def _crawl_page_playwright(self, page, url):
+        """
+        Navigates to a single page with Playwright and extracts the same result as _crawl_page.
+
+        Args:
+            page (playwright.sync_api._generated.Page): The Playwright page object.
+            url (str): The URL of the page to crawl.
+
+        Returns:
+            list: A list of URLs on the page, passed on to _record_page.
+        """
+        return self._get_urls_playwright(page, url)
+
+    async def _crawl_page_playwright_async(self, page, url):
+        """
+        Navigates to a single page with Playwright's async API and extracts the same result as _crawl_page.
+
+        Args:
+            page (playwright.async_api._generated.Page): The Playwright page object.
+            url (str): The URL of the page to crawl.
+
+        Returns:
+            list: A list of URLs on the page, passed on to _record_page.
+        """
+        await self._goto_async(page, url)
+        return await self._parse_urls_playwright_async(page, url)
+
+    def _record_page(self, url, page, frontier):
+        """
+        Records the result of _crawl_page and queues the URLs to follow.
+
+        Args:
+            url (str): The URL of the crawled page.
+            page: The result returned by _crawl_page.
+            frontier (Frontier): The crawl frontier.
+        """
+        self._follow_urls(url, page, frontier)
+
+    def _follow_urls(self, url, page_urls, frontier):
+        """
+        Adds the URLs found on a page to the adjacency list and queues the ones that should be crawled.
+
+        Args:
+            url (str): The URL of the crawled page.
+            page_urls (list): The URLs found on the page.
+            frontier (Frontier): The crawl frontier.
+        """
+        self._set_links(url, page_urls)
+        depth = frontier.depths.get(url, 0) + 1
+        for page_url in page_urls:
+            if self.max_depth is not None and depth > self.max_depth:
+                self._add_uncrawled_url(page_url, frontier)
+            elif self._is_internal_url(page_url):
+                frontier.push(page_url, depth)
+            elif self.crawl_external and frontier.external_enqueued < self.external_crawl_depth:
+                if frontier.push(page_url, depth):
+                    frontier.external_enqueued += 1
+            else:
+                self._add_uncrawled_url(page_url, frontier)
+
+    def _add_uncrawled_url(self, url, frontier):
+        """
+        Records a URL that will not be crawled from this link, giving it an empty adjacency list entry unless
+        it already has one. A page crawled earlier, such as the home page a nav link points back to, keeps its links.
+
+        Args:
+            url (str): The URL.
+            frontier (Frontier): The crawl frontier.
+        """
+        self._add_url(url)
+        if url not in frontier.crawled and not self._graph.has_links(url):
+            self._set_links(url, [])
+
+    def _start_budgets(self):
+        """
+        Starts the clock and the byte and per-host counts the budgets of a run are measured against.
+        """
+        self.stop_reason = None
+        self._deadline = time.monotonic() + self.deadline if self.deadline is not None else None
+        self._start_bytes = self.stats.bytes
+        self._host_pages = Counter()
+
+    def _check_budgets(self, frontier, in_flight=0):
+        """
+        Returns the budget that keeps another page from being started, or None if there is none, and keeps
+        it as stop_reason. A spent deadline or byte budget stays spent, but the page limit is checked afresh
+        on every call, since pages in flight that fail or are skipped give their share of it back.
+
+        Args:
+            frontier (Frontier): The crawl frontier.
+            in_flight (int): The number of pages being fetched, which count towards the page limit.
+        """
+        if self.stop_reason in ('deadline', 'max_bytes'):
+            return self.stop_reason
+
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            self.stop_reason = 'deadline'
+        elif self.max_bytes is not None and self.stats.bytes - self._start_bytes >= self.max_bytes:
+            self.stop_reason = 'max_bytes'
+        elif self.limit and frontier.count + in_flight >= self.limit:
+            self.stop_reason = 'limit'
+        else:
+            self.stop_reason = None
+        return self.stop_reason
+
+    def _claim_host(self, url):
+        """
+        Counts a page towards its host's cap. Returns False, counting nothing, if the host has reached it.
+        """
+        if self.max_pages_per_host is None:
+            return True
+
+        host = urlparse(url).netloc
+        if self._host_pages[host] >= self.max_pages_per_host:
+            return False
+        self._host_pages[host] += 1
+        return True
 
-            while queue:
-                if self.limit and count >= self.limit:
+    def _run_sync(self, crawl_page=None):
+        """
+        Crawls one page at a time.
+
+        Args:
+            crawl_page (callable): Fetches and parses a page given its URL. Defaults to _crawl_page.
+        """
+        crawl_page = crawl_page or self._crawl_page
+        frontier = self._open_frontier()
+
+        try:
+            while frontier:
+                if self._check_budgets(frontier):
                     break
 
-                url = queue.pop()
-                if url in crawled_urls:
+                url = frontier.pop()
+                self.stats.set_gauge('queue_depth', len(frontier))
+                if url in frontier.crawled or not self._claim_host(url):
                     continue
 
-                crawled_urls.add(url)
-                self.url_list.add(url)
+                frontier.start(url)
+                self._add_url(url)
 
                 try:
-                    page_urls = self._get_urls_playwright(page, url)
-                    self.adjacency_list[url] = page_urls
-                except:
+                    with self.stats.time('page'):
+                        page = crawl_page(url)
+                except SkippedResponse as e:
+                    self._page_skipped(url, e, frontier)
+                    continue
+                except Exception as e:
+                    self._page_failed(url, e, frontier)
                     continue
 
-                for page_url in page_urls:
-                    if self._is_internal_url(page_url):
-                        queue.append(page_url)
-                    elif self.crawl_external and current_external_crawl_depth < self.external_crawl_depth:
-                        queue.append(page_url)
-                        current_external_crawl_depth += 1
-                    else:
-                        self.url_list.add(page_url)
-                        self.adjacency_list[page_url] = []
+                self._record_page(url, page, frontier)
+                self._page_done(url, frontier)
+        finally:
+            frontier.checkpoint()
+
+    def _page_done(self, url, frontier):
+        """
+        Marks a recorded page as finished and counts it.
+        """
+        frontier.finish(url, True)
+        self.stats.increment('pages_crawled')
+
+    def _page_skipped(self, url, skipped, frontier):
+        """
+        Records a page whose response was abandoned as a page without links. It does not count towards limit.
+        """
+        self._set_links(url, [])
+        frontier.finish(url, False)
+        self.stats.increment('pages_skipped')
+        self.stats.increment(f'skipped_{skipped.reason}')
+
+    def _page_failed(self, url, error, frontier):
+        """
+        Marks a page whose crawl raised as finished and records the error.
+        """
+        frontier.finish(url, False)
+        self.stats.increment('pages_failed')
+        self.stats.record_error('page', error)
+
+    async def _crawl_page_async(self, crawl_page, url):
+        """
+        Awaits crawl_page for the URL, timing it as the 'page' stage.
+        """
+        with self.stats.time('page'):
+            return await crawl_page(url)
+
+    def _next_url(self, frontier, deferred, host_pages):
+        """
+        Returns the next URL to start whose host has fewer than per_host_concurrency pages in flight, or None
+        if there is none. URLs of hosts that are at the limit are taken off the queue and set aside in
+        deferred, so they neither hold a slot while they wait nor keep other hosts' URLs from starting.
+
+        Args:
+            frontier (Frontier): The crawl frontier.
+            deferred (dict): The URLs set aside, in deques by host.
+            host_pages (Counter): The number of pages in flight per host.
+        """
+        if self.per_host_concurrency is None:
+            return frontier.pop() if frontier else None
+
+        for host, urls in deferred.items():
+            if host_pages[host] < self.per_host_concurrency:
+                url = urls.popleft()
+                if not urls:
+                    del deferred[host]
+                return url
+
+        while frontier:
+            url = frontier.pop()
+            host = urlparse(url).netloc
+            if host_pages[host] < self.per_host_concurrency:
+                return url
+            deferred.setdefault(host, deque()).append(url)
+        return None
+
+    async def _run_async(self, crawl_page):
+        """
+        Crawls up to `concurrency` pages at once. Results are recorded on the event loop as pages
+        complete, so url_list and adjacency_list are only ever modified from one thread.
 
-                count += 1
+        Args:
+            crawl_page (callable): Returns an awaitable for the result of fetching and parsing a page,
+                given its URL.
+        """
+        frontier = self._open_frontier()
+        pending = {}
+        deferred = {}
+        host_pages = Counter()
+
+        try:
+            while frontier or pending or deferred:
+                while len(pending) < self.concurrency:
+                    # Pages in flight count towards the limit so it is never overshot.
+                    if self._check_budgets(frontier, len(pending)):
+                        break
+
+                    url = self._next_url(frontier, deferred, host_pages)
+                    if url is None:
+                        break
+                    if url in frontier.crawled or not self._claim_host(url):
+                        continue
+
+                    frontier.start(url)
+                    self._add_url(url)
+                    task = asyncio.ensure_future(self._crawl_page_async(crawl_page, url))
+                    pending[task] = url
+                    host_pages[urlparse(url).netloc] += 1
+
+                self.stats.set_gauge('queue_depth', len(frontier) + sum(map(len, deferred.values())))
+                self.stats.set_gauge('in_flight', len(pending))
+                if not pending:
+                    break
 
+                done, _ = await asyncio.wait(pending, timeout=self._time_left(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url = pending.pop(task)
+                    host_pages[urlparse(url).netloc] -= 1
+                    try:
+                        page = task.result()
+                    except SkippedResponse as e:
+                        self._page_skipped(url, e, frontier)
+                        continue
+                    except Exception as e:
+                        self._page_failed(url, e, frontier)
+                        continue
+
+                    self._record_page(url, page, frontier)
+                    self._page_done(url, frontier)
+
+                if pending and self._check_budgets(frontier) == 'deadline':
+                    # Abandon the pages still in flight; a checkpointed crawl queues them again on resume.
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            for urls in deferred.values():
+                for url in urls:
+                    frontier.requeue(url)
+            frontier.checkpoint()
+
+    async def _run_bs4_async(self):
+        """
+        Crawls with the bs4 parser, fetching and parsing pages in worker threads.
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            await self._run_async(partial(loop.run_in_executor, executor, self._crawl_page))
+
+    def _run_playwright(self):
+        """
+        Crawl URLs using Playwright.
+        """
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            page = browser.new_page()
+            if self.block_resources or self.block_url_patterns:
+                page.route('**/*', self._route_request)
+            self._run_sync(partial(self._crawl_page_playwright, page))
             browser.close()
 
+    async def _crawl_page_pooled(self, pages, url):
+        """
+        Borrows a page from the pool to crawl the URL with, and returns it to the pool afterwards.
+
+        Args:
+            pages (asyncio.Queue): The pool of open Playwright pages.
+            url (str): The URL of the page to crawl.
+
+        Returns:
+            The result of _crawl_page_playwright_async.
+        """
+        page = await pages.get()
+        try:
+            return await self._crawl_page_playwright_async(page, url)
+        finally:
+            pages.put_nowait(page)
+
+    async def _run_playwright_async(self):
+        """
+        Crawl URLs using Playwright's async API, spreading the crawl over `concurrency` pages in one browser.
+        """
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            pages = asyncio.Queue()
+            for _ in range(self.concurrency):
+                page = await browser.new_page()
+                if self.block_resources or self.block_url_patterns:
+                    await page.route('**/*', self._route_request_async)
+                pages.put_nowait(page)
+            await self._run_async(partial(self._crawl_page_pooled, pages))
+            await browser.close()
+
     def run(self):
         """
         Crawl URLs using BeautifulSoup or Playwright, depending on the parser specified.
+        With the bs4 parser, every fetch in the run shares one pooled keep-alive session. When
+        concurrency is set, pages are fetched concurrently, and the Playwright parser crawls with that
+        many pages open in one browser.
+
+        The run stops early, keeping everything recorded so far, once one of its budgets (limit, deadline,
+        max_bytes) runs out. stop_reason tells which.
         """
-        if self.parser == 'playwright':
-            self._run_playwright()
-            return
+        self._start_budgets()
+        try:
+            if self.parser == 'playwright':
+                if self.concurrency:
+                    asyncio.run(self._run_playwright_async())
+                else:
+                    self._run_playwright()
+                return
 
-        crawled_urls = set()
-        current_external_crawl_depth = 0
-        queue = [self.base_url]
-        count = 0
+            self._session = pooled_session(self.pool_size)
+            try:
+                if self.concurrency:
+                    asyncio.run(self._run_bs4_async())
+                else:
+                    self._run_sync()
+            finally:
+                self._session.close()
+                self._session = None
+        finally:
+            # A page cut short by the deadline fails rather than stopping the run, so the run may also have
+            # ended for lack of URLs to follow.
+            if self.stop_reason is None and self._deadline is not None and time.monotonic() >= self._deadline:
+                self.stop_reason = 'deadline'
+            self._deadline = None
+
+
+class ImageInfo:
+    """
+    A compact record describing an image found during a crawl.
 
-        while queue:
-            if self.limit and count >= self.limit:
-                break
+    Fields can be read as attributes or by key, as with the dictionaries ImageCrawler used to store,
+    where the page URL is available under the 'from' key.
 
-            url = queue.pop()
-            if url in crawled_urls:
-                continue
+    Attributes:
+        src (str): The URL of the image.
+        alt (str): The alt text of the image.
+        width (str or int): The width attribute of the image, or its width in pixels once probed.
+        height (str or int): The height attribute of the image, or its height in pixels once probed.
+        format (str): The format of the image, taken from its URL, or read from its header once probed.
+        page_url (str): The URL of the page the image was found on.
+        size (int): The size of the image file in bytes, once probed.
+    """
 
-            crawled_urls.add(url)
-            self.url_list.add(url)
+    __slots__ = ('src', 'alt', 'width', 'height', 'format', 'page_url', 'size')
 
-            try:
-                page_urls = self._get_urls(url)
-                self.adjacency_list[url] = page_urls
-            except:
-                continue
+    _keys = {'src': 'src', 'alt': 'alt', 'width': 'width', 'height': 'height', 'format': 'format',
+             'from': 'page_url', 'size': 'size'}
 
-            for page_url in page_urls:
-                if self._is_internal_url(page_url):
-                    queue.append(page_url)
-                elif self.crawl_external and current_external_crawl_depth < self.external_crawl_depth:
-                    queue.append(page_url)
-                    current_external_crawl_depth += 1
-                else:
-                    self.url_list.add(page_url)
-                    self.adjacency_list[page_url] = []
+    def __init__(self, src, alt=None, width=None, height=None, format=None, page_url=None, size=None):
+        self.src = src
+        self.alt = alt
+        self.width = width
+        self.height = height
+        self.format = format
+        self.page_url = page_url
+        self.size = size
 
-            count += 1
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._keys[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        """
+        Returns the value for the given key, or default if the key does not exist.
+        """
+        return getattr(self, self._keys[key]) if key in self._keys else default
+
+    def keys(self):
+        """
+        Returns the keys of the record.
+        """
+        return self._keys.keys()
+
+    def to_dict(self):
+        """
+        Returns the record as a dictionary.
+        """
+        return {key: getattr(self, attr) for key, attr in self._keys.items()}
+
+    def __eq__(self, other):
+        if not isinstance(other, ImageInfo):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+    def __repr__(self):
+        return f'<ImageInfo src={self.src}>'
 
 
 class ImageCrawler(UrlCrawler):
@@ -270,142 +1157,201 @@ class ImageCrawler(UrlCrawler):
     crawl_external (bool): Whether to crawl external URLs.
     external_crawl_depth (int): The maximum depth to crawl external URLs.
     headers (dict): A dictionary of headers to include in requests.
-    parser (str): The parser to use for parsing HTML. Either 'bs4' or 'playwright'.
+    parser (str): The parser to use for parsing HTML. Either 'bs4', 'playwright' or 'stream'.
     limit (int): The maximum number of pages to crawl.
+    probe_images (bool): Whether to probe every image found once the crawl is done, reading its true format,
+        pixel dimensions and file size from the first few KB of the file. See probe.
+    probe_concurrency (int): The maximum number of images probed at once. Default is 8.
+    probe_bytes (int): The number of bytes read from each probed image. Default is 16 KB.
+    **kwargs: Additional options passed on to BaseCrawler, such as concurrency.
 
     Attributes:
-    image_list (list): A list of dictionaries containing information about crawled images.
+    image_list (list): A list of ImageInfo records for the crawled images, one per unique src.
+
+    Raises:
+    ValueError: If probe_concurrency or probe_bytes is not a positive integer.
     """
 
-    def __init__(self, base_url, crawl_external=False, external_crawl_depth=2, headers=None, parser='bs4', limit=None):
+    def __init__(self, base_url, crawl_external=False, external_crawl_depth=2, headers=None, parser='bs4', limit=None,
+                 probe_images=False, probe_concurrency=8, probe_bytes=16 * 1024, **kwargs):
         super().__init__(base_url, crawl_external,
-                         external_crawl_depth, headers, parser, limit)
+                         external_crawl_depth, headers, parser, limit, **kwargs)
+        if probe_concurrency < 1:
+            raise ValueError('probe_concurrency must be a positive integer')
+        if probe_bytes < 1:
+            raise ValueError('probe_bytes must be a positive integer')
+
+        self.probe_images = probe_images
+        self.prober = ImageProber(probe_concurrency, probe_bytes, max(probe_bytes, 64 * 1024), headers, self.stats)
         self.image_list = []
+        self._image_srcs = self._frontier.load_image_srcs() if self._results_in_file else set()
+        self._probed_srcs = set()
 
-    def _get_image_info_playwright(self, page, url):
-        image_list = []
-        page.goto(url)
+    @property
+    def image_list(self):
+        """
+        A list of ImageInfo records for the crawled images, loaded from the checkpoint file when resuming a crawl.
+        """
+        self._load_results()
+        return self._image_list
 
-        # Select all image elements
-        images = page.query_selector_all('img')
+    @image_list.setter
+    def image_list(self, value):
+        self._image_list = value
 
-        for image in images:
-            src = image.get_attribute('src')
-            alt = image.get_attribute('alt')
-            width = image.get_attribute('width')
-            height = image.get_attribute('height')
-            image_format = src.split('.')[-1]
-            self.image_list.append({'src': src, 'alt': alt, 'width': width,
-                                    'height': height, 'format': image_format, 'from': url})
+    def _load_results(self):
+        if not self._results_in_file:
+            return
 
-        return image_list
+        super()._load_results()
+        self._image_list = [ImageInfo(*image) for image in self._frontier.load_images()]
 
-    def _get_image_info(self, url):
+    def _make_image_info(self, url, images):
+        """
+        Builds records for the images found on a page, skipping images without a src and those already recorded.
+
+        Args:
+            url (str): The URL of the page.
+            images (list): (src, alt, width, height) tuples for the images on the page.
+
+        Returns:
+            list: A list of ImageInfo records.
+        """
         image_list = []
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        for img in soup.find_all('img'):
-            src = urljoin(self.base_url, img.get('src'))
-            matching_src = any([src == image['src']
-                               for image in self.image_list])
-            if matching_src:
+        for src, alt, width, height in images:
+            if not src or src in self._image_srcs:
                 continue
 
-            alt = img.get('alt')
-            width = img.get('width')
-            height = img.get('height')
             image_format = src.split('.')[-1]
-            image_list.append({'src': src, 'alt': alt, 'width': width,
-                              'height': height, 'format': image_format, 'from': url})
+            image_list.append(ImageInfo(src, alt, width, height, image_format, url))
         return image_list
 
-    def _run_playwright(self):
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            crawled_urls = set()
-            current_external_crawl_depth = 0
-            queue = [self.base_url]
-            count = 0
+    def _parse_image_info_playwright(self, page, url):
+        """
+        Get information about all images on a page that Playwright has already navigated to.
+        """
+        # Read every image's attributes in a single evaluation
+        return self._make_image_info(url, self._evaluate(page, _IMAGES_SCRIPT))
 
-            while queue:
-                if self.limit and count >= self.limit:
-                    break
+    async def _parse_image_info_playwright_async(self, page, url):
+        """
+        Get information about all images on a page that Playwright's async API has already navigated to.
+        """
+        return self._make_image_info(url, await self._evaluate_async(page, _IMAGES_SCRIPT))
 
-                url = queue.pop()
-                if url in crawled_urls:
-                    continue
+    def _get_image_info_playwright(self, page, url):
+        self._goto(page, url)
+        return self._parse_image_info_playwright(page, url)
 
-                crawled_urls.add(url)
-                self.url_list.add(url)
+    def _parse_image_info(self, url, soup):
+        """
+        Get information about all images on a page parsed with BeautifulSoup.
+        """
+        images = [(urljoin(self.base_url, img.get('src')), img.get('alt'), img.get('width'), img.get('height'))
+                  for img in soup.find_all('img')]
+        return self._make_image_info(url, images)
 
-                try:
-                    page_images = self._get_image_info_playwright(page, url)
-                    self.image_list.extend(page_images)
-                except:
-                    continue
+    def _get_image_info(self, url):
+        return self._parse_image_info(url, self._get_soup(url))
 
-                try:
-                    page_urls = self._get_urls_playwright(page, url)
-                    self.adjacency_list[url] = page_urls
-                except:
-                    continue
+    def _crawl_page(self, url):
+        """
+        Fetches and parses a single page once, taking both its images and its URLs from the same document.
 
-                for page_url in page_urls:
-                    if self._is_internal_url(page_url):
-                        queue.append(page_url)
-                    elif self.crawl_external and current_external_crawl_depth < self.external_crawl_depth:
-                        queue.append(page_url)
-                        current_external_crawl_depth += 1
-                    else:
-                        self.url_list.add(page_url)
-                        self.adjacency_list[page_url] = []
+        Args:
+            url (str): The URL of the page to crawl.
 
-                count += 1
+        Returns:
+            tuple: A list of image records and a list of URLs on the page.
+        """
+        if self.parser == 'stream':
+            extractor = self._scan_page(url)
+            images = [(urljoin(self.base_url, src), alt, width, height)
+                      for src, alt, width, height in extractor.images]
+            return self._make_image_info(url, images), self._clean_urls(url, extractor.links)
 
-            browser.close()
+        soup = self._get_soup(url)
+        return self._parse_image_info(url, soup), self._parse_urls(url, soup)
 
-    def run(self):
-        if self.parser == 'playwright':
-            self._run_playwright()
-            return
+    def _crawl_page_playwright(self, page, url):
+        """
+        Navigates to a single page once, taking both its images and its URLs from the same document.
 
-        crawled_urls = set()
-        current_external_crawl_depth = 0
-        queue = [self.base_url]
-        count = 0
+        Args:
+            page (playwright.sync_api._generated.Page): The Playwright page object.
+            url (str): The URL of the page to crawl.
 
-        while queue:
-            if self.limit and count >= self.limit:
-                break
+        Returns:
+            tuple: A list of image records and a list of URLs on the page.
+        """
+        self._goto(page, url)
+        extracted = self._evaluate(page, _PAGE_SCRIPT)
+        return self._make_image_info(url, extracted['images']), self._clean_urls(url, extracted['links'])
 
-            url = queue.pop()
-            if url in crawled_urls:
-                continue
+    async def _crawl_page_playwright_async(self, page, url):
+        """
+        Navigates to a single page once with Playwright's async API, taking both its images and its URLs
+        from the same document.
 
-            crawled_urls.add(url)
-            self.url_list.add(url)
+        Args:
+            page (playwright.async_api._generated.Page): The Playwright page object.
+            url (str): The URL of the page to crawl.
 
-            try:
-                page_images = self._get_image_info(url)
-                self.image_list.extend(page_images)
-            except:
-                continue
+        Returns:
+            tuple: A list of image records and a list of URLs on the page.
+        """
+        await self._goto_async(page, url)
+        extracted = await self._evaluate_async(page, _PAGE_SCRIPT)
+        return self._make_image_info(url, extracted['images']), self._clean_urls(url, extracted['links'])
 
-            try:
-                page_urls = self._get_urls(url)
-                self.adjacency_list[url] = page_urls
-            except:
+    def _add_images(self, images):
+        """
+        Adds the images whose src has not been seen yet to image_list.
+
+        Args:
+            images (list): A list of ImageInfo records.
+        """
+        for image in images:
+            if image.src in self._image_srcs:
                 continue
+            self._image_srcs.add(image.src)
+            self._image_list.append(image)
+            if self._frontier is not None:
+                self._frontier.add_image(image)
 
-            for page_url in page_urls:
-                if self._is_internal_url(page_url):
-                    queue.append(page_url)
-                elif self.crawl_external and current_external_crawl_depth < self.external_crawl_depth:
-                    queue.append(page_url)
-                    current_external_crawl_depth += 1
-                else:
-                    self.url_list.add(page_url)
-                    self.adjacency_list[page_url] = []
+    def _record_page(self, url, page, frontier):
+        page_images, page_urls = page
+        self._add_images(page_images)
+        self._follow_urls(url, page_urls, frontier)
+
+    def probe(self):
+        """
+        Probes the images in image_list that have not been probed yet, fetching only the first probe_bytes of
+        each with a Range request, over pooled connections and at most probe_concurrency at a time. The
+        format, width and height of every image whose header could be read are replaced with the ones in
+        its header, and its size is set to the size of the file. Images that fail to probe keep the values
+        taken from the page. Each probe is timed as the 'probe' stage of stats.
+
+        Probed values are kept in memory only, not in the checkpoint file.
+        """
+        images = [image for image in self.image_list if image.src not in self._probed_srcs]
+        results = self.prober.probe_all(image.src for image in images)
+        for image in images:
+            result = results.get(image.src)
+            if result is None:
+                continue
+            self._probed_srcs.add(image.src)
+            image.format = result.format
+            if result.width is not None:
+                image.width, image.height = result.width, result.height
+            image.size = result.size
+        self.stats.increment('images_probed', len(results))
 
-            count += 1
+    def run(self):
+        """
+        Crawls pages as UrlCrawler.run does, recording the images on them, then probes the images if
+        probe_images is set.
+        """
+        super().run()
+        if self.probe_images:
+            self.probe()
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import os
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    np = None
+    Image = None
+
+DiffResult = namedtuple('DiffResult', ['changed', 'hash_distance', 'diff_ratio'])
+DiffResult.__doc__ = """
+The outcome of comparing a new screenshot with the previous one.
+
+Attributes:
+    changed (bool): Whether the screenshot differs from the previous one beyond the thresholds.
+    hash_distance (int): The number of differing bits between the perceptual hashes, or None if not computed.
+    diff_ratio (float): The fraction of pixels that differ, or None if not computed.
+"""
+
+
+def difference_hash(pixels, hash_size=8):
+    """
+    Computes the difference hash of an image: a perceptual hash that is stable under small rendering
+    differences such as antialiasing.
+
+    Args:
+        pixels (numpy.ndarray): The image as a height x width x channels array.
+        hash_size (int): The hash is hash_size * hash_size bits. Default is 8.
+
+    Returns:
+        numpy.ndarray: The hash as a flat boolean array.
+    """
+    gray = Image.fromarray(pixels).convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    gray = np.asarray(gray, dtype=np.int16)
+    return (gray[:, 1:] > gray[:, :-1]).ravel()
+
+
+def pixel_diff_ratio(old, new, tolerance=8):
+    """
+    Returns the fraction of pixels whose channels differ by more than tolerance between two images.
+
+    Args:
+        old (numpy.ndarray): The previous image as a height x width x channels array.
+        new (numpy.ndarray): The new image, with the same shape.
+        tolerance (int): The largest per-channel difference still counted as equal. Default is 8.
+
+    Returns:
+        float: The fraction of differing pixels, between 0 and 1.
+    """
+    difference = np.abs(old.astype(np.int16) - new.astype(np.int16)).max(axis=2)
+    return float(np.count_nonzero(difference > tolerance)) / difference.size
+
+
+class VisualDiff:
+    """
+    Decides whether a new screenshot has changed since the previous one saved at the same path.
+
+    Byte-identical captures are unchanged without being decoded. Otherwise both images are decoded and
+    compared in two steps: a perceptual hash rejects clearly different pages cheaply, and a vectorized
+    per-pixel comparison measures the share of pixels that changed.
+
+    Requires numpy and Pillow (pip install swift-snappy[diff]).
+
+    Args:
+        threshold (float): The fraction of differing pixels above which a capture counts as changed.
+            Default is 0.001.
+        tolerance (int): The largest per-channel difference still counted as equal. Default is 8.
+        max_hash_distance (int): The number of differing hash bits above which a capture counts as changed
+            without comparing pixels. Default is 10.
+        content_store (str): A directory to keep changed captures in under the SHA-256 of their bytes. The
+            screenshot path is then a hard link to the stored file, so identical captures of different
+            URLs share one file on disk. Default is None.
+
+    Raises:
+        ImportError: If numpy or Pillow is not installed.
+    """
+
+    def __init__(self, threshold=0.001, tolerance=8, max_hash_distance=10, content_store=None):
+        if np is None:
+            raise ImportError('VisualDiff requires numpy and Pillow: pip install swift-snappy[diff]')
+
+        self.threshold = threshold
+        self.tolerance = tolerance
+        self.max_hash_distance = max_hash_distance
+        self.content_store = content_store
+
+    def _decode(self, data):
+        """
+        Decodes image bytes into an RGB array.
+        """
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert('RGB'))
+
+    def compare(self, data, path):
+        """
+        Compares a new capture with the image saved at path.
+
+        Args:
+            data (bytes): The new capture.
+            path (str): The path of the previous capture.
+
+        Returns:
+            DiffResult: Whether the capture changed, and the measurements that decided it.
+        """
+        try:
+            with open(path, 'rb') as previous_file:
+                previous = previous_file.read()
+        except OSError:
+            return DiffResult(True, None, None)
+
+        if previous == data:
+            return DiffResult(False, 0, 0.0)
+
+        try:
+            old = self._decode(previous)
+        except (OSError, ValueError):
+            # A truncated or corrupt previous capture is replaced, as a missing one is.
+            return DiffResult(True, None, None)
+        new = self._decode(data)
+        if old.shape != new.shape:
+            return DiffResult(True, None, None)
+
+        hash_distance = int(np.count_nonzero(difference_hash(old) != difference_hash(new)))
+        if hash_distance > self.max_hash_distance:
+            return DiffResult(True, hash_distance, None)
+
+        diff_ratio = pixel_diff_ratio(old, new, self.tolerance)
+        return DiffResult(diff_ratio > self.threshold, hash_distance, diff_ratio)
+
+    def save(self, data, path):
+        """
+        Writes a changed capture to path, through the content store when there is one.
+
+        Args:
+            data (bytes): The capture.
+            path (str): The path to save it at.
+        """
+        # Always write through a new file, so a previous capture that is a link into the content store
+        # is replaced rather than overwritten in place.
+        temp_path = path + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        if not self.content_store:
+            with open(temp_path, 'wb') as capture_file:
+                capture_file.write(data)
+            os.replace(temp_path, path)
+            return
+
+        os.makedirs(self.content_store, exist_ok=True)
+        extension = os.path.splitext(path)[1]
+        stored_path = os.path.join(self.content_store, hashlib.sha256(data).hexdigest() + extension)
+        if not os.path.exists(stored_path):
+            with open(stored_path, 'wb') as capture_file:
+                capture_file.write(data)
+
+        os.link(stored_path, temp_path)
+        os.replace(temp_path, path)
@@ -0,0 +1,456 @@
+import heapq
+import json
+import sqlite3
+
+from collections import deque
+from urllib.parse import urlsplit
+
+from snappy.seen import FingerprintSet
+
+ORDERS = ('dfs', 'bfs', 'depth', 'best')
+
+
+def default_score(url, depth):
+    """
+    Scores a URL for the best-first ordering. Shallow URLs with short paths and few query parameters score
+    highest, so the crawl covers a site's main pages before it wanders into pagination chains, calendars
+    and faceted search.
+
+    Args:
+        url (str): The URL.
+        depth (int): The link depth it was found at.
+
+    Returns:
+        float: The score. URLs with higher scores are crawled first.
+    """
+    parts = urlsplit(url)
+    segments = sum(1 for segment in parts.path.split('/') if segment)
+    params = parts.query.count('&') + 1 if parts.query else 0
+    return -(2 * depth + segments + 2 * params)
+
+
+class _StackQueue:
+    """
+    Queue entries crawled last in, first out.
+    """
+
+    def __init__(self):
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def push(self, seq, url, depth):
+        self._entries.append((seq, url))
+
+    def pop(self):
+        return self._entries.pop()
+
+    def entries(self):
+        return iter(self._entries)
+
+
+class _FifoQueue(_StackQueue):
+    """
+    Queue entries crawled first in, first out.
+    """
+
+    def __init__(self):
+        self._entries = deque()
+
+    def pop(self):
+        return self._entries.popleft()
+
+
+class _PriorityQueue:
+    """
+    Queue entries crawled lowest priority value first, and first in, first out among equals.
+
+    Args:
+        priority (callable): Returns the priority value of a URL given the URL and its depth.
+    """
+
+    def __init__(self, priority):
+        self._priority = priority
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, seq, url, depth):
+        heapq.heappush(self._heap, (self._priority(url, depth), seq, url))
+
+    def pop(self):
+        _, seq, url = heapq.heappop(self._heap)
+        return seq, url
+
+    def entries(self):
+        return ((seq, url) for _, seq, url in self._heap)
+
+
+class Frontier:
+    """
+    The state of a crawl in progress.
+
+    URLs waiting to be crawled are queued in one of these orders:
+
+        'dfs': depth-first. The URL queued last is crawled next, and a URL found again is queued again.
+        'bfs': breadth-first. URLs are crawled in the order they were first found.
+        'depth': shallowest first. URLs are crawled by link depth, and a URL found again at a smaller
+            depth moves up.
+        'best': best-first. URLs are crawled highest score first, scored by scorer(url, depth).
+
+    A URL is started when it is taken off the queue and finished once its page has been fetched (or has
+    failed), and a started URL is never queued or crawled again.
+
+    The frontier also tracks the link depth of every URL that is queued or being crawled: the number of
+    links followed from the start URL to reach it by the shortest path found so far.
+
+    The frontier is also told about every result the crawler records, so that subclasses can persist
+    the crawl. The in-memory frontier ignores them.
+
+    Args:
+        order (str): The crawl order: 'dfs', 'bfs', 'depth' or 'best'. Default is 'dfs'.
+        scorer (callable): Scores a URL for the 'best' order, given the URL and its depth. Default is
+            default_score.
+        compact (bool): Whether to keep the started URLs as 64-bit fingerprints in a FingerprintSet instead
+            of a set of strings. Default is False.
+
+    Attributes:
+        crawled (set or FingerprintSet): The URLs that have been started.
+        count (int): The number of pages crawled successfully.
+        external_enqueued (int): The number of external URLs queued for crawling.
+        depths (dict): The link depth of each URL that is queued or being crawled.
+
+    Raises:
+        ValueError: If order is not 'dfs', 'bfs', 'depth' or 'best'.
+    """
+
+    def __init__(self, order='dfs', scorer=None, compact=False):
+        if order not in ORDERS:
+            raise ValueError('order must be dfs, bfs, depth or best')
+
+        self.order = order
+        self.scorer = scorer or default_score
+        self.crawled = FingerprintSet() if compact else set()
+        self.depths = {}
+        self.count = 0
+        self.external_enqueued = 0
+        self._seq = 0
+
+        if order == 'dfs':
+            self._queue = _StackQueue()
+        elif order == 'bfs':
+            self._queue = _FifoQueue()
+        elif order == 'depth':
+            self._queue = _PriorityQueue(lambda url, depth: depth)
+        else:
+            self._queue = _PriorityQueue(lambda url, depth: -self.scorer(url, depth))
+
+    def __len__(self):
+        """
+        Returns the number of URLs waiting to be crawled.
+        """
+        return len(self._queue)
+
+    @property
+    def queue(self):
+        """
+        The URLs waiting to be crawled, in the order they were queued.
+        """
+        return [url for _, url in sorted(self._queue.entries())]
+
+    def push(self, url, depth=0):
+        """
+        Queues a URL to be crawled, unless it has been started already. Apart from the 'dfs' order, a URL
+        that is already queued is only queued again if it was found at a smaller depth.
+
+        Args:
+            url (str): The URL to queue.
+            depth (int): The link depth the URL was found at. A URL found again keeps the smallest depth.
+                Default is 0.
+
+        Returns:
+            bool: Whether the URL was queued.
+        """
+        if url in self.crawled:
+            return False
+
+        known_depth = self.depths.get(url)
+        if known_depth is not None and self.order != 'dfs':
+            if self.order == 'bfs' or depth >= known_depth:
+                return False
+        if known_depth is None or depth < known_depth:
+            self.depths[url] = depth
+
+        self._enqueue(self._seq, url)
+        self._seq += 1
+        return True
+
+    def _enqueue(self, seq, url):
+        """
+        Adds an entry to the queue. seq orders the entries by the time they were queued.
+        """
+        self._queue.push(seq, url, self.depths[url])
+
+    def pop(self):
+        """
+        Removes and returns the next URL to crawl.
+        """
+        return self._dequeue()[1]
+
+    def _dequeue(self):
+        """
+        Removes and returns the next (seq, url) entry of the queue.
+        """
+        return self._queue.pop()
+
+    def requeue(self, url):
+        """
+        Puts back a URL that was taken off the queue but not started, at its known depth.
+        """
+        if url in self.crawled:
+            return
+        self.depths.setdefault(url, 0)
+        self._enqueue(self._seq, url)
+        self._seq += 1
+
+    def start(self, url):
+        """
+        Marks a URL as taken for crawling.
+        """
+        self.crawled.add(url)
+
+    def finish(self, url, success):
+        """
+        Marks a started URL as done.
+
+        Args:
+            url (str): The URL of the page.
+            success (bool): Whether the page was fetched and recorded.
+        """
+        self.depths.pop(url, None)
+        if success:
+            self.count += 1
+
+    def add_url(self, url):
+        """
+        Called when the crawler adds a URL to url_list.
+        """
+
+    def set_links(self, url, links):
+        """
+        Called when the crawler sets the adjacency list entry of a URL.
+        """
+
+    def add_image(self, image):
+        """
+        Called when the crawler adds an image to image_list.
+        """
+
+    def checkpoint(self):
+        """
+        Saves the state of the crawl, if the frontier is persistent.
+        """
+
+    def close(self):
+        """
+        Releases any resources held by the frontier.
+        """
+
+
+class SQLiteFrontier(Frontier):
+    """
+    A frontier that checkpoints the crawl to an SQLite file, so an interrupted crawl can be resumed.
+
+    The file holds the queue, the seen-set, link depths and counters, together with the crawl's url_list,
+    adjacency_list and image_list. Changes are buffered in memory and written in one transaction every
+    checkpoint_every finished pages, and whenever checkpoint is called.
+
+    Opening an existing file loads the queue and the seen-set so the crawl carries on where it stopped, in
+    whichever order the frontier is given.
+    Pages that were still being fetched at the last checkpoint are queued again. The recorded results are
+    left in the file until they are asked for with load_url_list, load_adjacency_list and load_images.
+
+    Args:
+        path (str): The path of the crawl file. It is created if it does not exist.
+        start_url (str): The URL a new crawl starts from. An existing file must have been started from it.
+        checkpoint_every (int): The number of finished pages between checkpoints. Default is 100.
+        order (str): The crawl order. See Frontier. Default is 'dfs'.
+        scorer (callable): Scores a URL for the 'best' order. See Frontier. Default is default_score.
+        compact (bool): Whether to keep the seen-set in memory as URL fingerprints. The file still holds the
+            full URLs. See Frontier. Default is False.
+
+    Attributes:
+        resumed (bool): Whether the frontier was loaded from an existing crawl.
+
+    Raises:
+        ValueError: If the file belongs to a crawl started from a different URL.
+    """
+
+    def __init__(self, path, start_url, checkpoint_every=100, order='dfs', scorer=None, compact=False):
+        super().__init__(order, scorer, compact)
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._create_tables()
+
+        # Changes not yet written to the file.
+        self._pushed = {}
+        self._popped = []
+        self._seen = {}
+        self._depths = {}
+        self._urls = []
+        self._links = {}
+        self._images = []
+        self._since_checkpoint = 0
+
+        stored_url = self._get_meta('start_url')
+        self.resumed = stored_url is not None
+        if self.resumed:
+            if stored_url != start_url:
+                self._connection.close()
+                raise ValueError(f'{path} is a crawl of {stored_url}, not {start_url}')
+            self._load_state()
+        else:
+            self._set_meta('start_url', start_url)
+            self.push(start_url)
+            self.checkpoint()
+
+    def _create_tables(self):
+        with self._connection:
+            self._connection.executescript('''
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS queue (pos INTEGER PRIMARY KEY, url TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY, done INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS depths (url TEXT PRIMARY KEY, depth INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY);
+                CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, links TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS images (id INTEGER PRIMARY KEY, src TEXT, alt TEXT, width TEXT,
+                                                   height TEXT, format TEXT, page_url TEXT);
+            ''')
+
+    def _get_meta(self, key):
+        row = self._connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def _load_state(self):
+        """
+        Loads the queue, the seen-set, the link depths and the counters from the file.
+        """
+        self.depths = dict(self._connection.execute('SELECT url, depth FROM depths'))
+        for seq, url in self._connection.execute('SELECT pos, url FROM queue ORDER BY pos'):
+            self.depths.setdefault(url, 0)
+            super()._enqueue(seq, url)
+            self._seq = seq + 1
+        self.count = int(self._get_meta('count') or 0)
+        self.external_enqueued = int(self._get_meta('external_enqueued') or 0)
+
+        for url, done in self._connection.execute('SELECT url, done FROM seen'):
+            if done:
+                self.crawled.add(url)
+            else:
+                # The page was in flight when the crawl stopped, so it was never recorded.
+                self.depths.setdefault(url, 0)
+                self._enqueue(self._seq, url)
+                self._seq += 1
+
+    def push(self, url, depth=0):
+        previous = self.depths.get(url)
+        queued = super().push(url, depth)
+        if self.depths.get(url) != previous:
+            self._depths[url] = self.depths[url]
+        return queued
+
+    def _enqueue(self, seq, url):
+        super()._enqueue(seq, url)
+        self._pushed[seq] = url
+
+    def _dequeue(self):
+        seq, url = super()._dequeue()
+        # Entries queued and taken since the last checkpoint never need to reach the file.
+        if self._pushed.pop(seq, None) is None:
+            self._popped.append(seq)
+        return seq, url
+
+    def start(self, url):
+        super().start(url)
+        self._seen[url] = 0
+
+    def finish(self, url, success):
+        super().finish(url, success)
+        self._seen[url] = 1
+        self._depths[url] = None
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def add_url(self, url):
+        self._urls.append(url)
+
+    def set_links(self, url, links):
+        self._links[url] = links
+
+    def add_image(self, image):
+        self._images.append((image.src, image.alt, image.width, image.height, image.format, image.page_url))
+
+    def checkpoint(self):
+        """
+        Writes every buffered change to the file in one transaction.
+        """
+        with self._connection:
+            self._connection.executemany('DELETE FROM queue WHERE pos = ?', ((seq,) for seq in self._popped))
+            self._connection.executemany('INSERT INTO queue (pos, url) VALUES (?, ?)', self._pushed.items())
+            self._connection.executemany('INSERT OR REPLACE INTO seen (url, done) VALUES (?, ?)', self._seen.items())
+            self._connection.executemany('INSERT OR REPLACE INTO depths (url, depth) VALUES (?, ?)',
+                                         ((url, depth) for url, depth in self._depths.items() if depth is not None))
+            self._connection.executemany('DELETE FROM depths WHERE url = ?',
+                                         ((url,) for url, depth in self._depths.items() if depth is None))
+            self._connection.executemany('INSERT OR IGNORE INTO urls (url) VALUES (?)', ((url,) for url in self._urls))
+            self._connection.executemany('INSERT OR REPLACE INTO links (url, links) VALUES (?, ?)',
+                                         ((url, json.dumps(links)) for url, links in self._links.items()))
+            self._connection.executemany('INSERT INTO images (src, alt, width, height, format, page_url) '
+                                         'VALUES (?, ?, ?, ?, ?, ?)', self._images)
+            self._set_meta('count', self.count)
+            self._set_meta('external_enqueued', self.external_enqueued)
+
+        self._pushed = {}
+        self._popped = []
+        # Pages still in flight stay buffered so they are written again once they finish.
+        self._seen = {url: done for url, done in self._seen.items() if not done}
+        self._depths = {}
+        self._urls = []
+        self._links = {}
+        self._images = []
+        self._since_checkpoint = 0
+
+    def load_url_list(self):
+        """
+        Returns the url_list saved in the file, as a list in the order the URLs were recorded.
+        """
+        return [url for url, in self._connection.execute('SELECT url FROM urls ORDER BY rowid')]
+
+    def load_adjacency_list(self):
+        """
+        Returns the adjacency_list saved in the file.
+        """
+        return {url: json.loads(links) for url, links in self._connection.execute('SELECT url, links FROM links')}
+
+    def load_images(self):
+        """
+        Returns the images saved in the file as (src, alt, width, height, format, page_url) tuples.
+        """
+        return self._connection.execute('SELECT src, alt, width, height, format, page_url FROM images ORDER BY id').fetchall()
+
+    def load_image_srcs(self):
+        """
+        Returns the set of image srcs saved in the file.
+        """
+        return {src for src, in self._connection.execute('SELECT src FROM images')}
+
+    def close(self):
+        self.checkpoint()
+        self._connection.close()
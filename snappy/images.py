@@ -0,0 +1,265 @@
+import re
+import struct
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from snappy.sessions import pooled_session
+
+ProbeResult = namedtuple('ProbeResult', ['format', 'width', 'height', 'size'])
+ProbeResult.__doc__ = """
+What the first bytes of an image revealed about it.
+
+Attributes:
+    format (str): The format of the image, such as 'png', 'jpeg' or 'webp'.
+    width (int): The width of the image in pixels, or None if it was not found in the bytes read.
+    height (int): The height of the image in pixels, or None if it was not found in the bytes read.
+    size (int): The size of the whole image file in bytes, or None if the server did not tell.
+"""
+
+# JPEG markers that start a frame and carry the image dimensions. DHT (C4), JPG (C8) and DAC (CC) share
+# the range without being frames.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# JPEG markers that stand alone, without a length.
+_JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+def _sniff_jpeg(data):
+    """
+    Walks the JPEG segments in data up to the first frame header and returns its (width, height).
+    """
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None, None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                break
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None, None
+
+
+def _sniff_webp(data):
+    """
+    Returns the (width, height) of a lossy, lossless or extended WebP image.
+    """
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30 and data[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25 and data[20] == 0x2F:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None, None
+
+
+def _sniff_avif(data):
+    """
+    Returns the (width, height) from the image spatial extents property of an AVIF image.
+    """
+    index = data.find(b'ispe')
+    if index == -1 or index + 16 > len(data):
+        return None, None
+    return struct.unpack('>II', data[index + 8:index + 16])
+
+
+def sniff_image(data):
+    """
+    Reads the format and pixel dimensions of an image from the first bytes of its file.
+
+    PNG, GIF, JPEG, WebP, AVIF, BMP and ICO dimensions are read from their headers; a few KB are enough
+    for all of them except JPEGs carrying large metadata before their frame header. SVG images are
+    recognized but their dimensions are not read.
+
+    Args:
+        data (bytes): The first bytes of the image file.
+
+    Returns:
+        tuple: The format, width and height of the image, with None for dimensions not found in data, or
+            None if the format is not recognized.
+    """
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        if len(data) >= 24 and data[12:16] == b'IHDR':
+            return ('png',) + struct.unpack('>II', data[16:24])
+        return 'png', None, None
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        if len(data) >= 10:
+            return ('gif',) + struct.unpack('<HH', data[6:10])
+        return 'gif', None, None
+    if data.startswith(b'\xff\xd8\xff'):
+        return ('jpeg',) + _sniff_jpeg(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return ('webp',) + _sniff_webp(data)
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        return ('avif',) + tuple(_sniff_avif(data))
+    if data.startswith(b'BM') and len(data) >= 18:
+        header_size = struct.unpack('<I', data[14:18])[0]
+        if header_size == 12 and len(data) >= 22:
+            return ('bmp',) + struct.unpack('<HH', data[18:22])
+        if header_size >= 40 and len(data) >= 26:
+            width, height = struct.unpack('<ii', data[18:26])
+            return 'bmp', width, abs(height)
+        return 'bmp', None, None
+    if data.startswith(b'\x00\x00\x01\x00') and len(data) >= 8:
+        # A width or height of 0 in an icon directory entry means 256.
+        return 'ico', data[6] or 256, data[7] or 256
+
+    head = data[:1024].lstrip().lower()
+    if head.startswith((b'<svg', b'<?xml', b'<!doctype svg')) and b'<svg' in head:
+        return 'svg', None, None
+    return None
+
+
+class ImageProber:
+    """
+    Reads the true format, pixel dimensions and file size of images without downloading them.
+
+    Each image is fetched with a Range request for its first probe_bytes bytes, and its header is read
+    with sniff_image. The size of the whole file is taken from the Content-Range header of the partial
+    response, or from the Content-Length of a server that ignores ranges, whose response is then closed
+    after the first probe_bytes bytes. When the dimensions are not in the first bytes, such as a JPEG with
+    a large embedded thumbnail, one more request reads up to max_probe_bytes.
+
+    Images are probed concurrently from a pool of threads sharing one session, whose connection pools
+    keep up to concurrency connections per host alive.
+
+    Args:
+        concurrency (int): The maximum number of images probed at once. Default is 8.
+        probe_bytes (int): The number of bytes read from each image. Default is 16 KB.
+        max_probe_bytes (int): The number of bytes read from an image whose dimensions were not in the first
+            probe_bytes. Default is 64 KB.
+        headers (dict): Headers to send with every request. Default is None.
+        stats (Stats): Statistics to time each probe in, as the 'probe' stage. Default is None.
+        timeout (float): The timeout of each request in seconds. Default is 10.
+
+    Raises:
+        ValueError: If concurrency or probe_bytes is not a positive integer.
+        ValueError: If max_probe_bytes is smaller than probe_bytes.
+    """
+
+    def __init__(self, concurrency=8, probe_bytes=16 * 1024, max_probe_bytes=64 * 1024, headers=None, stats=None,
+                 timeout=10):
+        if concurrency < 1:
+            raise ValueError('concurrency must be a positive integer')
+        if probe_bytes < 1:
+            raise ValueError('probe_bytes must be a positive integer')
+        if max_probe_bytes < probe_bytes:
+            raise ValueError('max_probe_bytes must be at least probe_bytes')
+
+        self.concurrency = concurrency
+        self.probe_bytes = probe_bytes
+        self.max_probe_bytes = max_probe_bytes
+        self.headers = headers
+        self.stats = stats
+        self.timeout = timeout
+
+    def _read_head(self, session, url, length):
+        """
+        Reads the first length bytes of a file.
+
+        Returns:
+            tuple: The bytes read and the size of the whole file, or None if the server did not tell.
+        """
+        headers = dict(self.headers or {})
+        headers['Range'] = f'bytes=0-{length - 1}'
+        # Ranges count bytes of the encoded body, so ask for the file itself.
+        headers['Accept-Encoding'] = 'identity'
+
+        with session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if self.stats is not None:
+                self.stats.record_response(response.status_code)
+            response.raise_for_status()
+
+            size = None
+            if response.status_code == 206:
+                match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+                size = int(match.group(1)) if match else None
+            elif response.headers.get('Content-Length', '').isdigit():
+                size = int(response.headers['Content-Length'])
+
+            data = b''
+            for chunk in response.iter_content(chunk_size=length):
+                data += chunk
+                if len(data) >= length:
+                    break
+            if self.stats is not None:
+                self.stats.add_bytes(len(data))
+        return data[:length], size
+
+    def probe(self, url, session=None):
+        """
+        Probes a single image.
+
+        Args:
+            url (str): The URL of the image.
+            session (requests.Session): The session to send the requests with. Default is None, for a new one.
+
+        Returns:
+            ProbeResult: What the image header revealed, or None if its format is not recognized.
+
+        Raises:
+            requests.RequestException: If the image could not be fetched.
+        """
+        if session is None:
+            with pooled_session(self.concurrency) as session:
+                return self.probe(url, session)
+
+        data, size = self._read_head(session, url, self.probe_bytes)
+        sniffed = sniff_image(data)
+        if (sniffed is not None and sniffed[1] is None and len(data) == self.probe_bytes
+                and self.max_probe_bytes > self.probe_bytes and (size is None or size > len(data))):
+            data, size = self._read_head(session, url, self.max_probe_bytes)
+            sniffed = sniff_image(data)
+
+        if sniffed is None:
+            return None
+        return ProbeResult(*sniffed, size)
+
+    def _probe_quietly(self, session, url):
+        """
+        Probes an image, timing it in stats and returning None instead of raising if it fails.
+        """
+        try:
+            if self.stats is None:
+                return self.probe(url, session)
+            with self.stats.time('probe'):
+                return self.probe(url, session)
+        except requests.RequestException as e:
+            if self.stats is not None:
+                self.stats.record_error('probe', e)
+            return None
+
+    def probe_all(self, urls):
+        """
+        Probes images concurrently, at most concurrency at a time. Only http and https URLs are probed,
+        each once.
+
+        Args:
+            urls (iterable): The URLs of the images.
+
+        Returns:
+            dict: A ProbeResult for each URL that could be probed and whose format was recognized, by URL.
+        """
+        urls = list(dict.fromkeys(url for url in urls if urlsplit(url).scheme in ('http', 'https')))
+        if not urls:
+            return {}
+
+        with pooled_session(self.concurrency) as session, ThreadPoolExecutor(min(self.concurrency, len(urls))) as executor:
+            results = executor.map(lambda url: self._probe_quietly(session, url), urls)
+            return {url: result for url, result in zip(urls, results) if result is not None}
@@ -0,0 +1,95 @@
+import re
+
+from html import unescape
+
+# Matches a complete <a ...> or <img ...> start tag. Only the tag name and its attribute text are captured.
+_TAG_RE = re.compile(rb'<(a|img)(\s[^>]*)?>', re.IGNORECASE)
+
+# Matches one attribute inside a tag, with a double-quoted, single-quoted or unquoted value.
+_ATTR_RE = re.compile(rb'''([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+
+_IMAGE_ATTRS = (b'src', b'alt', b'width', b'height')
+
+
+class StreamingLinkExtractor:
+    """
+    Collects the links and images in an HTML document by scanning its raw bytes as they arrive.
+
+    No tree is built and the document is never decoded as a whole: chunks are searched for <a> and <img>
+    start tags, and only the attribute values that are kept are decoded. Anything after the last complete
+    tag of a chunk is carried over to the next one, so tags split across chunks are still found.
+
+    Unlike a full parser, the scanner does not know about comments or <script> contents, so anchors that
+    only appear inside them are also reported.
+
+    Args:
+        encoding (str): The encoding used to decode attribute values. Default is 'utf-8'.
+
+    Attributes:
+        links (list): The href values of the <a> tags found so far, in document order.
+        images (list): (src, alt, width, height) tuples for the <img> tags found so far, in document order.
+    """
+
+    def __init__(self, encoding='utf-8'):
+        self.encoding = encoding
+        self.links = []
+        self.images = []
+        self._buffer = b''
+
+    def _decode(self, value):
+        """
+        Decodes an attribute value and resolves its character references.
+        """
+        if value is None:
+            return None
+        return unescape(value.decode(self.encoding, errors='replace'))
+
+    def _attributes(self, attr_text):
+        """
+        Returns the attributes of a tag as a dictionary of raw byte values, keeping the first of any duplicates.
+        """
+        attrs = {}
+        for name, double, single, bare in _ATTR_RE.findall(attr_text or b''):
+            name = name.lower()
+            if name not in attrs:
+                attrs[name] = double or single or bare
+        return attrs
+
+    def _scan(self, data):
+        """
+        Records every complete tag in data and returns the offset where unscanned data starts.
+        """
+        end = 0
+        for match in _TAG_RE.finditer(data):
+            tag = match.group(1).lower()
+            attrs = self._attributes(match.group(2))
+            if tag == b'a':
+                if b'href' in attrs:
+                    self.links.append(self._decode(attrs[b'href']))
+            else:
+                self.images.append(tuple(self._decode(attrs.get(name)) for name in _IMAGE_ATTRS))
+            end = match.end()
+        return end
+
+    def feed(self, chunk):
+        """
+        Scans the next chunk of the document.
+
+        Args:
+            chunk (bytes): The next bytes of the document.
+        """
+        data = self._buffer + chunk
+        end = self._scan(data)
+
+        # Keep a trailing tag that has not been closed yet for the next chunk.
+        start = data.rfind(b'<', end)
+        if start != -1 and data.find(b'>', start) == -1:
+            self._buffer = data[start:]
+        else:
+            self._buffer = b''
+
+    def close(self):
+        """
+        Finishes the scan, dropping any unclosed tag left at the end of the document.
+        """
+        self._buffer = b''
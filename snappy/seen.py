@@ -0,0 +1,106 @@
+import hashlib
+
+from array import array
+
+
+def fingerprint(url):
+    """
+    Returns the 64-bit fingerprint of a URL: the first 8 bytes of its BLAKE2b hash, never 0.
+    """
+    value = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class FingerprintSet:
+    """
+    A compact set of URLs, for the duplicate checks of very large crawls.
+
+    Only a 64-bit fingerprint of each URL is kept, in an open-addressing hash table backed by a single
+    array of machine integers, so a URL costs 8 bytes per table slot instead of a full string and a set
+    entry. The table doubles once it is three quarters full, which keeps it between 3/8 and 3/4 full:
+    10.7 to 21.3 bytes per URL. A Python set of 70 to 100 character URLs takes 150 to 185 bytes per URL,
+    strings included. Measured over a million URLs with benchmarks/bench_seen.py, the fingerprints took
+    17.8 bytes per URL, with adds and lookups taking 3 to 4 microseconds against 0.3 for a set.
+
+    The price is a small chance of false positives: a URL that was never added is reported as present
+    when its fingerprint equals that of one of the n URLs that were, with a probability of n / 2**64 per
+    lookup. That is about 5e-13 for 10 million URLs, so even a crawl of 10 million pages that checks
+    every link of every page is unlikely to skip a single page. There are no false negatives.
+
+    The URLs themselves cannot be listed back from the set.
+
+    In a crawl, the saving is that of the seen-set alone. The crawl still keeps a string for every URL it
+    records, in its link graph, and for every URL it has queued, so with compact_seen the peak memory of the
+    simulated crawl in benchmarks/bench_seen.py only fell from 1340 to 1136 bytes per URL.
+
+    Args:
+        urls (iterable): URLs to add. Default is None.
+    """
+
+    # The initial number of slots, a power of two.
+    _initial_slots = 1024
+
+    def __init__(self, urls=None):
+        self._table = array('Q', bytes(8 * self._initial_slots))
+        self._mask = self._initial_slots - 1
+        self._count = 0
+        if urls is not None:
+            self.update(urls)
+
+    def _find(self, value):
+        """
+        Returns the slot holding a fingerprint, or the empty slot where it belongs.
+        """
+        table, mask = self._table, self._mask
+        i = value & mask
+        while True:
+            slot = table[i]
+            if slot == value or slot == 0:
+                return i
+            i = (i + 1) & mask
+
+    def _grow(self):
+        """
+        Doubles the number of slots and moves every fingerprint to its slot in the new table.
+        """
+        old = self._table
+        self._table = array('Q', bytes(16 * len(old)))
+        self._mask = 2 * len(old) - 1
+        for value in old:
+            if value:
+                self._table[self._find(value)] = value
+
+    def add(self, url):
+        """
+        Adds a URL to the set.
+        """
+        value = fingerprint(url)
+        i = self._find(value)
+        if self._table[i] == 0:
+            self._table[i] = value
+            self._count += 1
+            if 4 * self._count > 3 * len(self._table):
+                self._grow()
+
+    def update(self, urls):
+        """
+        Adds every URL of an iterable to the set.
+        """
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        return self._table[self._find(fingerprint(url))] != 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """
+        The size of the fingerprint table in bytes.
+        """
+        return len(self._table) * self._table.itemsize
+
+    def __repr__(self):
+        return f'<FingerprintSet of {self._count} URLs, {self.nbytes} bytes>'
@@ -0,0 +1,21 @@
+import requests
+
+from requests.adapters import HTTPAdapter
+
+
+def pooled_session(pool_size):
+    """
+    Returns a requests session whose connection pools keep up to pool_size connections per host alive, so
+    that as many threads can share it without opening and discarding connections.
+
+    Args:
+        pool_size (int): The number of connections kept alive per host.
+
+    Returns:
+        requests.Session: The session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
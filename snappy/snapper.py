@@ -1,7 +1,12 @@
 import asyncio
 import argparse
 import csv
+import sys
 from snappy.tools import AsyncScreenshotter
+from snappy.diff import VisualDiff
+
+# Marks the end of the URLs read by test_website.
+_NO_MORE_URLS = object()
 
 """
 If installed using pip, replace "python snapper.py" with "snapper" in the following examples.  
@@ -16,10 +21,19 @@ Examples:
     2. Capture screenshots for URLs specified in a CSV file:
         python snapper.py --csv urls.csv
 
-    3. Customize settings:
+    3. Capture screenshots for URLs piped through stdin, 8 at a time:
+        cat urls.csv | python snapper.py --csv - --concurrency 8
+
+    4. Capture every URL on several devices and viewports at once, from one browser:
+        python snapper.py --csv urls.csv --devices "iPhone 13" "Pixel 7" "1280x720"
+
+    5. Customize settings:
         python snapper.py --urls "https://www.example.com" "https://www.example.com/blog" \
             --output_dir "test_async_screenshotter" --fullscreen --close_popups --scroll_delay 2 --device "iPhone 11"
 
+    6. Re-run a capture, only rewriting screenshots that visibly changed, and report which did:
+        python snapper.py --csv urls.csv --skip_unchanged --diff_threshold 0.01 --diff_report changes.json
+
 Expected CSV Format:
     https://www.example.com
     https://www.example.com/blog
@@ -35,30 +49,112 @@ Device Examples:
     - "Desktop Safari"
 """
 
-async def test_website(urls, output_dir='screenshots', fullscreen=True, close_popups=True, scroll_delay=0, device=None):
+async def _screenshot_worker(screenshotter, queue, device, devices):
+    """
+    Take screenshots for URLs from the queue until it yields None.
+
+    Every variant of a URL is captured at once in the shared browser.
+
+    Args:
+        screenshotter (AsyncScreenshotter): The screenshotter to use.
+        queue (asyncio.Queue): Queue of URLs to capture.
+        device (str): Device to emulate for mobile screenshots, if any.
+        devices (list): Further devices to capture each URL with.
+
+    Returns:
+        None
+    """
+    while True:
+        url = await queue.get()
+        if url is None:
+            return
+
+        filename = url.split("/")[-1]
+        captures = [screenshotter.take_screenshots(url, filename, [None] + devices)]
+        if device:
+            captures.append(screenshotter.take_screenshot(url, filename + "_mobile", device=device))
+
+        try:
+            for result in await asyncio.gather(*captures, return_exceptions=True):
+                if isinstance(result, Exception):
+                    raise result
+        except Exception as e:
+            print(f"Failed to capture {url}: {e}")
+
+async def test_website(urls, output_dir='screenshots', fullscreen=True, close_popups=True, scroll_delay=0, device=None, concurrency=4, visual_diff=None, diff_report=None, devices=(), stats_file=None):
     """
     Test websites and capture screenshots.
 
+    URLs are handed to a fixed number of workers through a bounded queue, so urls can be a lazy iterable of
+    any length without the number of pending URLs or open pages growing with it. URLs are read in a
+    worker thread, so a slow source such as stdin does not hold up the screenshots already under way.
+
     Args:
-        urls (list): List of URLs to test.
+        urls (iterable): URLs to test.
         output_dir (str): Output directory for screenshots. Default is 'screenshots'.
         fullscreen (bool): Capture fullscreen screenshots. Default is True.
         close_popups (bool): Close popups before taking screenshots. Default is True.
-        scroll_delay (int): If greater than 0, scroll the page to capture the entire content. Default is 0.
-        device (str): Device to emulate for mobile screenshots. Default is 'iPhone 11'.
+        scroll_delay (float): If greater than 0, scroll the page to capture the entire content, waiting at most this many seconds for it to load. Default is 0.
+        device (str): Device to emulate for mobile screenshots, saved with a _mobile suffix. Default is None.
+        devices (iterable): Devices or viewport sizes such as '1280x720' to also capture each URL with, each saved
+            with a suffix derived from its name. Default is ().
+        stats_file (str): Path to save the run's timings and counts to, in the Prometheus text format if it ends
+            in .prom and as JSON otherwise. Default is None.
+        concurrency (int): Number of URLs captured at once. Default is 4.
+        visual_diff (VisualDiff or bool): Skip saving screenshots that have not changed since the previous run.
+            Default is None.
+        diff_report (str): Path to save a JSON report of which screenshots changed. Default is None.
 
     Returns:
         None
     """
-    screenshotter = AsyncScreenshotter(output_dir=output_dir, fullscreen=fullscreen, close_popups=close_popups, scroll_delay=scroll_delay)
+    if concurrency < 1:
+        raise ValueError('concurrency must be a positive integer')
+
+    devices = list(devices)
+    variants = 1 + len(devices) + (1 if device else 0)
+    async with AsyncScreenshotter(output_dir=output_dir, fullscreen=fullscreen, close_popups=close_popups, scroll_delay=scroll_delay, max_pages=concurrency * variants, visual_diff=visual_diff) as screenshotter:
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+        workers = [asyncio.ensure_future(_screenshot_worker(screenshotter, queue, device, devices)) for _ in range(concurrency)]
+
+        loop = asyncio.get_running_loop()
+        url_iterator = iter(urls)
+        try:
+            while True:
+                url = await loop.run_in_executor(None, next, url_iterator, _NO_MORE_URLS)
+                if url is _NO_MORE_URLS:
+                    break
+                await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        if diff_report and screenshotter.visual_diff is not None:
+            screenshotter.save_diff_report(diff_report)
+
+        if stats_file:
+            with open(stats_file, 'w') as stats_output:
+                if stats_file.endswith('.prom'):
+                    stats_output.write(screenshotter.stats.to_prometheus())
+                else:
+                    stats_output.write(screenshotter.stats.to_json(indent=2))
+
+def iter_urls_from_csv(csv_file):
+    """
+    Read URLs from a CSV file one row at a time.
 
-    tasks = []
-    for url in urls:
-        tasks.append(screenshotter.take_screenshot(url, url.split("/")[-1]))
-        if device:
-            tasks.append(screenshotter.take_screenshot(url, url.split("/")[-1] + "_mobile", device=device))
+    Args:
+        csv_file (file): An open CSV file.
 
-    await asyncio.gather(*tasks)
+    Yields:
+        str: The URL in the first column of each non-empty row.
+    """
+    for row in csv.reader(csv_file):
+        if row and row[0].strip():
+            yield row[0].strip()
 
 def read_urls_from_csv(csv_filename):
     """
@@ -71,8 +167,7 @@ def read_urls_from_csv(csv_filename):
         list: List of URLs.
     """
     with open(csv_filename, 'r') as csv_file:
-        reader = csv.reader(csv_file)
-        return [row[0] for row in reader]
+        return list(iter_urls_from_csv(csv_file))
 
 def main():
     """
@@ -83,24 +178,34 @@ def main():
     """
     parser = argparse.ArgumentParser(description='Test website and capture screenshots.')
     parser.add_argument('--urls', nargs='+', help='List of URLs to test')
-    parser.add_argument('--csv', help='CSV file containing URLs')
+    parser.add_argument('--csv', help='CSV file containing URLs, or - to read them from stdin')
     parser.add_argument('--output_dir', default='screenshots', help='Output directory for screenshots')
     parser.add_argument('--fullscreen', action='store_true', help='Capture fullscreen screenshots')
     parser.add_argument('--close_popups', action='store_true', help='Close popups before taking screenshots')
-    parser.add_argument('--scroll_delay', default=0, help='If greater than 0, scroll the page to capture the entire content', type=int)
+    parser.add_argument('--scroll_delay', default=0, help='If greater than 0, scroll the page to capture the entire content, waiting at most this many seconds for it to load', type=float)
     parser.add_argument('--device', default='iPhone 11', help='Device to emulate for mobile screenshots')
+    parser.add_argument('--devices', nargs='+', help='Devices or viewport sizes such as 1280x720 to capture every URL with, instead of --device')
+    parser.add_argument('--concurrency', default=4, help='Number of URLs to capture at once', type=int)
+    parser.add_argument('--skip_unchanged', action='store_true', help='Only save screenshots that changed since the previous run')
+    parser.add_argument('--diff_threshold', default=0.001, help='Fraction of pixels that must differ for a screenshot to count as changed', type=float)
+    parser.add_argument('--diff_report', help='JSON file to write the changed/unchanged report to')
+    parser.add_argument('--stats', help='File to write per-stage timings and counts to, as Prometheus text if it ends in .prom and JSON otherwise')
 
     args = parser.parse_args()
 
+    options = dict(output_dir=args.output_dir, fullscreen=args.fullscreen, close_popups=args.close_popups, scroll_delay=args.scroll_delay, device=None if args.devices else args.device, devices=args.devices or (), concurrency=args.concurrency, stats_file=args.stats)
+    if args.skip_unchanged:
+        options.update(visual_diff=VisualDiff(threshold=args.diff_threshold), diff_report=args.diff_report)
+
     if args.urls:
-        urls = args.urls
+        asyncio.run(test_website(args.urls, **options))
+    elif args.csv == '-':
+        asyncio.run(test_website(iter_urls_from_csv(sys.stdin), **options))
     elif args.csv:
-        urls = read_urls_from_csv(args.csv)
+        with open(args.csv, 'r') as csv_file:
+            asyncio.run(test_website(iter_urls_from_csv(csv_file), **options))
     else:
         print("Please provide either --urls or --csv option.")
-        return
-
-    asyncio.run(test_website(urls, output_dir=args.output_dir, fullscreen=args.fullscreen, close_popups=args.close_popups, scroll_delay=args.scroll_delay, device=args.device))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
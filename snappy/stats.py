@@ -0,0 +1,255 @@
+import json
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds of the timing histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Counts observed values in fixed buckets, like a Prometheus histogram.
+
+    Args:
+        buckets (tuple): The upper bounds of the buckets, in increasing order. Values above the last bound
+            are counted in an implicit +Inf bucket. Default is DEFAULT_BUCKETS.
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets.
+        counts (list): The number of values in each bucket, the last one being +Inf.
+        count (int): The number of values observed.
+        sum (float): The sum of the values observed.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Counts a value.
+        """
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimate, inf if it falls beyond the last bucket, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+
+class Stats:
+    """
+    Statistics of a crawl or a screenshot run: per-stage timings, bytes transferred, response statuses,
+    errors, counters and gauges such as the queue depth.
+
+    Stages are timed with `with stats.time('fetch'):` and kept in one Histogram per stage. Every update is
+    also passed to the hook, if there is one, so a live job can be watched as it runs. The hook is called
+    from whichever thread made the update and must not raise.
+
+    Stats can be updated from several threads at once.
+
+    Args:
+        hook (callable): Called as hook(event, data) after every update. event is 'stage', 'response',
+            'error', 'counter' or 'gauge', and data is a dictionary describing the update. Default is None.
+        buckets (tuple): The upper bounds of the timing histogram buckets in seconds. Default is DEFAULT_BUCKETS.
+
+    Attributes:
+        stages (dict): A Histogram of the time spent in each stage, by stage name.
+        bytes (int): The number of response bytes received.
+        statuses (Counter): The number of responses received, by status code.
+        errors (Counter): The number of errors, by (stage, exception type name).
+        counters (Counter): Named event counts, such as pages crawled or failed.
+        gauges (dict): The latest value of each named gauge, such as queue_depth.
+    """
+
+    def __init__(self, hook=None, buckets=DEFAULT_BUCKETS):
+        self.hook = hook
+        self.buckets = tuple(buckets)
+        self.stages = {}
+        self.bytes = 0
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.counters = Counter()
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def _emit(self, event, **data):
+        if self.hook is not None:
+            self.hook(event, data)
+
+    def observe(self, stage, seconds):
+        """
+        Records the time spent in one run of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            seconds (float): The time spent.
+        """
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(self.buckets)
+            self.stages[stage].observe(seconds)
+        self._emit('stage', stage=stage, seconds=seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Times the body of a with block as one run of a stage. The time is recorded even if the block raises.
+
+        Args:
+            stage (str): The name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_response(self, status, size=0):
+        """
+        Records a response.
+
+        Args:
+            status (int): The status code, or None if there was no response.
+            size (int): The number of body bytes received. Default is 0.
+        """
+        with self._lock:
+            self.statuses[status] += 1
+            self.bytes += size
+        self._emit('response', status=status, size=size)
+
+    def add_bytes(self, size):
+        """
+        Records response bytes received after the response itself was recorded, such as streamed chunks.
+        """
+        with self._lock:
+            self.bytes += size
+        self._emit('response', status=None, size=size)
+
+    def record_error(self, stage, error):
+        """
+        Records an error.
+
+        Args:
+            stage (str): The stage the error happened in.
+            error (Exception): The error.
+        """
+        with self._lock:
+            self.errors[(stage, type(error).__name__)] += 1
+        self._emit('error', stage=stage, error=error)
+
+    def increment(self, name, amount=1):
+        """
+        Adds to a named counter.
+        """
+        with self._lock:
+            self.counters[name] += amount
+        self._emit('counter', name=name, amount=amount)
+
+    def set_gauge(self, name, value):
+        """
+        Sets a named gauge to its latest value.
+        """
+        with self._lock:
+            self.gauges[name] = value
+        self._emit('gauge', name=name, value=value)
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary of plain values.
+        """
+        with self._lock:
+            return {
+                'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+                'bytes': self.bytes,
+                'statuses': {str(status): count for status, count in self.statuses.items()},
+                'errors': [{'stage': stage, 'error': error, 'count': count}
+                           for (stage, error), count in self.errors.items()],
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+    def to_json(self, **kwargs):
+        """
+        Returns the statistics as a JSON string. Keyword arguments are passed on to json.dumps.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix='snappy'):
+        """
+        Returns the statistics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): The prefix of every metric name. Default is 'snappy'.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+        with self._lock:
+            lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f'# TYPE {prefix}_bytes_total counter')
+            lines.append(f'{prefix}_bytes_total {self.bytes}')
+
+            lines.append(f'# TYPE {prefix}_responses_total counter')
+            for status, count in sorted(self.statuses.items(), key=lambda item: str(item[0])):
+                lines.append(f'{prefix}_responses_total{{status="{status}"}} {count}')
+
+            lines.append(f'# TYPE {prefix}_errors_total counter')
+            for (stage, error), count in sorted(self.errors.items()):
+                lines.append(f'{prefix}_errors_total{{stage="{stage}",error="{error}"}} {count}')
+
+            for name, count in sorted(self.counters.items()):
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                lines.append(f'{prefix}_{name}_total {count}')
+
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {prefix}_{name} gauge')
+                lines.append(f'{prefix}_{name} {value}')
+        return '\n'.join(lines) + '\n'
@@ -1,6 +1,123 @@
 import os
+import re
+import copy
+import json
 import asyncio
+from urllib.parse import urlsplit
 from playwright.async_api import async_playwright
+from snappy.diff import VisualDiff
+from snappy.stats import Stats
+
+# Scrolls down by one viewport and reports the page height and how far down the viewport now reaches.
+_SCROLL_STEP_SCRIPT = """() => {
+    window.scrollBy(0, window.innerHeight);
+    const height = Math.max(document.body ? document.body.scrollHeight : 0, document.documentElement.scrollHeight);
+    return [height, window.scrollY + window.innerHeight];
+}"""
+
+# A viewport given as a device, such as '1280x720'.
+_VIEWPORT_RE = re.compile(r'^(\d+)x(\d+)$')
+
+# Words on the buttons and links that dismiss consent banners and other popups, in the order they are clicked.
+_POPUP_KEYWORDS = ('reject', 'decline', 'accept', 'acknowledge', 'necessary', 'allow')
+
+# Dismisses popups in one pass over the page. Given the selector that worked on a previous visit to the same
+# site, it clicks the visible elements matching it whose text still contains a keyword, and stops there; the
+# selector is positional, so on another page it can match an ordinary link. Otherwise, for each keyword in
+# order, it clicks the visible buttons whose text contains it, or the links if no button does. Returns a
+# selector for the elements clicked, or null if there were none.
+_CLOSE_POPUPS_SCRIPT = """([keywords, known]) => {
+    const visible = (element) => element.getClientRects().length > 0;
+    const dismisses = (element) => {
+        const text = element.textContent.toLowerCase();
+        return keywords.some((keyword) => text.includes(keyword));
+    };
+    const cssPath = (element) => {
+        const parts = [];
+        for (; element && element !== document.documentElement; element = element.parentElement) {
+            if (element.id) {
+                parts.unshift('#' + CSS.escape(element.id));
+                break;
+            }
+            let index = 1;
+            for (let sibling = element.previousElementSibling; sibling; sibling = sibling.previousElementSibling) {
+                if (sibling.localName === element.localName) index++;
+            }
+            parts.unshift(`${element.localName}:nth-of-type(${index})`);
+        }
+        return parts.join(' > ');
+    };
+
+    if (known) {
+        let elements = [];
+        try {
+            elements = Array.from(document.querySelectorAll(known)).filter((element) => visible(element) && dismisses(element));
+        } catch (error) {}
+        if (elements.length) {
+            elements.forEach((element) => element.click());
+            return known;
+        }
+    }
+
+    const candidates = Array.from(document.querySelectorAll('button, a')).filter(visible);
+    const texts = candidates.map((element) => element.textContent.toLowerCase());
+    const clicked = [];
+    for (const keyword of keywords) {
+        const matches = candidates.filter((element, i) => texts[i].includes(keyword) && !clicked.includes(element));
+        const buttons = matches.filter((element) => element.localName === 'button');
+        clicked.push(...(buttons.length ? buttons : matches));
+    }
+    // Work out the selectors before clicking, since a dismissed popup may be taken out of the page.
+    const selector = clicked.map(cssPath).join(', ');
+    clicked.forEach((element) => element.click());
+    return selector || null;
+}"""
+
+# Requests that stay open for the life of the page and so never let the network go idle.
+_LONG_LIVED_RESOURCE_TYPES = frozenset(['websocket', 'eventsource'])
+
+
+class _NetworkMonitor:
+    """
+    Tracks the requests a page has in flight, so waits can end once its network activity has quieted.
+
+    Args:
+        page: The Playwright page object to listen to.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.in_flight = set()
+        self._loop = asyncio.get_running_loop()
+        self.last_activity = self._loop.time()
+        page.on('request', self._on_request)
+        page.on('requestfinished', self._on_done)
+        page.on('requestfailed', self._on_done)
+
+    def _on_request(self, request):
+        if request.resource_type not in _LONG_LIVED_RESOURCE_TYPES:
+            self.in_flight.add(request)
+            self.last_activity = self._loop.time()
+
+    def _on_done(self, request):
+        if request in self.in_flight:
+            self.in_flight.discard(request)
+            self.last_activity = self._loop.time()
+
+    def idle_for(self, now):
+        """
+        Returns how many seconds the page has had no request in flight, or 0 if one is in flight.
+        """
+        return 0 if self.in_flight else now - self.last_activity
+
+    def stop(self):
+        """
+        Stops listening to the page.
+        """
+        self.page.remove_listener('request', self._on_request)
+        self.page.remove_listener('requestfinished', self._on_done)
+        self.page.remove_listener('requestfailed', self._on_done)
+
 
 class AsyncScreenshotter:
     """
@@ -10,76 +127,298 @@ class AsyncScreenshotter:
         output_dir (str): The directory where the screenshot will be saved. Default is the current directory.
         fullscreen (bool): Whether to take a screenshot of the full screen or just the visible area. Default is False.
         close_popups (bool): Whether to close any popups that appear on the page before taking the screenshot. Default is False.
-        scroll_delay (int): Whether to scroll the page to capture the entire page. Default is 0.
+        scroll_delay (float): If greater than 0, scroll through the page so lazy-loaded content is captured, waiting
+            at most this many seconds for it to load. Default is 1.
+        scroll_settle (float): How many seconds the page height must stay the same, with no request in flight,
+            before scrolling stops early. Default is 0.2.
         format (str): The format of the screenshot. Default is 'png'.
-        device (str): The device type for which the screenshot should be taken. Default is None.
+        device (str): The device type for which the screenshot should be taken, either a Playwright device name or a
+            viewport size such as '1280x720'. Default is None.
+        max_pages (int): The maximum number of pages open at once in the shared browser. Default is 8.
+        visual_diff (VisualDiff or bool): Compares each capture with the previous one saved under the same name
+            and leaves the file untouched when nothing changed. True uses the default VisualDiff. Default is None.
+        stats_hook (callable): Called as stats_hook(event, data) on every update of stats. See Stats. Default is None.
 
     Attributes:
         output_dir (str): The directory where the screenshot will be saved.
         fullscreen (bool): Whether to take a screenshot of the full screen or just the visible area.
         close_popups (bool): Whether to close any popups that appear on the page before taking the screenshot.
-        scroll_delay (int): Whether to scroll the page to capture the entire page and how long to wait for resources to load.
+        scroll_delay (float): The longest time to spend scrolling through a page, or 0 to not scroll.
+        scroll_settle (float): How long the page must stay quiet before scrolling stops early.
         format (str): The format of the screenshot.
         device (str): The device type for which the screenshot should be taken.
+        max_pages (int): The maximum number of pages open at once in the shared browser.
+        visual_diff (VisualDiff): The visual diff stage, or None.
+        diff_report (list): One entry per capture compared by the visual diff stage, with its url, path, whether
+            it changed, and the hash distance and pixel diff ratio measured.
+        stats (Stats): Per-stage timings (navigate, popups, scroll, capture, diff and the whole screenshot),
+            response statuses, errors, screenshot counts and the number of open pages.
 
     Methods:
-        _find_and_close_popups(page): Private method to find and close any popups that appear on the page.
-        _scroll_page(page): Private method to scroll the page to capture the entire page.
+        async start(): Launches the shared browser.
+        async close(): Closes the shared browser and its contexts.
+        _get_context(device): Private method to get the pooled browser context for a device.
+        device_filename(filename, device): Returns the filename used for a device's variant of a screenshot.
+        _find_and_close_popups(page): Private method to find and close any popups that appear on the page, trying
+            the selector that worked on the site before first.
+        _scroll_page(page, network): Private method to scroll through the page until its lazy content has loaded.
+        _save_if_changed(url, photo, path): Private method to save a capture only if it differs from the previous one.
+        save_diff_report(path): Saves the diff report as JSON.
         async take_screenshot(url, filename, device): Takes a screenshot of the specified URL and saves it with the specified filename.
+        async take_screenshots(url, filename, devices): Takes a screenshot of the specified URL for each device at once.
 
+    Used as an async context manager, the screenshotter launches one browser and keeps one context per
+    device profile open for every screenshot taken inside the block:
+
+        async with AsyncScreenshotter(output_dir='screenshots') as screenshotter:
+            await screenshotter.take_screenshot('https://www.example.com', 'example')
+
+    Contexts are reused across URLs, so cookies set by one page (such as a dismissed consent banner) carry
+    over to the next page taken with the same device.
     """
 
-    def __init__(self, output_dir='.', fullscreen=False, headless=True, close_popups=False, format='png', device=None, scroll_delay=1):
+    def __init__(self, output_dir='.', fullscreen=False, headless=True, close_popups=False, format='png', device=None, scroll_delay=1, max_pages=8, visual_diff=None, scroll_settle=0.2, stats_hook=None):
         self.output_dir = output_dir
         self.fullscreen = fullscreen
         self.headless = headless
         self.close_popups = close_popups
         self.scroll_delay = scroll_delay
+        self.scroll_settle = scroll_settle
         self.format = format
         self.device = device
+        self.max_pages = max_pages
+        self.visual_diff = VisualDiff() if visual_diff is True else visual_diff or None
+        self.diff_report = []
+        self.stats = Stats(hook=stats_hook)
+
+        # The selector of the popup buttons last clicked on each host, shared with copies of the screenshotter.
+        self._popup_selectors = {}
+
+        self._playwright = None
+        self._browser = None
+        self._contexts = {}
+        self._context_lock = None
+        self._page_slots = None
+        self._open_pages = 0
+
+        if max_pages < 1:
+            raise ValueError('max_pages must be a positive integer')
+
+    async def start(self):
+        """
+        Launches the shared browser. Called when entering the screenshotter as an async context manager.
+
+        Returns:
+            The screenshotter.
+        """
+        self._playwright = await async_playwright().start()
+        try:
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        except:
+            await self._playwright.stop()
+            self._playwright = None
+            raise
+        self._contexts = {}
+        self._context_lock = asyncio.Lock()
+        self._page_slots = asyncio.Semaphore(self.max_pages)
+        return self
+
+    async def close(self):
+        """
+        Closes the pooled contexts and the shared browser. Called when leaving the async context manager.
+
+        Returns:
+            None
+        """
+        if self._browser is None:
+            return
+
+        for context in self._contexts.values():
+            await context.close()
+        await self._browser.close()
+        await self._playwright.stop()
+        self._contexts = {}
+        self._browser = None
+        self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_context(self, device):
+        """
+        Private method to get the pooled browser context for a device, creating it on first use.
+
+        Args:
+            device (str): The device to emulate, or None for the default context.
+
+        Returns:
+            The Playwright browser context.
+        """
+        async with self._context_lock:
+            if device not in self._contexts:
+                viewport = _VIEWPORT_RE.match(device or '')
+                if viewport:
+                    options = {'viewport': {'width': int(viewport.group(1)), 'height': int(viewport.group(2))}}
+                else:
+                    options = self._playwright.devices[device] if device else {}
+                self._contexts[device] = await self._browser.new_context(**options)
+            return self._contexts[device]
 
     async def _find_and_close_popups(self, page):
         """
         Private method to find and close any popups that appear on the page.
 
+        The buttons and links are matched and clicked inside the page in a single round trip. The selector of
+        the elements clicked is remembered for the page's host, so later visits click the same consent button
+        straight away. The page is searched again if the button is gone, or if what the selector matches is no
+        longer a consent button.
+
         Args:
             page: The Playwright page object.
 
         Returns:
             None
         """
-        link_text_to_click = ['reject', 'decline',
-                              'accept', 'acknowledge', 'necessary', 'allow']
-        for link_text in link_text_to_click:
-            query_strings = [
-                f'button:has-text("{link_text}")',
-                f'a:has-text("{link_text}")',
-            ]
-            while len(query_strings) > 0:
-                query_string = query_strings.pop(0)
-                try:
-                    buttons = await page.query_selector_all(query_string)
-                    if len(buttons) > 0:
-                        for button in buttons:
-                            await button.click()
-                        break
-                except:
-                    continue
-
-    async def _scroll_page(self, page):
-        """
-        Private method to scroll the page to capture the entire page.
+        host = urlsplit(page.url).hostname
+        try:
+            selector = await page.evaluate(_CLOSE_POPUPS_SCRIPT, [list(_POPUP_KEYWORDS), self._popup_selectors.get(host)])
+        except Exception:
+            # A click may navigate away and destroy the page's execution context.
+            return
+
+        if selector:
+            self._popup_selectors[host] = selector
+
+    async def _scroll_page(self, page, network=None):
+        """
+        Private method to scroll through the page one viewport at a time, so lazy-loaded content is loaded
+        before the capture.
+
+        Scrolling stops once the bottom of the page is in view, its height has not changed for scroll_settle
+        seconds and no request has been in flight for as long, or after scroll_delay seconds at most.
 
         Args:
             page: The Playwright page object.
+            network (_NetworkMonitor): The monitor listening to the page's requests. Default is a new monitor.
 
         Returns:
             None
         """
-        await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-        await asyncio.sleep(self.scroll_delay)
+        own_network = network is None
+        if own_network:
+            network = _NetworkMonitor(page)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.scroll_delay
+        last_height = None
+        stable_since = loop.time()
+        try:
+            while True:
+                height, bottom = await page.evaluate(_SCROLL_STEP_SCRIPT)
+                now = loop.time()
+                if height != last_height:
+                    last_height = height
+                    stable_since = now
+                elif bottom >= height and min(now - stable_since, network.idle_for(now)) >= self.scroll_settle:
+                    break
+
+                if now >= deadline:
+                    break
+                await asyncio.sleep(min(self.scroll_settle / 4, deadline - now))
+        finally:
+            if own_network:
+                network.stop()
+
         await page.evaluate('window.scrollTo(0, 0)')
 
+    async def _save_if_changed(self, url, photo, path):
+        """
+        Private method to save a capture only if the visual diff stage finds it changed since the previous
+        capture at the same path, and to add the outcome to the diff report.
+
+        Args:
+            url (str): The URL of the captured page.
+            photo (bytes): The capture.
+            path (str): The path to save the capture at.
+
+        Returns:
+            DiffResult: The outcome of the comparison.
+        """
+        # Decoding and comparing images is CPU-bound, so keep it off the event loop.
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.visual_diff.compare, photo, path)
+        if result.changed:
+            await loop.run_in_executor(None, self.visual_diff.save, photo, path)
+
+        self.diff_report.append({'url': url, 'path': path, 'changed': result.changed,
+                                 'hash_distance': result.hash_distance, 'diff_ratio': result.diff_ratio})
+        return result
+
+    def save_diff_report(self, path):
+        """
+        Saves the diff report as JSON.
+
+        Args:
+            path (str): The path of the report file.
+
+        Returns:
+            None
+        """
+        with open(path, 'w') as report_file:
+            json.dump(self.diff_report, report_file, indent=2)
+
+    @staticmethod
+    def device_filename(filename, device):
+        """
+        Returns the filename used for a device's variant of a screenshot, such as 'home_iphone_11' for the
+        'iPhone 11' variant of 'home'.
+
+        Args:
+            filename (str): The name of the default screenshot.
+            device (str): The device, or None for the default screenshot.
+
+        Returns:
+            str: The filename of the variant.
+        """
+        if device is None:
+            return filename
+        return f"{filename}_{re.sub(r'[^a-z0-9]+', '_', device.lower()).strip('_')}"
+
+    async def take_screenshots(self, url, filename, devices=(None,)):
+        """
+        Takes a screenshot of the specified URL for each device, all at once in the shared browser. Each device
+        is captured in its own pooled context and saved under device_filename(filename, device).
+
+        Args:
+            url (str): The URL of the web page to take screenshots of.
+            filename (str): The name of the default screenshot, from which the name of each variant is derived.
+            devices (iterable): The devices to emulate, with None for the default context. Default is (None,).
+
+        Returns:
+            dict: The screenshot of each device as a binary string.
+
+        Raises:
+            Exception: The first error raised by a variant, once every variant has finished.
+        """
+        if not filename:
+            raise ValueError('Filename cannot be empty.')
+
+        devices = list(dict.fromkeys(devices))
+        if self._browser is None:
+            async with copy.copy(self) as screenshotter:
+                return await screenshotter.take_screenshots(url, filename, devices)
+
+        photos = await asyncio.gather(
+            *(self.take_screenshot(url, self.device_filename(filename, device), device) for device in devices),
+            return_exceptions=True)
+        for photo in photos:
+            if isinstance(photo, BaseException):
+                raise photo
+        return dict(zip(devices, photos))
+
     async def take_screenshot(self, url, filename, device=None):
         """
         Takes a screenshot of the specified URL and saves it with the specified filename.
@@ -87,7 +426,8 @@ class AsyncScreenshotter:
         Args:
             url (str): The URL of the web page to take a screenshot of.
             filename (str): The name of the file to save the screenshot as.
-            device (str): The device type for which the screenshot should be taken. Default is None.
+            device (str): The device type for which the screenshot should be taken. Default is the
+                screenshotter's device.
 
         Returns:
             The screenshot as a binary string.
@@ -95,32 +435,55 @@ class AsyncScreenshotter:
         if not filename:
             raise ValueError('Filename cannot be empty.')
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context()
+        # Outside of an async with block, launch a browser just for this screenshot. A copy owns it so
+        # concurrent calls never share a browser that another call is about to close.
+        if self._browser is None:
+            async with copy.copy(self) as screenshotter:
+                return await screenshotter.take_screenshot(url, filename, device)
 
-            if device:
-                print("attempting device emulation")
-                emulated_device = p.devices[device]
-                context = await browser.new_context(**emulated_device)
+        context = await self._get_context(device or self.device)
 
+        async with self._page_slots:
             page = await context.new_page()
-            response = await page.goto(url)
+            self._open_pages += 1
+            self.stats.set_gauge('open_pages', self._open_pages)
+            # Listen from the start, so requests made while the page loads count towards its activity.
+            network = _NetworkMonitor(page) if self.scroll_delay > 0 else None
+            try:
+                with self.stats.time('screenshot'):
+                    with self.stats.time('navigate'):
+                        response = await page.goto(url)
+                    self.stats.record_response(response.status if response else None)
 
-            # Close popups
-            if self.close_popups:
-                await self._find_and_close_popups(page)
+                    # Close popups
+                    if self.close_popups:
+                        with self.stats.time('popups'):
+                            await self._find_and_close_popups(page)
 
-            # Scroll page
-            if self.scroll_delay > 0:
-                await self._scroll_page(page)
+                    # Scroll page
+                    if self.scroll_delay > 0:
+                        with self.stats.time('scroll'):
+                            await self._scroll_page(page, network)
 
-            if self.fullscreen:
-                photo = await page.screenshot(
-                    path=os.path.join(self.output_dir, f'{filename}.{self.format}'), type=self.format, full_page=True)
-            else:
-                photo = await page.screenshot(
-                    path=os.path.join(self.output_dir, f'{filename}.{self.format}'), type=self.format)
+                    path = os.path.join(self.output_dir, f'{filename}.{self.format}')
+                    if self.visual_diff is None:
+                        with self.stats.time('capture'):
+                            photo = await page.screenshot(path=path, type=self.format, full_page=self.fullscreen)
+                    else:
+                        with self.stats.time('capture'):
+                            photo = await page.screenshot(type=self.format, full_page=self.fullscreen)
+                        with self.stats.time('diff'):
+                            await self._save_if_changed(url, photo, path)
+            except Exception as e:
+                self.stats.increment('screenshots_failed')
+                self.stats.record_error('screenshot', e)
+                raise
+            finally:
+                if network is not None:
+                    network.stop()
+                await page.close()
+                self._open_pages -= 1
+                self.stats.set_gauge('open_pages', self._open_pages)
 
-            await browser.close()
+            self.stats.increment('screenshots_taken')
             return photo
@@ -0,0 +1,134 @@
+from fnmatch import fnmatchcase
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that only track where a visitor came from and never change the page itself.
+TRACKING_PARAMS = ('utm_*', 'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl')
+
+
+def remove_dot_segments(path):
+    """
+    Collapses the '.' and '..' segments of a URL path, as described in RFC 3986 section 5.2.4.
+
+    Args:
+        path (str): The path of a URL.
+
+    Returns:
+        str: The path without dot segments.
+    """
+    if '.' not in path:
+        return path
+
+    output = []
+    segments = path.split('/')
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == '.':
+            if last:
+                output.append('')
+        elif segment == '..':
+            if len(output) > 1:
+                output.pop()
+            if last:
+                output.append('')
+        else:
+            output.append(segment)
+
+    result = '/'.join(output)
+    if path.startswith('/') and not result.startswith('/'):
+        result = '/' + result
+    return result
+
+
+class UrlCanonicalizer:
+    """
+    Rewrites URLs into a canonical form so that different spellings of the same page are crawled once.
+
+    Each rule can be turned off on its own. URLs that are not http or https are returned unchanged apart
+    from their fragment.
+
+    Args:
+        drop_fragment (bool): Whether to remove the #fragment. Default is True.
+        sort_query (bool): Whether to order query parameters by name. Parameters with the same name keep
+            their relative order. Default is True.
+        strip_params (iterable): Glob patterns for query parameter names to remove. Default is TRACKING_PARAMS.
+        lowercase (bool): Whether to lowercase the scheme and host. Default is True.
+        remove_default_port (bool): Whether to remove :80 from http URLs and :443 from https URLs. Default is True.
+        remove_dot_segments (bool): Whether to collapse '.' and '..' path segments. Default is True.
+    """
+
+    def __init__(self, drop_fragment=True, sort_query=True, strip_params=TRACKING_PARAMS, lowercase=True,
+                 remove_default_port=True, remove_dot_segments=True):
+        self.drop_fragment = drop_fragment
+        self.sort_query = sort_query
+        self.strip_params = tuple(strip_params or ())
+        self.lowercase = lowercase
+        self.remove_default_port = remove_default_port
+        self.remove_dot_segments = remove_dot_segments
+
+    def _is_stripped(self, param):
+        """
+        Returns True if a raw 'name=value' query parameter matches one of strip_params, False otherwise.
+        """
+        name = unquote_plus(param.split('=', 1)[0])
+        return any(fnmatchcase(name, pattern) for pattern in self.strip_params)
+
+    def _canonical_query(self, query):
+        """
+        Returns the query string with stripped parameters removed and the rest sorted by name.
+        """
+        if not query:
+            return query
+
+        params = [param for param in query.split('&') if param]
+        if self.strip_params:
+            params = [param for param in params if not self._is_stripped(param)]
+        if self.sort_query:
+            params.sort(key=lambda param: param.split('=', 1)[0])
+        return '&'.join(params)
+
+    def _canonical_netloc(self, scheme, parts):
+        """
+        Returns the netloc with a lowercased host and without the scheme's default port.
+        """
+        userinfo, _, hostport = parts.netloc.rpartition('@')
+        host = parts.hostname or ''
+        port = parts.port
+
+        if not self.lowercase:
+            # Keep the host as written, which hostname would have lowercased.
+            host = hostport.rsplit(':', 1)[0] if port is not None else hostport
+        elif ':' in host:
+            host = f'[{host}]'
+
+        if port is not None and not (self.remove_default_port and DEFAULT_PORTS.get(scheme) == port):
+            host = f'{host}:{port}'
+        return f'{userinfo}@{host}' if userinfo else host
+
+    def __call__(self, url):
+        """
+        Returns the canonical form of a URL.
+
+        Args:
+            url (str): An absolute URL.
+
+        Returns:
+            str: The canonical URL.
+        """
+        try:
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in DEFAULT_PORTS:
+                return parts._replace(fragment='').geturl() if self.drop_fragment else url
+            netloc = self._canonical_netloc(scheme, parts)
+        except ValueError:
+            # Leave malformed URLs, such as ones with a non-numeric port, as they are.
+            return url
+
+        path = parts.path or '/'
+        if self.remove_dot_segments:
+            path = remove_dot_segments(path)
+        query = self._canonical_query(parts.query)
+        fragment = '' if self.drop_fragment else parts.fragment
+        return urlunsplit((scheme if self.lowercase else parts.scheme, netloc, path, query, fragment))
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+import requests
+from requests.structures import CaseInsensitiveDict
+from snappy.cache import ResponseCache
+
+
+def make_response(url, body, status_code=200, **headers):
+  response = requests.Response()
+  response.url = url
+  response.status_code = status_code
+  response.headers = CaseInsensitiveDict(headers)
+  response._content = body
+  response._content_consumed = True
+  return response
+
+
+class TestResponseCache(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.cache = ResponseCache(os.path.join(self.directory.name, 'cache'), max_size=100)
+    self.url = 'https://example.com'
+
+  def tearDown(self):
+    self.cache.close()
+    self.directory.cleanup()
+
+  def test_validators(self):
+    self.assertEqual(self.cache.validators(self.url), {})
+    self.cache.store(self.url, make_response(self.url, b'<html></html>', ETag='"v1"',
+                                             **{'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}))
+    self.assertEqual(self.cache.validators(self.url), {'If-None-Match': '"v1"',
+                                                       'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+
+  def test_revalidated(self):
+    self.cache.store(self.url, make_response(self.url, b'<html></html>', ETag='"v1"',
+                                             **{'Content-Type': 'text/html; charset=utf-8'}))
+    cached = self.cache.revalidated(self.url, make_response(self.url, b'', 304, ETag='"v1"'))
+    self.assertEqual(cached.status_code, 200)
+    self.assertEqual(cached.text, '<html></html>')
+    self.assertEqual(cached.encoding, 'utf-8')
+
+  def test_skips_responses_without_validators(self):
+    self.cache.store(self.url, make_response(self.url, b'<html></html>'))
+    self.cache.store(self.url + '/missing', make_response(self.url, b'', 404, ETag='"v1"'))
+    self.assertEqual(len(self.cache), 0)
+
+  def test_lru_eviction(self):
+    for name in ('a', 'b', 'c'):
+      self.cache.store(f'{self.url}/{name}', make_response(self.url, b'x' * 40, ETag=name))
+    self.assertLessEqual(self.cache.size, 100)
+    self.assertEqual(self.cache.validators(self.url + '/a'), {})
+    self.assertEqual(self.cache.validators(self.url + '/c'), {'If-None-Match': 'c'})
@@ -1,6 +1,98 @@
 # BEGIN: 6b2f8d5d7f6c
+import asyncio
+import os
+import tempfile
+import threading
+import time
 import unittest
-from snappy.crawlers import UrlCrawler, ImageCrawler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+from types import SimpleNamespace
+from benchmarks.synthetic_site import SyntheticSite
+from snappy.crawlers import UrlCrawler, ImageCrawler, ImageInfo, HEAVY_RESOURCE_TYPES
+from snappy.frontier import ORDERS
+
+
+def serve(test, pages, delay=0, statuses=None):
+  """
+  Serves pages, a dictionary of paths to bodies or to (body, headers) tuples, on 127.0.0.1 for the length of
+  a test and returns its URL. A Content-Length header set to None is left out. A page with an ETag header is
+  answered with 304 Not Modified when the request's If-None-Match matches it. The status code of each response
+  is appended to statuses, if it is given.
+  """
+  class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      time.sleep(delay)
+      body = pages.get(self.path, b'')
+      body, headers = body if isinstance(body, tuple) else (body, {})
+      status = 200 if self.path in pages else 404
+      if 'ETag' in headers and self.headers.get('If-None-Match') == headers['ETag']:
+        status, body = 304, b''
+      headers = {'Content-Length': str(len(body)), **headers}
+      if statuses is not None:
+        statuses.append(status)
+      self.send_response(status)
+      for name, value in headers.items():
+        if value is not None:
+          self.send_header(name, value)
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, format, *args):
+      pass
+
+  server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  test.addCleanup(server.server_close)
+  test.addCleanup(server.shutdown)
+  return f'http://127.0.0.1:{server.server_port}'
+
+
+def chain(length):
+  """
+  Returns the pages of a site where /0 links to /1, /1 to /2 and so on.
+  """
+  pages = {f'/{i}': f'<a href="/{i + 1}">next</a>'.encode() for i in range(length - 1)}
+  pages[f'/{length - 1}'] = b''
+  return pages
+
+
+class FakePlaywrightPage:
+  """
+  Stands in for a page of Playwright's async API on a site given as a dictionary of URLs to (links, images)
+  tuples, where images are (src, alt, width, height) tuples. Navigating to a URL that is not on the site raises.
+  """
+
+  def __init__(self, site):
+    self.site = site
+    self.url = None
+    self.visits = []
+    self.evaluations = 0
+
+  async def goto(self, url, **options):
+    await asyncio.sleep(0.001)
+    self.visits.append(url)
+    if url not in self.site:
+      raise ConnectionError(url)
+    self.url = url
+    return SimpleNamespace(status=200, headers={'content-type': 'text/html'})
+
+  async def evaluate(self, script):
+    self.evaluations += 1
+    links, images = self.site[self.url]
+    return {'links': links, 'images': images} if script.startswith('() => ({') else links
+
+
+def crawl_with_pages(crawler, pages):
+  """
+  Runs the crawler's async loop over a pool of fake Playwright pages, as _run_playwright_async does with real ones.
+  """
+  pool = asyncio.Queue()
+  for page in pages:
+    pool.put_nowait(page)
+  asyncio.run(crawler._run_async(partial(crawler._crawl_page_pooled, pool)))
+  return pool
 
 
 class TestUrlCrawler(unittest.TestCase):
@@ -28,6 +120,328 @@ class TestUrlCrawler(unittest.TestCase):
     self.crawler.run()
     self.assertGreater(len(self.crawler.internal_urls), 0)
 
+  def test_invalid_concurrency(self):
+    with self.assertRaises(ValueError):
+      UrlCrawler(self.base_url, concurrency=0)
+    with self.assertRaises(ValueError):
+      UrlCrawler(self.base_url, concurrency=4, per_host_concurrency=0)
+
+  def test_invalid_pool_size(self):
+    with self.assertRaises(ValueError):
+      UrlCrawler(self.base_url, pool_size=0)
+
+  def test_session_closed_after_run(self):
+    crawler = UrlCrawler(self.base_url, pool_size=4)
+    crawler.run()
+    self.assertIsNone(crawler._session)
+
+  def test_should_block(self):
+    crawler = UrlCrawler(self.base_url, parser='playwright', block_resources=HEAVY_RESOURCE_TYPES,
+                         block_url_patterns=[r'google-analytics\.com'])
+    self.assertTrue(crawler._should_block(SimpleNamespace(resource_type='image', url=self.base_url + '/a.png')))
+    self.assertTrue(crawler._should_block(
+      SimpleNamespace(resource_type='script', url='https://www.google-analytics.com/analytics.js')))
+    self.assertFalse(crawler._should_block(SimpleNamespace(resource_type='document', url=self.base_url)))
+
+  def test_block_document(self):
+    with self.assertRaises(ValueError):
+      UrlCrawler(self.base_url, parser='playwright', block_resources=['document'])
+
+  def test_canonicalize(self):
+    crawler = UrlCrawler(self.base_url, canonicalize=True)
+    hrefs = ['/about#team', 'HTTPS://EXAMPLE.COM:443/about', '/about?utm_source=newsletter']
+    self.assertEqual(crawler._clean_urls(self.base_url, hrefs), [self.base_url + '/about'] * 3)
+
+  def test_canonicalize_start_url(self):
+    pages = {'/': b'<a href="/">home</a><a href="/a">a</a>', '/a': b'<a href="/">home</a>'}
+    base_url = serve(self, pages)
+    crawler = UrlCrawler(base_url + '/', canonicalize=True)
+    crawler.run()
+    # The links back to the home page are the start URL, so it is fetched once.
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 2)
+    self.assertEqual(crawler.url_list, {base_url, base_url + '/a'})
+
+    # A mixed-case host still makes the canonicalized links internal.
+    crawler = UrlCrawler(base_url.replace('127.0.0.1', 'LocalHost') + '/', canonicalize=True)
+    crawler.run()
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 2)
+    self.assertEqual(crawler.external_urls, [])
+
+  def test_run_concurrent(self):
+    crawler = UrlCrawler(self.base_url, concurrency=8, per_host_concurrency=4)
+    crawler.run()
+    self.assertGreater(len(crawler.internal_urls), 0)
+
+  def test_stats(self):
+    pages = {'/': b'<a href="/a">a</a><a href="/missing">missing</a>', '/a': b'<a href="/">home</a>'}
+    base_url = serve(self, pages)
+
+    events = []
+    crawler = UrlCrawler(base_url, stats_hook=lambda event, data: events.append(event))
+    crawler.run()
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 3)
+    self.assertEqual(crawler.stats.statuses, {200: 2, 404: 1})
+    for stage in ('page', 'fetch', 'transfer', 'decode', 'parse'):
+      self.assertEqual(crawler.stats.stages[stage].count, 3)
+    self.assertEqual(crawler.stats.bytes, sum(len(body) for body in pages.values()))
+    self.assertEqual(crawler.stats.gauges['queue_depth'], 0)
+    self.assertIn('stage', events)
+
+  def test_max_depth(self):
+    crawler = UrlCrawler(serve(self, chain(10)) + '/0', max_depth=3)
+    crawler.run()
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 4)
+    # The first URL past the limit is recorded without being crawled.
+    self.assertEqual(len(crawler.url_list), 5)
+    self.assertEqual(crawler.adjacency_list[crawler.url_list[-1]], [])
+    self.assertIsNone(crawler.stop_reason)
+
+  def test_max_depth_keeps_crawled_links(self):
+    pages = {'/': b'<a href="/a">a</a>', '/a': b'<a href="/b">b</a><a href="/">home</a>',
+             '/b': b'<a href="/">home</a><a href="/a">a</a>'}
+    base_url = serve(self, pages)
+    for max_depth, crawled in ((1, 2), (2, 3)):
+      with self.subTest(max_depth=max_depth):
+        crawler = UrlCrawler(base_url, max_depth=max_depth)
+        crawler.run()
+        self.assertEqual(crawler.stats.counters['pages_crawled'], crawled)
+        # The links back to pages crawled earlier leave those pages' links as they were.
+        self.assertEqual(crawler.adjacency_list[base_url], [base_url + '/a'])
+        self.assertEqual(crawler.adjacency_list[base_url + '/a'], [base_url + '/b', base_url])
+    self.assertEqual(crawler.adjacency_list[base_url + '/b'], [base_url, base_url + '/a'])
+
+  def test_max_pages_per_host(self):
+    crawler = UrlCrawler(serve(self, chain(10)) + '/0', concurrency=2, max_pages_per_host=3)
+    crawler.run()
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 3)
+
+  def test_per_host_concurrency_defers_saturated_hosts(self):
+    other = 'https://other.example.com'
+    links = {self.base_url: [other + '/1', other + '/2'] + [self.base_url + f'/{i}' for i in range(6)]}
+    log = []
+
+    async def crawl_page(url):
+      log.append(('start', url))
+      await asyncio.sleep(0.01 if url.startswith(other) else 0.05)
+      log.append(('end', url))
+      return links.get(url, [])
+
+    crawler = UrlCrawler(self.base_url, concurrency=4, per_host_concurrency=1, crawl_external=True,
+                         external_crawl_depth=10)
+    crawler._start_budgets()
+    asyncio.run(crawler._run_async(crawl_page))
+    self.assertEqual(len(crawler.url_list), 9)
+
+    # The other host's pages do not wait behind the queued pages of the start host.
+    starts = [url for event, url in log if event == 'start' and not url.startswith(other)]
+    self.assertLess(log.index(('end', other + '/1')), log.index(('start', starts[3])))
+    running = peak = 0
+    for event, url in log:
+      if not url.startswith(other):
+        running += 1 if event == 'start' else -1
+        peak = max(peak, running)
+    self.assertEqual(peak, 1)
+
+  def test_limit_with_skipped_pages(self):
+    # The PDFs are taken first and skipped, which must not use up the limit.
+    pages = {'/': b'<a href="/1">1</a><a href="/2">2</a><a href="/3">3</a><a href="/a.pdf">a</a><a href="/b.pdf">b</a>'}
+    pages.update({f'/{i}': b'' for i in range(1, 4)})
+    pages.update({path: (b'%PDF-1.4', {'Content-Type': 'application/pdf'}) for path in ('/a.pdf', '/b.pdf')})
+    crawler = UrlCrawler(serve(self, pages, delay=0.05), limit=3, concurrency=4)
+    crawler.run()
+    self.assertEqual(crawler.stats.counters['pages_skipped'], 2)
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 3)
+    self.assertEqual(crawler.stop_reason, 'limit')
+
+  def test_max_bytes(self):
+    pages = chain(10)
+    crawler = UrlCrawler(serve(self, pages) + '/0', max_bytes=len(pages['/0']) * 2)
+    crawler.run()
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 2)
+    self.assertEqual(crawler.stop_reason, 'max_bytes')
+
+  def test_deadline(self):
+    base_url = serve(self, chain(100), delay=0.05) + '/0'
+    for concurrency in (None, 4):
+      crawler = UrlCrawler(base_url, concurrency=concurrency, deadline=0.3)
+      start = time.monotonic()
+      crawler.run()
+      self.assertLess(time.monotonic() - start, 1)
+      self.assertEqual(crawler.stop_reason, 'deadline')
+      self.assertGreater(crawler.stats.counters['pages_crawled'], 0)
+      self.assertLess(crawler.stats.counters['pages_crawled'], 100)
+
+  def test_frontier_order(self):
+    # The home page links to five section pages, and last to the start of a long chain of pages.
+    pages = {f'/trap/{i}': f'<a href="/trap/{i + 1}">next</a>'.encode() for i in range(50)}
+    pages['/'] = b''.join(f'<a href="/section/{i}">{i}</a>'.encode() for i in range(5)) + b'<a href="/trap/0">more</a>'
+    pages.update({f'/section/{i}': b'' for i in range(5)})
+    base_url = serve(self, pages)
+
+    sections = {f'{base_url}/section/{i}' for i in range(5)}
+    dfs = UrlCrawler(base_url, limit=7)
+    dfs.run()
+    self.assertFalse(sections <= dfs.url_list)
+    for order in ('bfs', 'depth', 'best'):
+      crawler = UrlCrawler(base_url, limit=7, frontier_order=order, concurrency=2)
+      crawler.run()
+      self.assertLessEqual(sections, crawler.url_list)
+
+    with self.assertRaises(ValueError):
+      UrlCrawler(base_url, frontier_order='random')
+
+  def test_compact_seen(self):
+    base_url = serve(self, chain(20))
+    crawler = UrlCrawler(base_url + '/0', compact_seen=True, concurrency=2)
+    crawler.run()
+    self.assertEqual(crawler.url_list, {f'{base_url}/{i}' for i in range(20)})
+    self.assertEqual(crawler.stats.counters['pages_crawled'], 20)
+
+  def test_link_graph(self):
+    pages = {'/': b'<a href="/a">a</a><a href="https://other.example/x">x</a>', '/a': b'<a href="/">home</a>'}
+    base_url = serve(self, pages)
+    crawler = UrlCrawler(base_url)
+    crawler.run()
+    self.assertEqual(crawler[0], base_url)
+    self.assertEqual(list(crawler), [crawler[i] for i in range(len(crawler))])
+    self.assertEqual(sorted(crawler.internal_urls), [base_url, base_url + '/a'])
+    self.assertEqual(crawler.external_urls, ['https://other.example/x'])
+    self.assertEqual(crawler.adjacency_list, {base_url: [base_url + '/a', 'https://other.example/x'],
+                                              'https://other.example/x': [], base_url + '/a': [base_url]})
+
+  def test_content_types(self):
+    pages = {
+      '/': (b'<a href="/report.pdf">pdf</a><a href="/api">api</a><a href="/page">page</a>',
+            {'Content-Type': 'text/html; charset=utf-8'}),
+      '/report.pdf': (b'%PDF-1.4 <a href="/hidden">hidden</a>', {'Content-Type': 'application/pdf'}),
+      '/api': (b'{"html": "<a href=\'/hidden\'>hidden</a>"}', {'Content-Type': 'application/json'}),
+      '/page': b'',
+    }
+    base_url = serve(self, pages)
+    for parser in ('bs4', 'stream'):
+      crawler = UrlCrawler(base_url, parser=parser)
+      crawler.run()
+      self.assertNotIn(base_url + '/hidden', crawler.url_list)
+      self.assertEqual(crawler.adjacency_list[base_url + '/report.pdf'], [])
+      self.assertEqual(crawler.stats.counters['skipped_content_type'], 2)
+      self.assertEqual(crawler.stats.counters['pages_crawled'], 2)
+
+    crawler = UrlCrawler(base_url, content_types=None)
+    crawler.run()
+    self.assertIn(base_url + '/hidden', crawler.url_list)
+
+  def test_max_body_size(self):
+    big = b'<a href="/hidden">hidden</a>' + b' ' * 5000
+    pages = {
+      '/': b'<a href="/big">big</a><a href="/unsized">unsized</a>',
+      '/big': big,
+      '/unsized': (big, {'Content-Length': None, 'Connection': 'close'}),
+    }
+    base_url = serve(self, pages)
+    for parser in ('bs4', 'stream'):
+      crawler = UrlCrawler(base_url, parser=parser, max_body_size=1000)
+      crawler.run()
+      self.assertNotIn(base_url + '/hidden', crawler.url_list)
+      self.assertEqual(crawler.stats.counters['skipped_too_large'], 2)
+
+    with self.assertRaises(ValueError):
+      UrlCrawler(base_url, max_body_size=0)
+
+  def test_resume_checkpoint(self):
+    pages = {'/': b''.join(f'<a href="/{i}">{i}</a>'.encode() for i in range(4))}
+    pages.update({f'/{i}': b''.join(f'<a href="/{i}/{j}">{j}</a>'.encode() for j in range(3)) for i in range(4)})
+    base_url = serve(self, pages)
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+
+    for order in ('dfs', 'bfs'):
+      with self.subTest(frontier_order=order):
+        uninterrupted = UrlCrawler(base_url, frontier_order=order)
+        uninterrupted.run()
+
+        # The first run stops after five pages, and a second crawler resumes it from the checkpoint file.
+        path = os.path.join(directory.name, f'{order}.db')
+        interrupted = UrlCrawler(base_url, frontier_order=order, limit=5, checkpoint=path, checkpoint_every=1)
+        interrupted.run()
+        interrupted.close()
+        self.assertEqual(len(interrupted.url_list), 5)
+        resumed = UrlCrawler(base_url, frontier_order=order, checkpoint=path)
+        resumed.run()
+        resumed.close()
+
+        self.assertEqual(resumed.url_list.to_list(), uninterrupted.url_list.to_list())
+        self.assertEqual(resumed.adjacency_list.to_dict(), uninterrupted.adjacency_list.to_dict())
+
+  def test_resume_synthetic_site(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    with SyntheticSite(pages=60, fanout=5, images=1, page_size=100, fail_ratio=0.1) as site:
+      for order in ORDERS:
+        with self.subTest(frontier_order=order):
+          uninterrupted = UrlCrawler(site.start_url, frontier_order=order)
+          uninterrupted.run()
+
+          # Stop the crawl twice, then let it finish.
+          path = os.path.join(directory.name, f'{order}.db')
+          for limit in (20, 40, None):
+            resumed = UrlCrawler(site.start_url, frontier_order=order, limit=limit, checkpoint=path)
+            resumed.run()
+            resumed.close()
+
+          self.assertEqual(resumed.url_list.to_list(), uninterrupted.url_list.to_list())
+          self.assertEqual(resumed.adjacency_list.to_dict(), uninterrupted.adjacency_list.to_dict())
+
+  def test_cache_revalidation(self):
+    statuses = []
+    pages = {'/': (b'<a href="/a">a</a><a href="/b">b</a>', {'ETag': '"home"'}),
+             '/a': (b'<a href="/">home</a>', {'ETag': '"a"'}), '/b': b'<a href="/a">a</a>'}
+    base_url = serve(self, pages, statuses=statuses)
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+
+    first = UrlCrawler(base_url, cache_dir=directory.name)
+    first.run()
+    first.close()
+    self.assertEqual(sorted(statuses), [200, 200, 200])
+
+    # The pages with an ETag are revalidated and read from the cache, the one without is fetched again.
+    statuses.clear()
+    second = UrlCrawler(base_url, cache_dir=directory.name)
+    second.run()
+    second.close()
+    self.assertEqual(sorted(statuses), [200, 304, 304])
+    self.assertEqual(second.adjacency_list.to_dict(), first.adjacency_list.to_dict())
+
+  def test_playwright_page_pool(self):
+    site = {self.base_url: ([self.base_url + f'/{i}' for i in range(6)] + [self.base_url + '/down'], [])}
+    site.update({self.base_url + f'/{i}': ([self.base_url], []) for i in range(6)})
+    crawler = UrlCrawler(self.base_url, parser='playwright', concurrency=3)
+    pages = [FakePlaywrightPage(site) for _ in range(3)]
+    pool = crawl_with_pages(crawler, pages)
+
+    # Every page is back in the pool, including the one whose navigation failed, and the pool was shared.
+    self.assertEqual(pool.qsize(), 3)
+    self.assertEqual(sum(len(page.visits) for page in pages), 8)
+    self.assertGreater(sum(1 for page in pages if page.visits), 1)
+    self.assertEqual(crawler.stats.counters['pages_failed'], 1)
+    self.assertEqual(len(crawler.url_list), 8)
+
+  def test_playwright_one_evaluation_per_page(self):
+    site = {self.base_url: ([self.base_url + '/a', self.base_url + '/b'], []), self.base_url + '/a': ([], []),
+            self.base_url + '/b': ([self.base_url + '/a'], [])}
+    crawler = UrlCrawler(self.base_url, parser='playwright', concurrency=2)
+    pages = [FakePlaywrightPage(site) for _ in range(2)]
+    crawl_with_pages(crawler, pages)
+    self.assertEqual(sum(page.evaluations for page in pages), 3)
+    self.assertEqual(crawler.stats.stages['extract'].count, 3)
+    self.assertEqual(crawler.adjacency_list[self.base_url + '/b'], [self.base_url + '/a'])
+
+  def test_invalid_budgets(self):
+    with self.assertRaises(ValueError):
+      UrlCrawler(self.base_url, deadline=-1)
+    with self.assertRaises(ValueError):
+      ImageCrawler(self.base_url, max_depth=-1)
+
 
 class TestImageCrawler(unittest.TestCase):
   def setUp(self):
@@ -53,4 +467,59 @@ class TestImageCrawler(unittest.TestCase):
   def test_run(self):
     self.crawler.run()
     self.assertGreater(len(self.crawler.internal_urls), 0)
-    self.assertGreaterEqual(len(self.crawler.image_list), 0)
\ No newline at end of file
+    self.assertGreaterEqual(len(self.crawler.image_list), 0)
+
+  def test_run_concurrent(self):
+    crawler = ImageCrawler(self.base_url, concurrency=8)
+    crawler.run()
+    self.assertGreater(len(crawler.internal_urls), 0)
+    self.assertGreaterEqual(len(crawler.image_list), 0)
+
+  def test_fetches_each_page_once(self):
+    statuses = []
+    pages = {'/': b'<img src="/a.png" alt="a"><a href="/about">about</a>', '/about': b'<img src="/b.gif">'}
+    base_url = serve(self, pages, statuses=statuses)
+    crawler = ImageCrawler(base_url)
+    crawler.run()
+    self.assertEqual(len(statuses), 2)
+    self.assertEqual([image.src for image in crawler.image_list], [base_url + '/a.png', base_url + '/b.gif'])
+    self.assertEqual(crawler.adjacency_list[base_url], [base_url + '/about'])
+
+  def test_playwright_navigates_each_page_once(self):
+    site = {self.base_url: ([self.base_url + '/about'], [[self.base_url + '/a.png', 'a', '10', '20']]),
+            self.base_url + '/about': ([], [[self.base_url + '/b.gif', None, None, None]])}
+    crawler = ImageCrawler(self.base_url, parser='playwright', concurrency=2)
+    pages = [FakePlaywrightPage(site) for _ in range(2)]
+    crawl_with_pages(crawler, pages)
+    self.assertEqual(sorted(url for page in pages for url in page.visits), [self.base_url, self.base_url + '/about'])
+    self.assertEqual(sum(page.evaluations for page in pages), 2)
+    self.assertEqual([image.src for image in crawler.image_list], [self.base_url + '/a.png', self.base_url + '/b.gif'])
+    self.assertEqual(crawler.image_list[0].width, '10')
+
+  def test_add_images_deduplicates_src(self):
+    page_url = self.base_url + '/about'
+    images = [
+      ImageInfo(self.base_url + '/a.png', 'a', None, None, 'png', page_url),
+      ImageInfo(self.base_url + '/a.png', 'again', None, None, 'png', page_url),
+      ImageInfo(self.base_url + '/b.png', 'b', None, None, 'png', page_url),
+    ]
+    self.crawler._add_images(images)
+    self.crawler._add_images(images[:1])
+    self.assertEqual([image['src'] for image in self.crawler.image_list],
+                     [self.base_url + '/a.png', self.base_url + '/b.png'])
+
+
+class TestImageInfo(unittest.TestCase):
+  def test_key_access(self):
+    image = ImageInfo('https://example.com/a.png', 'alt', '10', '20', 'png', 'https://example.com')
+    self.assertEqual(image['src'], image.src)
+    self.assertEqual(image['from'], 'https://example.com')
+    self.assertIsNone(image.get('missing'))
+    with self.assertRaises(KeyError):
+      image['missing']
+
+  def test_to_dict(self):
+    image = ImageInfo('https://example.com/a.png', page_url='https://example.com')
+    self.assertEqual(image.to_dict(), {'src': 'https://example.com/a.png', 'alt': None, 'width': None,
+                                       'height': None, 'format': None, 'from': 'https://example.com',
+                                       'size': None})
@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import unittest
+from snappy.diff import VisualDiff
+
+try:
+  import numpy
+  from PIL import Image
+except ImportError:
+  numpy = Image = None
+
+
+def make_png(size=(64, 64), color=(255, 255, 255), box=None, box_color=(0, 0, 0)):
+  image = Image.new('RGB', size, color)
+  if box:
+    image.paste(box_color, box)
+  buffer = io.BytesIO()
+  image.save(buffer, format='PNG')
+  return buffer.getvalue()
+
+
+@unittest.skipIf(numpy is None or Image is None, 'VisualDiff requires numpy and Pillow')
+class TestVisualDiff(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, 'page.png')
+    self.diff = VisualDiff()
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def test_missing_previous_is_changed(self):
+    self.assertTrue(self.diff.compare(make_png(), self.path).changed)
+
+  def test_corrupt_previous_is_changed(self):
+    for previous in (make_png()[:100], b'not an image'):
+      with self.subTest(previous=previous[:12]):
+        with open(self.path, 'wb') as previous_file:
+          previous_file.write(previous)
+        self.assertEqual(self.diff.compare(make_png(), self.path), (True, None, None))
+
+  def test_identical_bytes_are_unchanged(self):
+    self.diff.save(make_png(), self.path)
+    result = self.diff.compare(make_png(), self.path)
+    self.assertFalse(result.changed)
+    self.assertEqual(result.diff_ratio, 0.0)
+
+  def test_small_noise_is_unchanged(self):
+    self.diff.save(make_png(color=(200, 200, 200)), self.path)
+    self.assertFalse(self.diff.compare(make_png(color=(203, 203, 203)), self.path).changed)
+
+  def test_changed_region(self):
+    self.diff.save(make_png(), self.path)
+    result = self.diff.compare(make_png(box=(0, 0, 32, 64)), self.path)
+    self.assertTrue(result.changed)
+
+  def test_threshold(self):
+    self.diff.save(make_png(), self.path)
+    new = make_png(box=(0, 0, 4, 4))
+    self.assertTrue(self.diff.compare(new, self.path).changed)
+    self.assertFalse(VisualDiff(threshold=0.01).compare(new, self.path).changed)
+
+  def test_resized_is_changed(self):
+    self.diff.save(make_png(), self.path)
+    self.assertTrue(self.diff.compare(make_png(size=(64, 80)), self.path).changed)
+
+  def test_content_store_links_identical_captures(self):
+    diff = VisualDiff(content_store=os.path.join(self.directory.name, 'store'))
+    other_path = os.path.join(self.directory.name, 'other.png')
+    diff.save(make_png(), self.path)
+    diff.save(make_png(), other_path)
+    self.assertTrue(os.path.samefile(self.path, other_path))
+    self.assertEqual(len(os.listdir(diff.content_store)), 1)
+
+    # Replacing one capture leaves the stored file and the other capture intact.
+    diff.save(make_png(box=(0, 0, 32, 64)), self.path)
+    self.assertFalse(os.path.samefile(self.path, other_path))
+    with open(other_path, 'rb') as other_file:
+      self.assertEqual(other_file.read(), make_png())
+
+
+if __name__ == '__main__':
+  unittest.main()
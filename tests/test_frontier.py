@@ -0,0 +1,190 @@
+import os
+import tempfile
+import unittest
+from snappy.crawlers import ImageInfo
+from snappy.frontier import Frontier, SQLiteFrontier, default_score
+from snappy.seen import FingerprintSet
+
+
+class TestFrontier(unittest.TestCase):
+  def test_stack_order(self):
+    frontier = Frontier()
+    frontier.push('https://example.com/a')
+    frontier.push('https://example.com/b')
+    self.assertEqual(len(frontier), 2)
+    self.assertEqual(frontier.pop(), 'https://example.com/b')
+
+  def test_count(self):
+    frontier = Frontier()
+    frontier.start('https://example.com')
+    frontier.finish('https://example.com', True)
+    frontier.start('https://example.com/broken')
+    frontier.finish('https://example.com/broken', False)
+    self.assertEqual(frontier.count, 1)
+    self.assertIn('https://example.com/broken', frontier.crawled)
+
+  def test_depths(self):
+    frontier = Frontier()
+    frontier.push('https://example.com/a', 2)
+    frontier.push('https://example.com/a', 1)
+    frontier.push('https://example.com/a', 3)
+    self.assertEqual(frontier.depths['https://example.com/a'], 1)
+    frontier.start('https://example.com/a')
+    frontier.finish('https://example.com/a', True)
+    self.assertNotIn('https://example.com/a', frontier.depths)
+
+  def test_bfs_order(self):
+    frontier = Frontier('bfs')
+    for url in ('https://example.com/a', 'https://example.com/b', 'https://example.com/a'):
+      frontier.push(url)
+    self.assertEqual(len(frontier), 2)
+    self.assertEqual([frontier.pop(), frontier.pop()], ['https://example.com/a', 'https://example.com/b'])
+
+  def test_depth_order(self):
+    frontier = Frontier('depth')
+    frontier.push('https://example.com/deep', 3)
+    frontier.push('https://example.com/a', 1)
+    frontier.push('https://example.com/b', 1)
+    frontier.push('https://example.com/deep', 0)
+    self.assertEqual(frontier.depths['https://example.com/deep'], 0)
+    self.assertEqual([frontier.pop() for _ in range(3)],
+                     ['https://example.com/deep', 'https://example.com/a', 'https://example.com/b'])
+
+  def test_best_order(self):
+    frontier = Frontier('best')
+    frontier.push('https://example.com/calendar/2024/01?page=2', 1)
+    frontier.push('https://example.com/about', 1)
+    frontier.push('https://example.com/blog/post', 2)
+    self.assertEqual(frontier.pop(), 'https://example.com/about')
+    self.assertEqual(frontier.pop(), 'https://example.com/blog/post')
+
+    frontier = Frontier('best', scorer=lambda url, depth: len(url))
+    frontier.push('https://example.com/a')
+    frontier.push('https://example.com/longer')
+    self.assertEqual(frontier.pop(), 'https://example.com/longer')
+
+  def test_default_score(self):
+    self.assertGreater(default_score('https://example.com/about', 1), default_score('https://example.com/about', 2))
+    self.assertGreater(default_score('https://example.com/about', 1),
+                       default_score('https://example.com/about?sort=asc&page=3', 1))
+
+  def test_invalid_order(self):
+    with self.assertRaises(ValueError):
+      Frontier('random')
+
+  def test_push_skips_started(self):
+    frontier = Frontier()
+    frontier.start('https://example.com')
+    frontier.push('https://example.com')
+    self.assertEqual(len(frontier), 0)
+
+  def test_requeue(self):
+    frontier = Frontier(order='bfs')
+    frontier.push('https://example.com/a', 2)
+    url = frontier.pop()
+    frontier.requeue(url)
+    self.assertEqual(frontier.queue, [url])
+    self.assertEqual(frontier.depths[url], 2)
+    frontier.start(frontier.pop())
+    frontier.requeue(url)
+    self.assertEqual(len(frontier), 0)
+
+
+class TestSQLiteFrontier(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, 'crawl.db')
+    self.base_url = 'https://example.com'
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def test_new_crawl(self):
+    frontier = SQLiteFrontier(self.path, self.base_url)
+    self.assertFalse(frontier.resumed)
+    self.assertEqual(frontier.queue, [self.base_url])
+    frontier.close()
+
+  def test_resume_requeued(self):
+    frontier = SQLiteFrontier(self.path, self.base_url, order='bfs')
+    frontier.requeue(frontier.pop())
+    frontier.close()
+    resumed = SQLiteFrontier(self.path, self.base_url, order='bfs')
+    self.assertEqual(resumed.queue, [self.base_url])
+    resumed.close()
+
+  def test_resume(self):
+    frontier = SQLiteFrontier(self.path, self.base_url, checkpoint_every=1)
+    url = frontier.pop()
+    frontier.start(url)
+    frontier.add_url(url)
+    frontier.add_url('https://a.example.com')
+    frontier.set_links(url, [self.base_url + '/a', self.base_url + '/b'])
+    frontier.add_image(ImageInfo(self.base_url + '/a.png', page_url=url))
+    frontier.push(self.base_url + '/a')
+    frontier.push(self.base_url + '/b')
+    frontier.finish(url, True)
+    frontier.start(frontier.pop())
+    frontier.close()
+
+    resumed = SQLiteFrontier(self.path, self.base_url)
+    self.assertTrue(resumed.resumed)
+    self.assertEqual(resumed.count, 1)
+    self.assertEqual(resumed.crawled, {self.base_url})
+    # /b was in flight when the crawl stopped, so it is queued again.
+    self.assertEqual(sorted(resumed.queue), [self.base_url + '/a', self.base_url + '/b'])
+    # URLs come back in the order they were recorded, not sorted.
+    self.assertEqual(resumed.load_url_list(), [self.base_url, 'https://a.example.com'])
+    self.assertEqual(resumed.load_adjacency_list(), {self.base_url: [self.base_url + '/a', self.base_url + '/b']})
+    self.assertEqual(resumed.load_image_srcs(), {self.base_url + '/a.png'})
+    resumed.close()
+
+  def test_resume_compact(self):
+    frontier = SQLiteFrontier(self.path, self.base_url, compact=True)
+    url = frontier.pop()
+    frontier.start(url)
+    frontier.push(self.base_url + '/a', 1)
+    frontier.finish(url, True)
+    frontier.close()
+
+    resumed = SQLiteFrontier(self.path, self.base_url, compact=True)
+    self.assertIsInstance(resumed.crawled, FingerprintSet)
+    self.assertIn(self.base_url, resumed.crawled)
+    resumed.push(self.base_url)
+    self.assertEqual(resumed.queue, [self.base_url + '/a'])
+    resumed.close()
+
+  def test_resume_depths(self):
+    frontier = SQLiteFrontier(self.path, self.base_url)
+    url = frontier.pop()
+    frontier.start(url)
+    frontier.push(self.base_url + '/a', 1)
+    frontier.push(self.base_url + '/b', 1)
+    frontier.finish(url, True)
+    frontier.start(frontier.pop())
+    frontier.close()
+
+    resumed = SQLiteFrontier(self.path, self.base_url)
+    self.assertEqual(resumed.depths, {self.base_url + '/a': 1, self.base_url + '/b': 1})
+    resumed.close()
+
+  def test_resume_order(self):
+    frontier = SQLiteFrontier(self.path, self.base_url, order='bfs')
+    url = frontier.pop()
+    frontier.start(url)
+    for path in ('/a', '/b', '/c'):
+      frontier.push(self.base_url + path, 1)
+    frontier.finish(url, True)
+    frontier.checkpoint()
+    frontier.start(frontier.pop())
+    frontier.close()
+
+    resumed = SQLiteFrontier(self.path, self.base_url, order='bfs')
+    # /a was in flight when the crawl stopped, so it is queued again behind the others.
+    self.assertEqual([resumed.pop() for _ in range(3)], [self.base_url + '/b', self.base_url + '/c', self.base_url + '/a'])
+    resumed.close()
+
+  def test_different_start_url(self):
+    SQLiteFrontier(self.path, self.base_url).close()
+    with self.assertRaises(ValueError):
+      SQLiteFrontier(self.path, 'https://google.com')
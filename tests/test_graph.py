@@ -0,0 +1,70 @@
+import json
+import unittest
+from snappy.graph import LinkGraph
+
+
+class TestLinkGraph(unittest.TestCase):
+  def setUp(self):
+    self.graph = LinkGraph(lambda url: url.startswith('https://example.com'))
+
+  def test_intern(self):
+    first = self.graph.intern('https://example.com/a')
+    self.assertEqual(self.graph.intern('https://example.com/b'), first + 1)
+    self.assertEqual(self.graph.intern('https://example.com/a'), first)
+    self.assertEqual(self.graph.url(first), 'https://example.com/a')
+
+  def test_urls(self):
+    for url in ['https://example.com', 'https://other.com', 'https://example.com/a', 'https://other.com']:
+      self.graph.add_url(url)
+    urls = self.graph.urls
+    self.assertEqual(urls, {'https://example.com', 'https://example.com/a', 'https://other.com'})
+    self.assertEqual(len(urls), 3)
+    self.assertEqual(urls[0], 'https://example.com')
+    self.assertEqual(urls[-1], 'https://example.com/a')
+    self.assertEqual(urls[1:], ['https://other.com', 'https://example.com/a'])
+    self.assertIn('https://other.com', urls)
+    self.assertEqual(urls | {'https://new.com'}, set(urls) | {'https://new.com'})
+    self.assertEqual(self.graph.internal_urls, ['https://example.com', 'https://example.com/a'])
+    self.assertEqual(self.graph.external_urls, ['https://other.com'])
+
+  def test_linked_urls_are_not_recorded(self):
+    self.graph.set_links('https://example.com', ['https://example.com/a'])
+    self.assertNotIn('https://example.com/a', self.graph.urls)
+    self.assertEqual(len(self.graph.urls), 0)
+
+  def test_adjacency(self):
+    adjacency = self.graph.adjacency
+    adjacency['https://example.com'] = ['https://example.com/a', 'https://other.com', 'https://example.com/a']
+    adjacency['https://other.com'] = []
+    self.assertEqual(adjacency, {
+      'https://example.com': ['https://example.com/a', 'https://other.com', 'https://example.com/a'],
+      'https://other.com': [],
+    })
+    self.assertEqual(list(adjacency), ['https://example.com', 'https://other.com'])
+    self.assertNotIn('https://example.com/a', adjacency)
+    with self.assertRaises(KeyError):
+      adjacency['https://example.com/a']
+
+    adjacency['https://example.com'] = ['https://other.com']
+    self.assertEqual(adjacency['https://example.com'], ['https://other.com'])
+    self.assertEqual(list(adjacency), ['https://other.com', 'https://example.com'])
+    del adjacency['https://other.com']
+    self.assertEqual(len(adjacency), 1)
+    self.assertEqual(adjacency.get('https://other.com'), None)
+
+  def test_to_dict(self):
+    self.graph.add_url('https://example.com')
+    self.graph.set_links('https://example.com', ['https://example.com/a'])
+    self.assertEqual(json.dumps(self.graph.adjacency.to_dict()), '{"https://example.com": ["https://example.com/a"]}')
+    self.assertEqual(self.graph.urls.to_list(), ['https://example.com'])
+
+  def test_set_adjacency(self):
+    self.graph.set_links('https://example.com', ['https://example.com/a'])
+    self.graph.set_adjacency({'https://example.com/a': ['https://example.com']})
+    self.assertEqual(dict(self.graph.adjacency), {'https://example.com/a': ['https://example.com']})
+
+  def test_set_urls(self):
+    self.graph.add_url('https://example.com')
+    self.graph.set_urls({'https://other.com'})
+    self.assertEqual(self.graph.urls, {'https://other.com'})
+    self.assertEqual(self.graph.internal_urls, [])
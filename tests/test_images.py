@@ -0,0 +1,161 @@
+import io
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from snappy.crawlers import ImageCrawler
+from snappy.images import ImageProber, ProbeResult, sniff_image
+
+try:
+  from PIL import Image
+except ImportError:
+  Image = None
+
+# The test images are encoded with Pillow.
+requires_pillow = unittest.skipIf(Image is None, 'Pillow is not installed')
+
+
+def encode(format, size=(37, 21), mode='RGB', **params):
+  buffer = io.BytesIO()
+  Image.new(mode, size, (200, 100, 50, 255)[:len(mode)]).save(buffer, format=format, **params)
+  return buffer.getvalue()
+
+
+def serve_ranges(test, files):
+  """
+  Serves files, a dictionary of paths to bodies, on 127.0.0.1 for the length of a test, answering
+  Range requests with 206 Partial Content. Returns the URL and a list of the byte ranges requested.
+  """
+  ranges = []
+
+  class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+      body = files.get(self.path)
+      if body is None:
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return
+
+      requested = self.headers.get('Range')
+      ranges.append(requested)
+      if requested:
+        start, end = (int(value) for value in requested[len('bytes='):].split('-'))
+        part = body[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{start + len(part) - 1}/{len(body)}')
+      else:
+        part = body
+        self.send_response(200)
+      self.send_header('Content-Length', str(len(part)))
+      self.end_headers()
+      self.wfile.write(part)
+
+    def log_message(self, format, *args):
+      pass
+
+  server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  test.addCleanup(server.server_close)
+  test.addCleanup(server.shutdown)
+  return f'http://127.0.0.1:{server.server_port}', ranges
+
+
+@requires_pillow
+class TestSniffImage(unittest.TestCase):
+  def test_formats(self):
+    for format, name in [('PNG', 'png'), ('GIF', 'gif'), ('JPEG', 'jpeg'), ('WEBP', 'webp'), ('BMP', 'bmp')]:
+      with self.subTest(format=format):
+        self.assertEqual(sniff_image(encode(format)), (name, 37, 21))
+
+  def test_webp_variants(self):
+    self.assertEqual(sniff_image(encode('WEBP', lossless=True)), ('webp', 37, 21))
+    self.assertEqual(sniff_image(encode('WEBP', mode='RGBA', size=(300, 5))), ('webp', 300, 5))
+
+  def test_ico(self):
+    self.assertEqual(sniff_image(encode('ICO', size=(32, 32), sizes=[(32, 32)])), ('ico', 32, 32))
+
+  def test_progressive_jpeg(self):
+    self.assertEqual(sniff_image(encode('JPEG', size=(640, 480), progressive=True)), ('jpeg', 640, 480))
+
+  def test_truncated_header(self):
+    data = encode('JPEG', size=(10, 10), exif=b'Exif\x00\x00' + bytes(20000))
+    self.assertEqual(sniff_image(data[:1024]), ('jpeg', None, None))
+    self.assertEqual(sniff_image(data), ('jpeg', 10, 10))
+
+  def test_svg(self):
+    self.assertEqual(sniff_image(b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg"/>'),
+                     ('svg', None, None))
+
+  def test_unknown(self):
+    self.assertIsNone(sniff_image(b'<html><body>Not an image</body></html>'))
+    self.assertIsNone(sniff_image(b''))
+
+
+@requires_pillow
+class TestImageProber(unittest.TestCase):
+  def test_probe_reads_only_the_head(self):
+    image = encode('PNG', size=(400, 300))
+    url, ranges = serve_ranges(self, {'/a.png': image})
+    result = ImageProber(probe_bytes=64).probe(url + '/a.png')
+    self.assertEqual(result, ProbeResult('png', 400, 300, len(image)))
+    self.assertEqual(ranges, ['bytes=0-63'])
+
+  def test_probe_reads_more_for_late_headers(self):
+    image = encode('JPEG', size=(10, 10), exif=b'Exif\x00\x00' + bytes(20000))
+    url, ranges = serve_ranges(self, {'/a.jpg': image})
+    result = ImageProber(probe_bytes=1024, max_probe_bytes=32 * 1024).probe(url + '/a.jpg')
+    self.assertEqual(result, ProbeResult('jpeg', 10, 10, len(image)))
+    self.assertEqual(ranges, ['bytes=0-1023', 'bytes=0-32767'])
+
+  def test_probe_all(self):
+    files = {f'/{i}.gif': encode('GIF', size=(i + 1, 2)) for i in range(20)}
+    files['/page.html'] = b'<html></html>'
+    url, ranges = serve_ranges(self, files)
+    urls = [url + path for path in files] + [url + '/missing.png', 'data:image/png;base64,AAAA']
+    results = ImageProber(concurrency=4).probe_all(urls)
+    self.assertEqual(len(results), 20)
+    self.assertEqual(results[url + '/5.gif'], ProbeResult('gif', 6, 2, len(files['/5.gif'])))
+    self.assertEqual(len(ranges), 21)
+
+  def test_invalid_options(self):
+    with self.assertRaises(ValueError):
+      ImageProber(concurrency=0)
+    with self.assertRaises(ValueError):
+      ImageProber(probe_bytes=0)
+    with self.assertRaises(ValueError):
+      ImageProber(probe_bytes=1024, max_probe_bytes=512)
+
+
+@requires_pillow
+class TestImageCrawlerProbe(unittest.TestCase):
+  def test_probe_images(self):
+    png, webp = encode('PNG', size=(120, 80)), encode('WEBP', size=(64, 48))
+    page = (b'<html><body><img src="/img/a.png" width="12"><img src="/img/b?fmt=webp">'
+            b'<img src="/img/missing.png"></body></html>')
+    url, ranges = serve_ranges(self, {'/': page, '/img/a.png': png, '/img/b?fmt=webp': webp})
+    crawler = ImageCrawler(url + '/', probe_images=True, probe_bytes=256)
+    crawler.run()
+
+    images = {image.src: image for image in crawler.image_list}
+    self.assertEqual((images[url + '/img/a.png'].format, images[url + '/img/a.png'].width,
+                      images[url + '/img/a.png'].height, images[url + '/img/a.png'].size), ('png', 120, 80, len(png)))
+    self.assertEqual(images[url + '/img/b?fmt=webp'].format, 'webp')
+    self.assertEqual(images[url + '/img/b?fmt=webp']['size'], len(webp))
+    self.assertEqual(images[url + '/img/missing.png'].format, 'png')
+    self.assertIsNone(images[url + '/img/missing.png'].size)
+    self.assertEqual(crawler.stats.counters['images_probed'], 2)
+    self.assertEqual(crawler.stats.stages['probe'].count, 3)
+
+    # Only the image that failed is probed again.
+    crawler.probe()
+    self.assertEqual(ranges.count('bytes=0-255'), 2)
+    self.assertEqual(crawler.stats.stages['probe'].count, 4)
+
+  def test_invalid_options(self):
+    with self.assertRaises(ValueError):
+      ImageCrawler('https://example.com', probe_concurrency=0)
+    with self.assertRaises(ValueError):
+      ImageCrawler('https://example.com', probe_bytes=0)
@@ -0,0 +1,57 @@
+import unittest
+from bs4 import BeautifulSoup
+from snappy.parsers import StreamingLinkExtractor
+
+
+PAGE = b'''<html><head><title>Test</title></head><body>
+<A HREF="/upper">Upper</A>
+<a class="nav" href='/single'>Single</a>
+<a href=/bare>Bare</a>
+<a href="/query?a=1&amp;b=2">Entity</a>
+<a name="anchor">No href</a>
+<abbr title="not a link">abbr</abbr>
+<img src="/a.png" alt="An image" width="10" height="20">
+<img alt="No src">
+<img src="/b.jpg"/>
+</body></html>'''
+
+
+def extract(chunks):
+  extractor = StreamingLinkExtractor()
+  for chunk in chunks:
+    extractor.feed(chunk)
+  extractor.close()
+  return extractor
+
+
+class TestStreamingLinkExtractor(unittest.TestCase):
+  def test_links(self):
+    extractor = extract([PAGE])
+    self.assertEqual(extractor.links, ['/upper', '/single', '/bare', '/query?a=1&b=2'])
+
+  def test_images(self):
+    extractor = extract([PAGE])
+    self.assertEqual(extractor.images, [('/a.png', 'An image', '10', '20'), (None, 'No src', None, None),
+                                        ('/b.jpg', None, None, None)])
+
+  def test_tags_split_across_chunks(self):
+    whole = extract([PAGE])
+    for size in (1, 2, 7, 64):
+      chunks = [PAGE[i:i + size] for i in range(0, len(PAGE), size)]
+      split = extract(chunks)
+      self.assertEqual(split.links, whole.links)
+      self.assertEqual(split.images, whole.images)
+
+  def test_matches_bs4(self):
+    soup = BeautifulSoup(PAGE.decode(), 'html.parser')
+    hrefs = [link.get('href') for link in soup.find_all('a') if link.get('href')]
+    self.assertEqual(extract([PAGE]).links, hrefs)
+
+  def test_unclosed_tag_dropped(self):
+    extractor = extract([b'<a href="/done">x</a><a href="/unfinished'])
+    self.assertEqual(extractor.links, ['/done'])
+
+  def test_encoding(self):
+    extractor = StreamingLinkExtractor('latin-1')
+    extractor.feed('<a href="/caf\xe9">x</a>'.encode('latin-1'))
+    self.assertEqual(extractor.links, ['/caf\xe9'])
@@ -0,0 +1,27 @@
+import unittest
+from snappy.seen import FingerprintSet, fingerprint
+
+
+class TestFingerprintSet(unittest.TestCase):
+  def test_add_and_contains(self):
+    seen = FingerprintSet(['https://example.com/a'])
+    seen.add('https://example.com/b')
+    seen.add('https://example.com/a')
+    self.assertIn('https://example.com/a', seen)
+    self.assertIn('https://example.com/b', seen)
+    self.assertNotIn('https://example.com/c', seen)
+    self.assertEqual(len(seen), 2)
+
+  def test_growth_keeps_every_url(self):
+    urls = [f'https://example.com/page/{i}' for i in range(10000)]
+    seen = FingerprintSet(urls)
+    self.assertEqual(len(seen), len(urls))
+    self.assertTrue(all(url in seen for url in urls))
+    self.assertFalse(any(f'https://example.com/other/{i}' in seen for i in range(10000)))
+    # The table stays between 3/8 and 3/4 full.
+    self.assertLessEqual(seen.nbytes, 8 * len(urls) * 8 / 3)
+
+  def test_fingerprint(self):
+    self.assertEqual(fingerprint('https://example.com'), fingerprint('https://example.com'))
+    self.assertNotEqual(fingerprint('https://example.com'), fingerprint('https://example.com/'))
+    self.assertLess(fingerprint('https://example.com'), 2 ** 64)
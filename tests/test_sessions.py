@@ -0,0 +1,11 @@
+import unittest
+from snappy.sessions import pooled_session
+
+
+class TestPooledSession(unittest.TestCase):
+  def test_pool_size(self):
+    with pooled_session(7) as session:
+      for prefix in ('http://', 'https://'):
+        adapter = session.get_adapter(prefix + 'example.com')
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter._pool_connections, 7)
@@ -0,0 +1,106 @@
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from snappy import snapper
+
+
+class FakeScreenshotter:
+  """
+  Stands in for AsyncScreenshotter, recording the URLs captured and how many were captured at once.
+  on_capture, if set, is called with each URL as its capture starts.
+  """
+
+  on_capture = None
+
+  def __init__(self, **kwargs):
+    self.visual_diff = None
+    self.captured = []
+    self.in_flight = 0
+    self.max_in_flight = 0
+    FakeScreenshotter.last = self
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *exc_info):
+    pass
+
+  async def take_screenshots(self, url, filename, devices):
+    self.in_flight += 1
+    self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    if FakeScreenshotter.on_capture:
+      FakeScreenshotter.on_capture(url)
+    await asyncio.sleep(0.01)
+    self.captured.append(url)
+    self.in_flight -= 1
+
+
+class TestIterUrlsFromCsv(unittest.TestCase):
+  def test_first_column_of_non_empty_rows(self):
+    csv_file = io.StringIO('https://example.com,home\n\n  https://example.com/blog  \n,\nhttps://example.com/a\n')
+    self.assertEqual(list(snapper.iter_urls_from_csv(csv_file)),
+                     ['https://example.com', 'https://example.com/blog', 'https://example.com/a'])
+
+  def test_reads_lazily(self):
+    lines = iter(['https://example.com/1\n', 'https://example.com/2\n'])
+    urls = snapper.iter_urls_from_csv(lines)
+    self.assertEqual(next(urls), 'https://example.com/1')
+    self.assertEqual(list(lines), ['https://example.com/2\n'])
+
+
+class TestReadUrlsFromCsv(unittest.TestCase):
+  def test_reads_all_urls(self):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'urls.csv')
+      with open(path, 'w') as csv_file:
+        csv_file.write('https://example.com,home\n\nhttps://example.com/a\n')
+      self.assertEqual(snapper.read_urls_from_csv(path), ['https://example.com', 'https://example.com/a'])
+
+
+@mock.patch('snappy.snapper.AsyncScreenshotter', FakeScreenshotter)
+class TestTestWebsite(unittest.IsolatedAsyncioTestCase):
+  async def test_bounded_queue(self):
+    read = []
+
+    def urls():
+      for i in range(50):
+        read.append(i)
+        yield f'https://example.com/{i}'
+
+    started = []
+    read_ahead = []
+
+    def on_capture(url):
+      started.append(url)
+      read_ahead.append(len(read) - len(started))
+
+    with mock.patch.object(FakeScreenshotter, 'on_capture', on_capture):
+      await snapper.test_website(urls(), concurrency=3)
+    screenshotter = FakeScreenshotter.last
+    self.assertEqual(sorted(screenshotter.captured), sorted(f'https://example.com/{i}' for i in range(50)))
+    self.assertLessEqual(screenshotter.max_in_flight, 3)
+    # No more URLs are read ahead of the captures than the queue's 6 slots, the 3 URLs taken by workers
+    # whose capture has not started yet, and the one waiting to be queued.
+    self.assertLessEqual(max(read_ahead), 10)
+
+  async def test_slow_source_does_not_block_workers(self):
+    capturing = threading.Event()
+
+    def urls():
+      yield 'https://example.com/1'
+      # Waits like a slow stdin for the first capture to start, which needs the event loop to be free.
+      if not capturing.wait(2):
+        raise AssertionError('the capture of the first URL did not start while the next was being read')
+      yield 'https://example.com/2'
+
+    with mock.patch.object(FakeScreenshotter, 'on_capture', lambda url: capturing.set()):
+      await snapper.test_website(urls(), concurrency=2)
+    self.assertEqual(sorted(FakeScreenshotter.last.captured), ['https://example.com/1', 'https://example.com/2'])
+
+  async def test_invalid_concurrency(self):
+    with self.assertRaises(ValueError):
+      await snapper.test_website([], concurrency=0)
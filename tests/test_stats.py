@@ -0,0 +1,87 @@
+import json
+import threading
+import unittest
+from snappy.stats import Histogram, Stats
+
+
+class TestHistogram(unittest.TestCase):
+  def test_observe(self):
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+      histogram.observe(value)
+    self.assertEqual(histogram.counts, [2, 1, 1])
+    self.assertEqual(histogram.count, 4)
+    self.assertAlmostEqual(histogram.sum, 2.65)
+
+  def test_quantile(self):
+    histogram = Histogram(buckets=(0.1, 1.0))
+    self.assertIsNone(histogram.quantile(0.5))
+    for value in (0.05, 0.05, 0.05, 0.5):
+      histogram.observe(value)
+    self.assertEqual(histogram.quantile(0.5), 0.1)
+    self.assertEqual(histogram.quantile(0.99), 1.0)
+    histogram.observe(5.0)
+    self.assertEqual(histogram.quantile(1.0), float('inf'))
+
+
+class TestStats(unittest.TestCase):
+  def setUp(self):
+    self.events = []
+    self.stats = Stats(hook=lambda event, data: self.events.append((event, data)), buckets=(0.1, 1.0))
+
+  def test_time(self):
+    with self.assertRaises(RuntimeError):
+      with self.stats.time('fetch'):
+        raise RuntimeError('failed')
+    self.assertEqual(self.stats.stages['fetch'].count, 1)
+    self.assertEqual(self.events[0][0], 'stage')
+
+  def test_records(self):
+    self.stats.record_response(200, 100)
+    self.stats.record_response(404, 10)
+    self.stats.add_bytes(5)
+    self.stats.record_error('page', ValueError('bad'))
+    self.stats.increment('pages_crawled')
+    self.stats.set_gauge('queue_depth', 3)
+    self.assertEqual(self.stats.bytes, 115)
+    self.assertEqual(self.stats.statuses, {200: 1, 404: 1})
+    self.assertEqual(self.stats.errors, {('page', 'ValueError'): 1})
+    self.assertEqual([event for event, _ in self.events], ['response', 'response', 'response', 'error', 'counter', 'gauge'])
+
+  def test_threads(self):
+    def observe():
+      for _ in range(1000):
+        self.stats.observe('parse', 0.01)
+        self.stats.increment('pages_crawled')
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(self.stats.stages['parse'].count, 4000)
+    self.assertEqual(self.stats.counters['pages_crawled'], 4000)
+
+  def test_to_json(self):
+    self.stats.observe('fetch', 0.05)
+    self.stats.record_response(200, 100)
+    data = json.loads(self.stats.to_json())
+    self.assertEqual(data['stages']['fetch']['count'], 1)
+    self.assertEqual(data['stages']['fetch']['buckets'], {'0.1': 1, '1.0': 0, '+Inf': 0})
+    self.assertEqual(data['statuses'], {'200': 1})
+    self.assertEqual(data['bytes'], 100)
+
+  def test_to_prometheus(self):
+    self.stats.observe('fetch', 0.05)
+    self.stats.observe('fetch', 0.5)
+    self.stats.record_error('page', ValueError('bad'))
+    self.stats.set_gauge('queue_depth', 3)
+    text = self.stats.to_prometheus()
+    self.assertIn('snappy_stage_seconds_bucket{stage="fetch",le="0.1"} 1\n', text)
+    self.assertIn('snappy_stage_seconds_bucket{stage="fetch",le="+Inf"} 2\n', text)
+    self.assertIn('snappy_stage_seconds_count{stage="fetch"} 2\n', text)
+    self.assertIn('snappy_errors_total{stage="page",error="ValueError"} 1\n', text)
+    self.assertIn('snappy_queue_depth 3\n', text)
+
+
+if __name__ == '__main__':
+  unittest.main()
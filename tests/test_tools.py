@@ -4,6 +4,94 @@ import os
 import asyncio
 from snappy.tools import AsyncScreenshotter
 
+
+class FakeScrollPage:
+    """
+    Stands in for a Playwright page whose height grows by one viewport, growths times, as it is scrolled.
+    """
+
+    def __init__(self, growths, viewport=100):
+        self.growths = growths
+        self.viewport = viewport
+        self.height = viewport
+        self.scroll_y = 0
+        self.listeners = {}
+        self.steps_since_growth = 0
+
+    def on(self, event, callback):
+        self.listeners.setdefault(event, []).append(callback)
+
+    def remove_listener(self, event, callback):
+        self.listeners[event].remove(callback)
+
+    async def evaluate(self, script):
+        if script == 'window.scrollTo(0, 0)':
+            self.scroll_y = 0
+            return None
+        self.scroll_y = min(self.scroll_y + self.viewport, self.height - self.viewport)
+        self.steps_since_growth += 1
+        if self.scroll_y + self.viewport >= self.height and self.growths:
+            self.growths -= 1
+            self.height += self.viewport
+            self.steps_since_growth = 0
+        return [self.height, self.scroll_y + self.viewport]
+
+
+class FakeBrowser:
+    """
+    Stands in for a Playwright browser whose pages fail to navigate to URLs containing 'fail'.
+    """
+
+    def __init__(self):
+        self.contexts = []
+        self.open_pages = 0
+        self.peak_pages = 0
+
+    async def new_context(self, **options):
+        context = FakeContext(self, options)
+        self.contexts.append(context)
+        return context
+
+
+class FakeContext:
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+
+    async def new_page(self):
+        self.browser.open_pages += 1
+        self.browser.peak_pages = max(self.browser.peak_pages, self.browser.open_pages)
+        return FakeScreenshotPage(self.browser)
+
+
+class FakeScreenshotPage:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def goto(self, url):
+        await asyncio.sleep(0.01)
+        if 'fail' in url:
+            raise ConnectionError(url)
+        return type('Response', (), {'status': 200})()
+
+    async def screenshot(self, **options):
+        return b'photo'
+
+    async def close(self):
+        self.browser.open_pages -= 1
+
+
+def start_fake_browser(screenshotter):
+    """
+    Gives the screenshotter a fake browser, as start() would a real one.
+    """
+    screenshotter._browser = FakeBrowser()
+    screenshotter._playwright = type('Playwright', (), {'devices': {'iPhone 13': {'is_mobile': True}}})()
+    screenshotter._context_lock = asyncio.Lock()
+    screenshotter._page_slots = asyncio.Semaphore(screenshotter.max_pages)
+    return screenshotter._browser
+
+
 tracemalloc.start()
 
 class TestAsyncScreenshotter(unittest.IsolatedAsyncioTestCase):
@@ -62,5 +150,149 @@ class TestAsyncScreenshotter(unittest.IsolatedAsyncioTestCase):
         await screenshotter.take_screenshot(url, filename, device=device)
         self.assertTrue(os.path.exists(os.path.join('test_images', filename + '.' + img_format)))
 
+    async def test_take_screenshots_with_shared_browser(self):
+        img_format = 'png'
+        url = 'https://www.google.com'
+        async with AsyncScreenshotter(format=img_format, output_dir='test_images', max_pages=2) as screenshotter:
+            filenames = ['google_shared_1', 'google_shared_2', 'google_shared_iphone_13']
+            await asyncio.gather(
+                screenshotter.take_screenshot(url, filenames[0]),
+                screenshotter.take_screenshot(url, filenames[1]),
+                screenshotter.take_screenshot(url, filenames[2], device='iPhone 13'),
+            )
+            self.assertEqual(len(screenshotter._contexts), 2)
+        self.assertIsNone(screenshotter._browser)
+        for filename in filenames:
+            self.assertTrue(os.path.exists(os.path.join('test_images', filename + '.' + img_format)))
+
+    async def test_scroll_page_stops_once_settled(self):
+        screenshotter = AsyncScreenshotter(scroll_delay=5, scroll_settle=0.05)
+        page = FakeScrollPage(growths=3)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await screenshotter._scroll_page(page)
+        self.assertLess(loop.time() - start, 1)
+        self.assertEqual(page.height, 400)
+        self.assertEqual(page.scroll_y, 0)
+        self.assertFalse(any(page.listeners.values()))
+
+    async def test_scroll_page_stops_once_height_is_stable(self):
+        screenshotter = AsyncScreenshotter(scroll_delay=5, scroll_settle=0.1)
+        page = FakeScrollPage(growths=2)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await screenshotter._scroll_page(page)
+        # The last growth is waited out for scroll_settle, polling every quarter of it, and no longer.
+        self.assertGreaterEqual(loop.time() - start, 0.1)
+        self.assertLessEqual(page.steps_since_growth, 8)
+
+    async def test_scroll_page_stops_at_scroll_delay(self):
+        screenshotter = AsyncScreenshotter(scroll_delay=0.3, scroll_settle=0.05)
+        page = FakeScrollPage(growths=10 ** 6)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await screenshotter._scroll_page(page)
+        self.assertLess(loop.time() - start, 0.6)
+
+    async def test_scroll_page_waits_for_requests(self):
+        screenshotter = AsyncScreenshotter(scroll_delay=5, scroll_settle=0.05)
+        page = FakeScrollPage(growths=0)
+        request = type('Request', (), {'resource_type': 'image'})()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, lambda: page.listeners['request'][0](request))
+        loop.call_later(0.3, lambda: page.listeners['requestfinished'][0](request))
+        start = loop.time()
+        await screenshotter._scroll_page(page)
+        self.assertGreaterEqual(loop.time() - start, 0.35)
+
+    async def test_close_popups_remembers_selector_per_host(self):
+        class FakePopupPage:
+            def __init__(self, url):
+                self.url = url
+                self.calls = []
+
+            async def evaluate(self, script, arg):
+                self.calls.append(arg)
+                return arg[1] or '#consent > button:nth-of-type(1)'
+
+        screenshotter = AsyncScreenshotter(close_popups=True)
+        first = FakePopupPage('https://www.example.com/')
+        await screenshotter._find_and_close_popups(first)
+        self.assertEqual(len(first.calls), 1)
+        self.assertIsNone(first.calls[0][1])
+
+        second = FakePopupPage('https://www.example.com/blog')
+        await screenshotter._find_and_close_popups(second)
+        self.assertEqual(second.calls[0][1], '#consent > button:nth-of-type(1)')
+
+        other = FakePopupPage('https://other.example.com/')
+        await screenshotter._find_and_close_popups(other)
+        self.assertIsNone(other.calls[0][1])
+
+    async def test_close_popups_checks_remembered_selector(self):
+        async with AsyncScreenshotter(close_popups=True) as screenshotter:
+            context = await screenshotter._get_context(None)
+            page = await context.new_page()
+            await page.set_content(
+                '<a href="#" onclick="window.clicked = \'buy\'">Buy now</a>'
+                '<div id="consent"><button onclick="window.clicked = \'accept\'">Accept all</button></div>')
+            # The selector remembered from another page of the site matches the buy link on this one. The page
+            # is at about:blank, which has no host.
+            host = None
+            screenshotter._popup_selectors[host] = 'body > a:nth-of-type(1)'
+            await screenshotter._find_and_close_popups(page)
+            self.assertEqual(await page.evaluate('window.clicked'), 'accept')
+            self.assertEqual(screenshotter._popup_selectors[host], '#consent > button:nth-of-type(1)')
+            await page.close()
+
+    def test_device_filename(self):
+        self.assertEqual(AsyncScreenshotter.device_filename('home', None), 'home')
+        self.assertEqual(AsyncScreenshotter.device_filename('home', 'iPhone 11'), 'home_iphone_11')
+        self.assertEqual(AsyncScreenshotter.device_filename('home', '1280x720'), 'home_1280x720')
+
+    async def test_take_screenshots_runs_devices_concurrently(self):
+        class RecordingScreenshotter(AsyncScreenshotter):
+            async def take_screenshot(self, url, filename, device=None):
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+                await asyncio.sleep(0.01)
+                self.running -= 1
+                return filename
+
+        screenshotter = RecordingScreenshotter()
+        screenshotter._browser = object()
+        screenshotter.running = screenshotter.peak = 0
+        photos = await screenshotter.take_screenshots('https://www.example.com', 'home', [None, 'iPhone 13', '1280x720'])
+        self.assertEqual(photos, {None: 'home', 'iPhone 13': 'home_iphone_13', '1280x720': 'home_1280x720'})
+        self.assertEqual(screenshotter.peak, 3)
+
+    async def test_contexts_are_pooled_per_device(self):
+        screenshotter = AsyncScreenshotter(scroll_delay=0, max_pages=2)
+        browser = start_fake_browser(screenshotter)
+        url = 'https://www.example.com'
+        photos = await asyncio.gather(*[screenshotter.take_screenshot(url, f'page_{i}', device)
+                                        for i, device in enumerate([None, None, 'iPhone 13', None, 'iPhone 13'])])
+        self.assertEqual(photos, [b'photo'] * 5)
+        self.assertEqual([context.options for context in browser.contexts], [{}, {'is_mobile': True}])
+        self.assertEqual(browser.peak_pages, 2)
+        self.assertEqual(browser.open_pages, 0)
+
+    async def test_page_released_on_error(self):
+        screenshotter = AsyncScreenshotter(scroll_delay=0, max_pages=1)
+        browser = start_fake_browser(screenshotter)
+        with self.assertRaises(ConnectionError):
+            await screenshotter.take_screenshot('https://www.example.com/fail', 'failed')
+        self.assertEqual(browser.open_pages, 0)
+        self.assertEqual(screenshotter._open_pages, 0)
+        self.assertEqual(screenshotter.stats.counters['screenshots_failed'], 1)
+
+        # The only page slot was given back, so the next screenshot is taken.
+        photo = await asyncio.wait_for(screenshotter.take_screenshot('https://www.example.com', 'home'), 1)
+        self.assertEqual(photo, b'photo')
+
+    def test_invalid_max_pages(self):
+        with self.assertRaises(ValueError):
+            AsyncScreenshotter(max_pages=0)
+
 if __name__ == '__main__':
     asyncio.run(unittest.main())
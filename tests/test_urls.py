@@ -0,0 +1,43 @@
+import unittest
+from snappy.urls import UrlCanonicalizer, remove_dot_segments
+
+
+class TestRemoveDotSegments(unittest.TestCase):
+  def test_remove_dot_segments(self):
+    self.assertEqual(remove_dot_segments('/a/b/c/./../../g'), '/a/g')
+    self.assertEqual(remove_dot_segments('/a/b/..'), '/a/')
+    self.assertEqual(remove_dot_segments('/..'), '/')
+    self.assertEqual(remove_dot_segments('/page.html'), '/page.html')
+
+
+class TestUrlCanonicalizer(unittest.TestCase):
+  def setUp(self):
+    self.canonicalize = UrlCanonicalizer()
+
+  def test_drop_fragment(self):
+    self.assertEqual(self.canonicalize('https://example.com/page#section'), 'https://example.com/page')
+
+  def test_sort_query(self):
+    self.assertEqual(self.canonicalize('https://example.com/page?b=2&a=1'), 'https://example.com/page?a=1&b=2')
+    self.assertEqual(self.canonicalize('https://example.com/page?a=2&a=1'), 'https://example.com/page?a=2&a=1')
+
+  def test_strip_tracking_params(self):
+    self.assertEqual(self.canonicalize('https://example.com/page?utm_source=x&id=1&fbclid=y'),
+                     'https://example.com/page?id=1')
+
+  def test_lowercase_and_default_port(self):
+    self.assertEqual(self.canonicalize('HTTP://Example.COM:80/Page'), 'http://example.com/Page')
+    self.assertEqual(self.canonicalize('https://example.com:443'), 'https://example.com/')
+    self.assertEqual(self.canonicalize('https://example.com:8443/'), 'https://example.com:8443/')
+
+  def test_dot_segments(self):
+    self.assertEqual(self.canonicalize('https://example.com/a/./b/../c'), 'https://example.com/a/c')
+
+  def test_rules_can_be_disabled(self):
+    canonicalize = UrlCanonicalizer(drop_fragment=False, sort_query=False, strip_params=None)
+    url = 'https://example.com/page?utm_source=x&b=2&a=1#section'
+    self.assertEqual(canonicalize(url), url)
+
+  def test_other_schemes_unchanged(self):
+    self.assertEqual(self.canonicalize('mailto:someone@example.com'), 'mailto:someone@example.com')
+    self.assertEqual(self.canonicalize('http://example.com:abc/'), 'http://example.com:abc/')